@@ -0,0 +1,74 @@
+# AcumuladorMortes.py - Estatísticas de mortes acumuladas bloco a bloco (memória limitada)
+from collections import Counter
+
+from DataLoader import DataLoader
+from DataAnalise import DataAnalise
+from ContadorMorte import estatisticas_do_histograma
+from HistogramaContagem import HistogramaContagem
+
+
+class AcumuladorMortes:
+    def __init__(self):
+        """Acumula contagens e o histograma dos anos de morte sem guardar as linhas."""
+        self.total_linhas = 0
+        self.total_mortes = 0
+        self.contagem_genero = Counter()
+        # O domínio de Death_Year é pequeno: o histograma dá média, mediana e desvio exatos
+        self.histograma_anos = HistogramaContagem()
+
+    def adicionar_bloco(self, df_processado):
+        """Incorpora um bloco já processado pelo DataAnalise (colunas 'Morreu', 'Death_Year', 'Gender_Str')."""
+        self.total_linhas += len(df_processado)
+
+        if 'Gender_Str' in df_processado.columns:
+            contagem = df_processado['Gender_Str'].value_counts()
+            self.contagem_genero.update({genero: int(n) for genero, n in contagem.items() if n > 0})
+
+        if 'Morreu' not in df_processado.columns or 'Death_Year' not in df_processado.columns:
+            return self
+
+        mortos = df_processado['Morreu'].to_numpy() == 1
+        self.total_mortes += int(mortos.sum())
+
+        self.histograma_anos.adicionar_serie(df_processado.loc[mortos, 'Death_Year'])
+        return self
+
+    def mesclar(self, outro):
+        """Soma os agregados de outro acumulador (outro bloco, arquivo ou processo)."""
+        self.total_linhas += outro.total_linhas
+        self.total_mortes += outro.total_mortes
+        self.contagem_genero.update(outro.contagem_genero)
+        self.histograma_anos.mesclar(outro.histograma_anos)
+        return self
+
+    def estatisticas(self):
+        """Retorna o mesmo dicionário de ContadorMortes.estatisticas_mortes (mesma função, mesmos tipos)."""
+        return estatisticas_do_histograma(self.total_mortes, self.histograma_anos)
+
+    def contagem_generos(self):
+        """Retorna a contagem por gênero na mesma forma de DataAnalise.codificar_genero."""
+        return dict(self.contagem_genero.most_common())
+
+    @classmethod
+    def de_arquivo(cls, caminho_arquivo, sep=";", tamanho_bloco=100_000):
+        """Lê o CSV em blocos, aplica o DataAnalise a cada um e acumula os resultados."""
+        acumulador = cls()
+        for bloco in DataLoader(caminho_arquivo, sep=sep).load_em_blocos(tamanho_bloco):
+            # Cada bloco é descartado após o acúmulo: processa no lugar, sem cópia
+            bloco_processado, _ = DataAnalise(bloco, copiar=False).processar()
+            acumulador.adicionar_bloco(bloco_processado)
+        return acumulador
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    import sys
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else "character-deaths.csv"
+    acumulador = AcumuladorMortes.de_arquivo(caminho, tamanho_bloco=250)
+
+    print(f"\nLinhas processadas: {acumulador.total_linhas}")
+    print("\nEstatísticas das Mortes:")
+    print(acumulador.estatisticas())
+    print("\nContagem de Gênero:")
+    print(acumulador.contagem_generos())
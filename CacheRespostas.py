@@ -0,0 +1,83 @@
+# CacheRespostas.py - Respostas JSON pré-serializadas e versionadas (ETag / Last-Modified), com corpos pré-comprimidos
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import Response
+
+from CompressaoRespostas import NIVEIS_CACHE, TAMANHO_MINIMO_COMPRESSAO, comprimir, escolher_codificacao
+from SerializacaoJson import dumps
+
+
+class RespostaVersionada:
+    def __init__(self, conteudo, versao, nome, status=200, corpo=None):
+        """Serializa o conteúdo uma vez e deriva ETag/Last-Modified da versão do dataset.
+
+        `corpo` recebe bytes JSON já serializados no lugar de `conteudo`.
+        """
+        self.corpo = corpo if corpo is not None else dumps(conteudo) + b"\n"
+        self.status = status
+        # A ETag muda sempre que o hash do CSV muda; o nome distingue os endpoints
+        self.etag = f"{versao['hash'][:16]}-{nome}"
+        self.ultima_modificacao = datetime.fromtimestamp(versao["mtime"], tz=timezone.utc)
+        # Codificação -> corpo comprimido no nível máximo, calculado no primeiro pedido e reaproveitado
+        self._comprimidos = {}
+
+    def corpo_comprimido(self, codificacao):
+        corpo = self._comprimidos.get(codificacao)
+        if corpo is None:
+            # Duas requisições simultâneas podem comprimir o mesmo corpo; o resultado é idêntico
+            corpo = comprimir(self.corpo, codificacao, NIVEIS_CACHE[codificacao])
+            self._comprimidos[codificacao] = corpo
+        return corpo
+
+    def representacao(self, codificacao):
+        """(corpo, codificação usada, ETag) na codificação pedida; corpos pequenos e erros vão sem compressão."""
+        if codificacao is None or self.status != 200 or len(self.corpo) < TAMANHO_MINIMO_COMPRESSAO:
+            return self.corpo, None, self.etag
+        return self.corpo_comprimido(codificacao), codificacao, f"{self.etag}-{codificacao}"
+
+    def responder(self, requisicao):
+        """Retorna a resposta completa (comprimida se o cliente aceitar) ou 304 se o cliente já tiver esta versão."""
+        corpo, codificacao, etag = self.representacao(escolher_codificacao(requisicao))
+        resposta = Response(corpo, status=self.status, mimetype="application/json")
+        resposta.set_etag(etag)
+        if codificacao is not None:
+            resposta.headers["Content-Encoding"] = codificacao
+        resposta.vary.add("Accept-Encoding")
+        resposta.last_modified = self.ultima_modificacao
+        # Permite cache no cliente, mas obriga a revalidação (barata) a cada requisição
+        resposta.cache_control.no_cache = True
+        if self.status != 200:
+            return resposta
+        return resposta.make_conditional(requisicao)
+
+
+class CacheConsultas:
+    def __init__(self, max_respostas=128):
+        """Respostas versionadas de consultas (rota + parâmetros), da menos para a mais usada (LRU).
+
+        A chave inclui a versão dos dados: respostas de versões antigas deixam de ser pedidas e saem pelo LRU.
+        """
+        self.max_respostas = max_respostas
+        self._respostas = OrderedDict()
+        self._trava = threading.Lock()
+
+    def obter(self, versao, nome, caminho, parametros, montar):
+        """RespostaVersionada da consulta (`caminho` + pares `parametros`); `montar()` gera os bytes JSON só na primeira vez por versão."""
+        consulta = (caminho, tuple(sorted(parametros)))
+        chave = (versao["hash"], consulta)
+        with self._trava:
+            resposta = self._respostas.get(chave)
+            if resposta is not None:
+                self._respostas.move_to_end(chave)
+        if resposta is None:
+            # ETag própria por consulta: páginas diferentes da mesma rota não se confundem
+            assinatura = hashlib.blake2b(repr(consulta).encode("utf-8"), digest_size=4).hexdigest()
+            resposta = RespostaVersionada(None, versao, f"{nome}-{assinatura}", corpo=montar())
+            with self._trava:
+                self._respostas[chave] = resposta
+                while len(self._respostas) > self.max_respostas:
+                    self._respostas.popitem(last=False)
+        return resposta
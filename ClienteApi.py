@@ -0,0 +1,107 @@
+# ClienteApi.py - Cliente HTTP da API (sessão keep-alive com pool de conexões e cache de respostas)
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+# requests é opcional: só o modo cliente do app.py (GOT_API_URL) precisa dele
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+logger = logging.getLogger(__name__)
+
+
+class ClienteApi:
+    def __init__(self, url_base, timeout=10.0, conexoes=10, validade=5.0, max_respostas=256):
+        """Cliente compartilhado (thread-safe) para várias sessões do Streamlit.
+
+        Respostas com ETag são revalidadas com If-None-Match (304 reaproveita o corpo guardado);
+        dentro de `validade` segundos a resposta guardada é usada sem nenhuma requisição.
+        """
+        if requests is None:
+            raise ImportError("O modo cliente da API requer o pacote 'requests' (pip install requests).")
+        self.url_base = url_base.rstrip("/")
+        self.timeout = timeout
+        self.validade = validade
+        self.max_respostas = max_respostas
+        self.sessao = requests.Session()
+        # Conexões reaproveitadas (keep-alive) entre requisições e threads
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=conexoes)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+        self._respostas = OrderedDict()  # chave -> (etag, expira_em, dados), em ordem de uso (LRU)
+        self._trava = threading.Lock()
+
+    def _guardar(self, chave, etag, dados):
+        with self._trava:
+            self._respostas[chave] = (etag, time.monotonic() + self.validade, dados)
+            self._respostas.move_to_end(chave)
+            while len(self._respostas) > self.max_respostas:
+                self._respostas.popitem(last=False)
+
+    def _get(self, caminho, params=None):
+        """GET com cache: retorna o JSON da resposta (HTTPError para status de erro)."""
+        params = sorted((params or {}).items())
+        chave = (caminho, tuple(params))
+        with self._trava:
+            guardada = self._respostas.get(chave)
+            if guardada is not None:
+                self._respostas.move_to_end(chave)
+        if guardada is not None and time.monotonic() < guardada[1]:
+            return guardada[2]
+
+        cabecalhos = {}
+        if guardada is not None and guardada[0]:
+            cabecalhos["If-None-Match"] = guardada[0]
+        resposta = self.sessao.get(self.url_base + caminho, params=params, headers=cabecalhos, timeout=self.timeout)
+        if resposta.status_code == 304 and guardada is not None:
+            logger.debug("%s não mudou (304).", caminho)
+            dados = guardada[2]
+        else:
+            resposta.raise_for_status()
+            dados = resposta.json()
+        self._guardar(chave, resposta.headers.get("ETag"), dados)
+        return dados
+
+    def versao(self):
+        """ETag atual das estatísticas: muda sempre que os dados da API mudam."""
+        self.estatisticas()
+        with self._trava:
+            guardada = self._respostas.get(("/api/statistics", ()))
+        return guardada[0] if guardada is not None else None
+
+    def estatisticas(self):
+        return self._get("/api/statistics")
+
+    def contagem_generos(self):
+        return self._get("/api/gender_count")
+
+    def personagens(self, filtros=None, pagina=1, tamanho_pagina=50, colunas=None, ordenar_por=None, decrescente=False):
+        """Página de /api/characters. `filtros` usa os parâmetros da API, ex.: {"gender": ["Feminino"], "died": ["1"]}."""
+        params = {parametro: ",".join(str(v) for v in valores) for parametro, valores in (filtros or {}).items()}
+        params["page"] = pagina
+        params["page_size"] = tamanho_pagina
+        if colunas:
+            params["columns"] = ",".join(colunas)
+        if ordenar_por:
+            params["sort"] = ordenar_por
+            params["order"] = "desc" if decrescente else "asc"
+        return self._get("/api/characters", params)
+
+    def mortes_por_ano(self):
+        """{ano: mortes}, agregado no servidor (/api/deaths_by_year) e revalidado pela ETag como as estatísticas."""
+        return {int(ano): mortes for ano, mortes in self._get("/api/deaths_by_year").items()}
+
+
+# Exemplo de uso (com a API rodando: python api.py)
+if __name__ == "__main__":
+    import sys
+
+    cliente = ClienteApi(sys.argv[1] if len(sys.argv) > 1 else "http://127.0.0.1:5000")
+    print(cliente.estatisticas())
+    print(cliente.contagem_generos())
+    print(cliente.personagens({"gender": ["Feminino"], "died": ["1"]}, tamanho_pagina=3, colunas=["Name"]))
+    print(cliente.mortes_por_ano())
@@ -0,0 +1,108 @@
+# CompressaoRespostas.py - Negociação do Accept-Encoding e compressão gzip/brotli das respostas
+import gzip
+import zlib
+
+from werkzeug.http import parse_accept_header
+
+# brotli é opcional: sem ele as respostas são comprimidas só com gzip
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Corpos menores que isto vão sem compressão: o ganho não paga a CPU nem o cabeçalho
+TAMANHO_MINIMO_COMPRESSAO = 1024
+
+# Tipos de conteúdo comprimidos (Arrow IPC e outros binários já são densos)
+TIPOS_COMPRIMIVEIS = {"application/json", "application/x-ndjson", "text/csv", "text/plain"}
+
+# Níveis para corpos comprimidos uma vez e guardados (máximos) e para os comprimidos a cada requisição (rápidos)
+NIVEIS_CACHE = {"br": 11, "gzip": 9}
+NIVEIS_REQUISICAO = {"br": 4, "gzip": 5}
+
+
+def codificacoes_disponiveis():
+    """Codificações suportadas, em ordem de preferência quando o cliente aceita mais de uma com a mesma qualidade."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def codificacao_aceita(accept_encoding):
+    """Melhor codificação aceita no valor do cabeçalho Accept-Encoding ou None (sem compressão)."""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(codificacoes_disponiveis())
+
+
+def escolher_codificacao(requisicao):
+    """Melhor codificação aceita pelo cliente de uma requisição do Flask ou None (sem compressão)."""
+    return codificacao_aceita(requisicao.headers.get("Accept-Encoding"))
+
+
+def comprimir(corpo, codificacao, nivel=None):
+    """Comprime o corpo inteiro; o mesmo corpo gera sempre os mesmos bytes (gzip sem data no cabeçalho)."""
+    if nivel is None:
+        nivel = NIVEIS_REQUISICAO[codificacao]
+    if codificacao == "br":
+        return brotli.compress(corpo, quality=nivel)
+    return gzip.compress(corpo, compresslevel=nivel, mtime=0)
+
+
+def comprimir_blocos(blocos, codificacao):
+    """Gerador que comprime um fluxo de bytes bloco a bloco: o cliente descomprime cada bloco assim que chega."""
+    if codificacao == "br":
+        compressor = brotli.Compressor(quality=NIVEIS_REQUISICAO["br"])
+        for bloco in blocos:
+            saida = compressor.process(bloco) + compressor.flush()
+            if saida:
+                yield saida
+        yield compressor.finish()
+        return
+
+    # wbits 16 + MAX_WBITS: formato gzip (cabeçalho e CRC) em vez de zlib puro
+    compressor = zlib.compressobj(NIVEIS_REQUISICAO["gzip"], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for bloco in blocos:
+        saida = compressor.compress(bloco) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if saida:
+            yield saida
+    yield compressor.flush()
+
+
+def marcar_codificacao(resposta, codificacao):
+    """Cabeçalhos da representação comprimida: Content-Encoding e uma ETag própria para cada codificação."""
+    resposta.headers["Content-Encoding"] = codificacao
+    etag, fraca = resposta.get_etag()
+    if etag:
+        resposta.set_etag(f"{etag}-{codificacao}", weak=fraca)
+
+
+def comprimir_resposta(resposta, requisicao):
+    """Comprime no momento respostas ainda não comprimidas (páginas, buscas...) se o cliente aceitar."""
+    if resposta.mimetype not in TIPOS_COMPRIMIVEIS:
+        return resposta
+    # Caches intermediários precisam separar as representações pelo Accept-Encoding
+    resposta.vary.add("Accept-Encoding")
+    if (
+        resposta.is_streamed or resposta.direct_passthrough
+        or "Content-Encoding" in resposta.headers
+        or not 200 <= resposta.status_code < 300
+    ):
+        return resposta
+    codificacao = escolher_codificacao(requisicao)
+    if codificacao is None:
+        return resposta
+    corpo = resposta.get_data()
+    if len(corpo) < TAMANHO_MINIMO_COMPRESSAO:
+        return resposta
+    resposta.set_data(comprimir(corpo, codificacao))
+    marcar_codificacao(resposta, codificacao)
+    return resposta
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    corpo = b'{"Name":"Arya Stark","Allegiances":"Stark"}\n' * 100
+    for codificacao in codificacoes_disponiveis():
+        comprimido = comprimir(corpo, codificacao, NIVEIS_CACHE[codificacao])
+        em_blocos = b"".join(comprimir_blocos([corpo[:2000], corpo[2000:]], codificacao))
+        print(codificacao, len(corpo), "->", len(comprimido), "bytes;", "em blocos:", len(em_blocos), "bytes")
+    print(gzip.decompress(b"".join(comprimir_blocos([corpo[:2000], corpo[2000:]], "gzip"))) == corpo)
@@ -0,0 +1,238 @@
+# ConsultasApi.py - Leitura dos parâmetros e montagem dos corpos das rotas da API, sem depender do framework (Flask ou ASGI)
+# Os módulos de dados (que importam o pandas e o NumPy) são importados dentro das funções que os usam:
+# importar este módulo, e portanto o api.py, não carrega o pandas antes da primeira consulta
+from SerializacaoJson import dumps, loads
+
+# Limite de IDs aceitos em uma única chamada de /api/records
+MAX_IDS_POR_REQUISICAO = 1000
+
+# Limite de registros em um único POST /api/records (NDJSON)
+MAX_REGISTROS_POR_LOTE = 10_000
+
+# Paginação de /api/characters
+TAMANHO_PAGINA_PADRAO = 50
+TAMANHO_PAGINA_MAXIMO = 1000
+
+# Linhas por bloco de /api/export
+TAMANHO_BLOCO_EXPORTACAO = 10_000
+
+# Resultados de /api/search
+LIMITE_BUSCA_PADRAO = 10
+LIMITE_BUSCA_MAXIMO = 100
+
+
+class ErroConsulta(ValueError):
+    def __init__(self, mensagem, status=400, **extras):
+        """Erro a devolver ao cliente como {"status": "erro", "mensagem": ...} (mais `extras`) com o `status` HTTP."""
+        super().__init__(mensagem)
+        self.status = status
+        self.extras = extras
+
+    def corpo(self):
+        return dumps({"status": "erro", "mensagem": str(self), **self.extras}) + b"\n"
+
+
+# Os parâmetros (`args`) podem ser o request.args do Flask ou o query_params do Starlette: os dois têm get/getlist/keys
+
+def _filtros(args):
+    from IndiceFiltros import filtros_de_parametros
+
+    return filtros_de_parametros({chave: args.getlist(chave) for chave in args.keys()})
+
+
+def ler_paginacao(args):
+    """Lê page/page_size da URL. Retorna (pagina, tamanho)."""
+    try:
+        pagina = int(args.get("page", 1))
+        tamanho = int(args.get("page_size", TAMANHO_PAGINA_PADRAO))
+    except ValueError:
+        raise ErroConsulta("Parâmetros 'page' e 'page_size' devem ser inteiros.")
+    if pagina < 1 or not 1 <= tamanho <= TAMANHO_PAGINA_MAXIMO:
+        raise ErroConsulta(f"'page' deve ser >= 1 e 'page_size' entre 1 e {TAMANHO_PAGINA_MAXIMO}.")
+    return pagina, tamanho
+
+
+def ler_ordenacao(args, df):
+    """Lê ?sort=coluna&order=asc|desc. Retorna (coluna ou None, decrescente)."""
+    coluna = args.get("sort")
+    ordem = args.get("order", "asc").lower()
+    if ordem not in ("asc", "desc"):
+        raise ErroConsulta("Parâmetro 'order' deve ser 'asc' ou 'desc'.")
+    if coluna and coluna not in df.columns:
+        raise ErroConsulta(f"Coluna de ordenação desconhecida: {coluna}.")
+    return coluna or None, ordem == "desc"
+
+
+def ler_colunas(args, df):
+    """Lê a projeção ?columns=Name,Allegiances. Retorna as colunas ou None."""
+    parametro = args.get("columns")
+    if not parametro:
+        return None
+    colunas = [coluna.strip() for coluna in parametro.split(",") if coluna.strip()]
+    desconhecidas = [coluna for coluna in colunas if coluna not in df.columns]
+    if desconhecidas:
+        raise ErroConsulta(f"Colunas desconhecidas: {', '.join(desconhecidas)}.")
+    return colunas
+
+
+def _indice_registros(snap):
+    if snap.indice_registros is None:
+        raise ErroConsulta("Coluna ID não encontrada no DataFrame processado.", status=500)
+    return snap.indice_registros
+
+
+def corpo_registro(snap, record_id):
+    """Corpo de /api/record/<id>, já serializado no índice de registros."""
+    corpo = _indice_registros(snap).resposta_registro(record_id)
+    if corpo is None:
+        raise ErroConsulta(f"ID {record_id} não encontrado", status=404)
+    return corpo
+
+
+def corpo_registro_original(snap, record_id):
+    """Corpo de /api/record/<id>/original: a linha do CSV lida pela posição guardada no índice de posições."""
+    if snap.indice_offsets is None:
+        raise ErroConsulta("Índice de posições do CSV indisponível.", status=500)
+    registro = snap.indice_offsets.ler_registro(record_id)
+    if registro is None:
+        # Registros recebidos pela API só entram no CSV quando o log é compactado
+        raise ErroConsulta(f"ID {record_id} não encontrado no CSV", status=404)
+    return dumps({"status": "sucesso", "dados": registro}) + b"\n"
+
+
+def corpo_registros(snap, args):
+    """Corpo de /api/records?ids=id1,id2,id3."""
+    indice_registros = _indice_registros(snap)
+    ids = [valor.strip() for valor in args.get("ids", "").split(",") if valor.strip()]
+    if not ids:
+        raise ErroConsulta("Informe ao menos um ID em 'ids'.")
+    if len(ids) > MAX_IDS_POR_REQUISICAO:
+        raise ErroConsulta(f"Máximo de {MAX_IDS_POR_REQUISICAO} IDs por requisição.")
+    return indice_registros.resposta_varios(ids)
+
+
+def ler_registros_ndjson(corpo):
+    """Valida o corpo NDJSON (bytes) de POST /api/records (um objeto por linha) e retorna os registros (tudo ou nada)."""
+    from IngestaoRegistros import validar_registro
+
+    try:
+        texto = corpo.decode("utf-8")
+    except UnicodeDecodeError:
+        raise ErroConsulta("O corpo deve ser NDJSON em UTF-8.")
+
+    registros = []
+    erros = []
+    for numero, linha in enumerate(texto.splitlines(), start=1):
+        if not linha.strip():
+            continue
+        try:
+            registros.append(validar_registro(loads(linha)))
+        except ValueError as e:
+            # Erros de sintaxe do JSON também são ValueError
+            erros.append({"linha": numero, "mensagem": str(e)})
+
+    if erros:
+        raise ErroConsulta("Nenhum registro foi incluído.", erros=erros[:100])
+    if not registros:
+        raise ErroConsulta("Envie ao menos um registro (um objeto JSON por linha).")
+    if len(registros) > MAX_REGISTROS_POR_LOTE:
+        raise ErroConsulta(f"Máximo de {MAX_REGISTROS_POR_LOTE} registros por requisição.")
+    return registros
+
+
+def preparar_personagens(snap, args):
+    """Valida os parâmetros de /api/characters e retorna a função que monta o corpo da página.
+
+    A validação acontece já; a montagem pode ficar para depois (ou nem acontecer, se a página estiver em cache).
+    """
+    from ExportacaoDados import registros_json
+
+    pagina, tamanho = ler_paginacao(args)
+    colunas = ler_colunas(args, snap.df_processado)
+    ordenar_por, decrescente = ler_ordenacao(args, snap.df_processado)
+    filtros = _filtros(args)
+
+    def montar():
+        bitmap = snap.indice_filtros.filtrar(filtros)
+        total = snap.indice_filtros.contar(bitmap)
+        inicio = (pagina - 1) * tamanho
+        if ordenar_por is None:
+            posicoes = snap.indice_filtros.posicoes(bitmap, inicio, inicio + tamanho)
+        else:
+            ordem = snap.ordem(ordenar_por, decrescente)
+            posicoes = snap.indice_filtros.posicoes_ordenadas(bitmap, ordem, inicio, inicio + tamanho)
+
+        dados = registros_json(snap.df_processado, posicoes, colunas, snap.indice_registros)
+        return (
+            b'{"dados":[' + b",".join(dados) + b"]"
+            + f',"pagina":{pagina},"status":"sucesso","tamanho_pagina":{tamanho},"total":{total}}}\n'.encode()
+        )
+
+    return montar
+
+
+def preparar_exportacao(snap, args):
+    """Valida os parâmetros de /api/export e retorna (gerador de blocos de bytes, formato, tipo de conteúdo)."""
+    from ExportacaoDados import FORMATOS_EXPORTACAO, exportar
+
+    formato = args.get("format", "ndjson").lower()
+    colunas = ler_colunas(args, snap.df_processado)
+    bitmap = snap.indice_filtros.filtrar(_filtros(args))
+    blocos = snap.indice_filtros.posicoes_em_blocos(bitmap, TAMANHO_BLOCO_EXPORTACAO)
+    try:
+        corpo = exportar(snap.df_processado, blocos, formato, colunas, snap.indice_registros)
+    except ValueError as e:
+        raise ErroConsulta(str(e))
+    return corpo, formato, FORMATOS_EXPORTACAO[formato]
+
+
+def preparar_breakdown(snap, args):
+    """Lê ?by= e os filtros de /api/breakdown e retorna a função que monta o corpo a partir do cubo."""
+    from IndiceFiltros import PARAMETROS_FILTRO
+
+    cubo = snap.cubo
+    nomes = [nome.strip() for nome in args.get("by", "").split(",") if nome.strip()]
+    por = [PARAMETROS_FILTRO.get(nome.lower(), nome) for nome in nomes]
+    filtros = _filtros(args)
+
+    def montar():
+        try:
+            grupos = cubo.detalhar(por, filtros)
+        except KeyError:
+            raise ErroConsulta("Dimensões aceitas em 'by' e nos filtros: allegiances, gender, nobility, book_of_death.")
+        return dumps({"status": "sucesso", "por": por, "grupos": grupos}) + b"\n"
+
+    return montar
+
+
+def preparar_busca(snap, args):
+    """Valida ?q=&limit= de /api/search e retorna a função que monta o corpo com os resultados."""
+    from IndiceBusca import normalizar
+
+    if snap.indice_busca is None:
+        raise ErroConsulta("Coluna ID não encontrada no DataFrame processado.", status=500)
+    indice_registros = _indice_registros(snap)
+
+    consulta = args.get("q", "")
+    try:
+        limite = int(args.get("limit", LIMITE_BUSCA_PADRAO))
+    except ValueError:
+        raise ErroConsulta("Parâmetro 'limit' deve ser um inteiro.")
+    if not 1 <= limite <= LIMITE_BUSCA_MAXIMO:
+        raise ErroConsulta(f"'limit' deve estar entre 1 e {LIMITE_BUSCA_MAXIMO}.")
+    if not normalizar(consulta):
+        raise ErroConsulta("Informe o texto da busca em 'q'.")
+
+    def montar():
+        ids, pontuacoes, total = snap.indice_busca.buscar(consulta, limite)
+        dados = [
+            b'{"pontuacao":' + repr(round(float(pontuacao), 4)).encode() + b',"registro":' + indice_registros.obter_bytes(record_id) + b"}"
+            for record_id, pontuacao in zip(ids.tolist(), pontuacoes.tolist())
+        ]
+        return (
+            b'{"consulta":' + dumps(consulta) + b',"dados":[' + b",".join(dados) + b"]"
+            + f',"status":"sucesso","total":{total}}}\n'.encode()
+        )
+
+    return montar
+
@@ -1,77 +1,162 @@
 # Corrigido: ContadorMorte.py
+import copy
+import logging
+
+import numpy as np
 import pandas as pd
 
+from DataAnalise import copiar_dataframe
+from HistogramaContagem import HistogramaContagem
+from Metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+def estatisticas_do_histograma(total_mortes, anos):
+    """Dicionário de estatísticas das mortes a partir do total e do histograma dos anos de morte.
+
+    Usado por ContadorMortes e AcumuladorMortes: os dois modos devolvem exatamente o mesmo JSON.
+    """
+    if total_mortes == 0:
+        logger.info("Nenhuma morte registrada para calcular estatísticas.")
+        return {
+            "Total de Mortes": 0,
+            "Mensagem": "Nenhuma morte registrada."
+        }
+
+    if anos.total == 0:
+        logger.info("Nenhuma morte com ano válido registrada para calcular estatísticas.")
+        return {
+            "Total de Mortes": int(total_mortes), # Ainda retorna o total de mortes
+            "Mensagem": "Nenhuma morte com ano válido para calcular estatísticas."
+        }
+
+    return {
+        "Total de Mortes": int(total_mortes),
+        "Média do Ano das Mortes": round(float(anos.media()), 2),
+        "Mediana do Ano das Mortes": float(anos.mediana()),
+        "Desvio Padrão do Ano das Mortes": round(float(anos.desvio_padrao()), 2),
+        "Ano Mínimo de Morte": int(anos.minimo()),
+        "Ano Máximo de Morte": int(anos.maximo())
+    }
+
 class ContadorMortes:
-    def __init__(self, dataframe):
-        """Inicializa o contador com o DataFrame pré-processado."""
-        # Garante que está trabalhando com uma cópia
-        self.df = dataframe.copy()
-        # Garante que as colunas necessárias são numéricas
-        if 'Death_Year' in self.df.columns:
-            self.df['Death_Year'] = pd.to_numeric(self.df['Death_Year'], errors='coerce').fillna(0)
-        if 'Morreu' in self.df.columns:
-            self.df['Morreu'] = pd.to_numeric(self.df['Morreu'], errors='coerce').fillna(0).astype(int)
-        else:
-            # Se a coluna 'Morreu' não existir (caso DataAnalise não tenha sido executado completamente antes)
-            # tenta criá-la a partir de 'Death_Year'
+    def __init__(self, dataframe, copiar=True):
+        """Inicializa o contador com o DataFrame pré-processado.
+
+        Com copiar=False o contador passa a ser dono do DataFrame: pode normalizar
+        'Death_Year'/'Morreu' no lugar, e o chamador não deve mais alterá-lo.
+        """
+        with metricas.etapa("ContadorMortes") as etapa:
+            # Garante que está trabalhando com uma cópia (preguiçosa se o copy-on-write estiver ativo)
+            self.df = copiar_dataframe(dataframe, copiar)
+            # As estatísticas são calculadas uma vez e só refeitas quando registros são incluídos ou removidos
+            self._estatisticas = None
+            # Garante que as colunas necessárias são numéricas (sem custo quando DataAnalise já as tipou)
             if 'Death_Year' in self.df.columns:
-                self.df['Morreu'] = self.df['Death_Year'].apply(lambda x: 1 if x > 0 else 0)
-                print("Aviso: Coluna 'Morreu' criada em ContadorMortes.")
+                if not pd.api.types.is_numeric_dtype(self.df['Death_Year']):
+                    self.df['Death_Year'] = pd.to_numeric(self.df['Death_Year'], errors='coerce')
+                if self.df['Death_Year'].hasnans:
+                    self.df['Death_Year'] = self.df['Death_Year'].fillna(0)
+            if 'Morreu' in self.df.columns:
+                morreu = self.df['Morreu']
+                if not pd.api.types.is_integer_dtype(morreu) or morreu.hasnans:
+                    self.df['Morreu'] = pd.to_numeric(morreu, errors='coerce').fillna(0).astype("int8")
             else:
-                 # Se nem 'Morreu' nem 'Death_Year' existem, inicializa 'Morreu' com 0
-                 self.df['Morreu'] = 0
-                 print("Aviso: Colunas 'Morreu' e 'Death_Year' não encontradas. Contagem de mortes será 0.")
+                # Se a coluna 'Morreu' não existir (caso DataAnalise não tenha sido executado completamente antes)
+                # tenta criá-la a partir de 'Death_Year'
+                if 'Death_Year' in self.df.columns:
+                    self.df['Morreu'] = (self.df['Death_Year'].to_numpy(dtype="float64", na_value=0) > 0).astype(np.int8)
+                    logger.warning("Coluna 'Morreu' criada em ContadorMortes.")
+                else:
+                     # Se nem 'Morreu' nem 'Death_Year' existem, inicializa 'Morreu' com 0
+                     self.df['Morreu'] = 0
+                     logger.warning("Colunas 'Morreu' e 'Death_Year' não encontradas. Contagem de mortes será 0.")
+            # Histogramas de contagem dos mortos: estatísticas exatas sem ordenar e com atualização incremental
+            self.total_mortes = 0
+            self.histograma_anos = HistogramaContagem()
+            self.histograma_capitulos = HistogramaContagem()
+            self._acumular(self.df, sinal=1)
+            etapa.linhas = len(self.df)
+
+    def _acumular(self, dataframe, sinal):
+        """Soma (sinal=1) ou desconta (sinal=-1) os mortos de `dataframe` nos histogramas."""
+        if 'Morreu' not in dataframe.columns:
+            return
+        mortos = dataframe['Morreu'].to_numpy() == 1
+        self.total_mortes += sinal * int(mortos.sum())
+        if 'Death_Year' in dataframe.columns:
+            self.histograma_anos.adicionar_serie(pd.to_numeric(dataframe.loc[mortos, 'Death_Year'], errors='coerce'), sinal)
+        if 'Death Chapter' in dataframe.columns:
+            self.histograma_capitulos.adicionar_serie(pd.to_numeric(dataframe.loc[mortos, 'Death Chapter'], errors='coerce'), sinal)
+        self._estatisticas = None
+
+    def adicionar_registros(self, dataframe):
+        """Inclui registros já processados nas estatísticas, sem recalcular o conjunto todo.
+
+        Só os histogramas e o total são atualizados; `self.df` não recebe as linhas novas.
+        """
+        self._acumular(dataframe, sinal=1)
+        return self
+
+    def copia(self):
+        """Contador com cópias dos histogramas e do total que compartilha o DataFrame (somente leitura).
+
+        Permite incluir registros numa versão nova das estatísticas sem alterar este contador.
+        """
+        novo = copy.copy(self)
+        novo.histograma_anos = self.histograma_anos.copia()
+        novo.histograma_capitulos = self.histograma_capitulos.copia()
+        return novo
+
+    def mortes_por_ano(self):
+        """{ano: mortes} dos mortos com ano de morte, em ordem de ano (sai do histograma, sem tocar no DataFrame)."""
+        return dict(sorted(self.histograma_anos.contagens.items()))
+
+    def remover_registros(self, dataframe):
+        """Retira das estatísticas registros que foram incluídos antes."""
+        self._acumular(dataframe, sinal=-1)
+        return self
+
+    def mesclar(self, outro):
+        """Soma as estatísticas de outro contador (outro bloco, arquivo ou worker)."""
+        self.total_mortes += outro.total_mortes
+        self.histograma_anos.mesclar(outro.histograma_anos)
+        self.histograma_capitulos.mesclar(outro.histograma_capitulos)
+        self._estatisticas = None
+        return self
 
     def contar_mortes(self):
         """Conta o número de mortes registradas usando a coluna 'Morreu'."""
         if 'Morreu' not in self.df.columns:
-             print("Erro: Coluna 'Morreu' não encontrada para contagem.")
+             logger.error("Coluna 'Morreu' não encontrada para contagem.")
              return 0 # Retorna 0 se a coluna não existe
         
-        total_mortes = self.df['Morreu'].sum()
-        print(f"Total de mortes contadas: {total_mortes}")
-        return total_mortes
+        # Chamado dentro das requisições: só é formatado se o nível DEBUG estiver ativo
+        logger.debug("Total de mortes contadas: %s", self.total_mortes)
+        return self.total_mortes
 
     def estatisticas_mortes(self):
-        """Retorna estatísticas das mortes usando 'Death_Year'."""
+        """Retorna estatísticas das mortes usando 'Death_Year' (calculadas uma vez e reutilizadas)."""
+        if self._estatisticas is None:
+            with metricas.etapa("ContadorMortes.estatisticas_mortes"):
+                self._estatisticas = self._calcular_estatisticas()
+        return dict(self._estatisticas)
+
+    def _calcular_estatisticas(self):
+        """Calcula as estatísticas das mortes a partir do histograma dos anos de morte."""
         # Verifica se as colunas necessárias existem
         if 'Morreu' not in self.df.columns or 'Death_Year' not in self.df.columns:
             return {"Erro": "Colunas 'Morreu' ou 'Death_Year' não encontradas."}
 
-        # Filtra o DataFrame para incluir apenas personagens que morreram
-        df_mortes = self.df[self.df['Morreu'] == 1].copy()
-        
-        if df_mortes.empty:
-            print("Nenhuma morte registrada para calcular estatísticas.")
-            return {
-                "Total de Mortes": 0,
-                "Mensagem": "Nenhuma morte registrada."
-            }
-        
-        # Calcula as estatísticas sobre o ano da morte ('Death_Year')
-        # Garante que Death_Year é numérico para estatísticas
-        df_mortes['Death_Year'] = pd.to_numeric(df_mortes['Death_Year'], errors='coerce')
-        # Remove NaNs que podem ter surgido da coerção, se houver
-        df_mortes.dropna(subset=['Death_Year'], inplace=True)
-
-        if df_mortes.empty:
-             print("Nenhuma morte com ano válido registrada para calcular estatísticas.")
-             return {
-                "Total de Mortes": self.contar_mortes(), # Ainda retorna o total de mortes
-                "Mensagem": "Nenhuma morte com ano válido para calcular estatísticas."
-            }
-
-        stats = {
-            "Total de Mortes": int(self.contar_mortes()), # Usa o método de contagem atualizado
-            "Média do Ano das Mortes": round(df_mortes['Death_Year'].mean(), 2),
-            "Mediana do Ano das Mortes": df_mortes['Death_Year'].median(),
-            "Desvio Padrão do Ano das Mortes": round(df_mortes['Death_Year'].std(), 2),
-            "Ano Mínimo de Morte": int(df_mortes['Death_Year'].min()),
-            "Ano Máximo de Morte": int(df_mortes['Death_Year'].max())
-        }
-        print(f"Estatísticas de mortes calculadas: {stats}")
+        stats = estatisticas_do_histograma(self.contar_mortes(), self.histograma_anos)
+        logger.debug("Estatísticas de mortes calculadas: %s", stats)
         return stats
 
+    def percentis_mortes(self, quantis=(0.25, 0.5, 0.75), coluna='Death_Year'):
+        """Quantis exatos do ano ('Death_Year') ou do capítulo ('Death Chapter') de morte."""
+        histograma = self.histograma_capitulos if coluna == 'Death Chapter' else self.histograma_anos
+        return dict(zip(quantis, histograma.percentis(quantis)))
+
 # Exemplo de uso (adaptado para novas colunas)
 if __name__ == "__main__":
     dados = {
@@ -83,11 +168,13 @@ if __name__ == "__main__":
     df_exemplo = pd.DataFrame(dados)
     
     # Simula o pré-processamento que adicionaria 'Morreu'
-    df_exemplo['Morreu'] = df_exemplo['Death_Year'].apply(lambda x: 1 if x > 0 else 0)
+    df_exemplo['Morreu'] = (df_exemplo['Death_Year'] > 0).astype(int)
     
     contador = ContadorMortes(df_exemplo)
     
     print(f"\nTotal de Mortes: {contador.contar_mortes()}")
     print("\nEstatísticas das Mortes:")
     print(contador.estatisticas_mortes())
+    print(f"Quartis do ano de morte: {contador.percentis_mortes()}")
+    print(f"Moda do ano de morte: {contador.histograma_anos.moda()}")
 
@@ -0,0 +1,150 @@
+# CuboAgregacoes.py - Cubo materializado de mortes por casa, gênero, nobreza e livro da morte
+import copy
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from IndiceFiltros import normalizar_valor
+
+# Dimensões do cubo, na ordem em que aparecem nas chaves
+DIMENSOES_CUBO = ("Allegiances", "Gender_Str", "Nobility", "Book of Death")
+
+
+def _valor_nativo(valor):
+    """Valor da coluna em tipo do Python (inteiros do NumPy viram int, nulos viram None), como em /api/characters."""
+    if pd.isna(valor):
+        return None
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+class CuboAgregacoes:
+    def __init__(self, dataframe, dimensoes=DIMENSOES_CUBO):
+        """Agrega o DataFrame uma vez e materializa todos os 2^d agrupamentos (roll-ups) das dimensões.
+
+        As chaves dos roll-ups são os valores normalizados (normalizar_valor), comparados com os filtros da URL;
+        as respostas trazem o valor original da coluna (ex.: Nobility 1, não "1").
+        """
+        self.dimensoes = tuple(dim for dim in dimensoes if dim in dataframe.columns)
+        # {dimensão: {valor normalizado: valor original}}
+        self._nativos = {dim: {} for dim in self.dimensoes}
+        self._rollups = {}
+        for tamanho in range(len(self.dimensoes) + 1):
+            for subconjunto in combinations(self.dimensoes, tamanho):
+                self._rollups[subconjunto] = {}
+        self.adicionar(dataframe)
+
+    def _celulas_base(self, dataframe):
+        """Célula mais detalhada: {valores das dimensões: (personagens, mortes, soma dos anos, mortes com ano)}."""
+        base = dataframe[list(self.dimensoes)].copy()
+        mortos = dataframe["Morreu"] == 1
+        base["personagens"] = 1
+        base["mortes"] = mortos.astype("int64")
+        base["soma_anos_morte"] = dataframe["Death_Year"].where(mortos, 0).fillna(0).astype("int64")
+        base["mortes_com_ano"] = (mortos & dataframe["Death_Year"].notna()).astype("int64")
+
+        medidas = ["personagens", "mortes", "soma_anos_morte", "mortes_com_ano"]
+        if not self.dimensoes:
+            return {(): tuple(int(x) for x in base[medidas].sum())}
+        celulas = base.groupby(list(self.dimensoes), observed=True, dropna=False)[medidas].sum()
+        resultado = {}
+        for chave, linha in zip(celulas.index, celulas.to_numpy()):
+            chave_normalizada = []
+            for dim, valor in zip(self.dimensoes, chave if isinstance(chave, tuple) else (chave,)):
+                normalizado = normalizar_valor(valor)
+                self._nativos[dim].setdefault(normalizado, _valor_nativo(valor))
+                chave_normalizada.append(normalizado)
+            resultado[tuple(chave_normalizada)] = tuple(int(x) for x in linha)
+        return resultado
+
+    def adicionar(self, dataframe, sinal=1):
+        """Soma (sinal=-1 desconta) as linhas de `dataframe` em todos os roll-ups.
+
+        Cada roll-up é atualizado a partir das células base (poucas), não reagrupando o DataFrame;
+        para um registro novo o custo é de 2^d atualizações de dicionário.
+        """
+        for chave, medidas_celula in self._celulas_base(dataframe).items():
+            valores = dict(zip(self.dimensoes, chave))
+            for dimensoes, agregado in self._rollups.items():
+                chave_rollup = tuple(valores[dim] for dim in dimensoes)
+                atual = agregado.get(chave_rollup, (0, 0, 0, 0))
+                novo = tuple(a + sinal * b for a, b in zip(atual, medidas_celula))
+                if novo[0]:
+                    agregado[chave_rollup] = novo
+                else:
+                    # Célula sem personagens após uma remoção não aparece no detalhamento
+                    agregado.pop(chave_rollup, None)
+        return self
+
+    def copia(self):
+        """Cópia dos roll-ups (custo proporcional às células, não às linhas) para incluir registros sem alterar este cubo."""
+        copia = copy.copy(self)
+        copia._rollups = {dimensoes: dict(agregado) for dimensoes, agregado in self._rollups.items()}
+        copia._nativos = {dim: dict(valores) for dim, valores in self._nativos.items()}
+        return copia
+
+    def _ordenar(self, dimensoes):
+        """Coloca as dimensões na ordem do cubo (a chave dos roll-ups)."""
+        desconhecidas = [dim for dim in dimensoes if dim not in self.dimensoes]
+        if desconhecidas:
+            raise KeyError(f"Dimensões fora do cubo: {', '.join(desconhecidas)}.")
+        return tuple(dim for dim in self.dimensoes if dim in set(dimensoes))
+
+    def celula(self, **valores):
+        """Medidas de uma célula em tempo constante, ex.: celula(Allegiances='Stark', Nobility=1)."""
+        dimensoes = self._ordenar(valores)
+        chave = tuple(normalizar_valor(valores[dim]) for dim in dimensoes)
+        return self._formatar(self._valores(dimensoes, chave), self._rollups[dimensoes].get(chave, (0, 0, 0, 0)))
+
+    def detalhar(self, por, filtros=None):
+        """Agrupa por `por` (lista de dimensões), restrito aos valores de `filtros` ({dimensão: [valores]}).
+
+        Usa o roll-up já materializado de `por` ∪ dimensões filtradas; custo proporcional às células, não às linhas.
+        """
+        filtros = {dim: {normalizar_valor(v) for v in valores} for dim, valores in (filtros or {}).items()}
+        por = self._ordenar(por)
+        dimensoes = self._ordenar(set(por) | set(filtros))
+
+        resultado = {}
+        for chave, medidas in self._rollups[dimensoes].items():
+            valores = dict(zip(dimensoes, chave))
+            if any(valores[dim] not in aceitos for dim, aceitos in filtros.items()):
+                continue
+            chave_saida = tuple(valores[dim] for dim in por)
+            atual = resultado.get(chave_saida)
+            resultado[chave_saida] = medidas if atual is None else tuple(a + b for a, b in zip(atual, medidas))
+
+        # Empates na ordem dos valores normalizados (textos), que sempre são comparáveis entre si
+        ordenado = sorted(resultado.items(), key=lambda item: (-item[1][0], item[0]))
+        return [self._formatar(self._valores(por, chave), medidas) for chave, medidas in ordenado]
+
+    def _valores(self, dimensoes, chave):
+        """{dimensão: valor original} de uma chave normalizada (valores nunca vistos ficam como vieram)."""
+        return {dim: self._nativos[dim].get(valor, valor) for dim, valor in zip(dimensoes, chave)}
+
+    @staticmethod
+    def _formatar(valores, medidas):
+        personagens, mortes, soma_anos, mortes_com_ano = medidas
+        linha = dict(valores)
+        linha["personagens"] = personagens
+        linha["mortes"] = mortes
+        linha["taxa_mortalidade"] = round(mortes / personagens, 4) if personagens else None
+        linha["media_ano_morte"] = round(soma_anos / mortes_com_ano, 2) if mortes_com_ano else None
+        return linha
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    import pandas as pd
+
+    dados = {
+        'Allegiances': ['Stark', 'Stark', 'Lannister', 'Stark'],
+        'Gender_Str': ['Feminino', 'Masculino', 'Masculino', 'Masculino'],
+        'Nobility': [1, 1, 1, 0],
+        'Book of Death': [0, 1, 3, 0],
+        'Death_Year': [0, 299, 300, 0],
+        'Morreu': [0, 1, 1, 0],
+    }
+    cubo = CuboAgregacoes(pd.DataFrame(dados))
+    print(cubo.celula(Allegiances='Stark'))
+    print(cubo.detalhar(['Allegiances'], filtros={'Gender_Str': ['Masculino']}))
@@ -1,65 +1,117 @@
 # Corrigido: DataAnalise.py
+import logging
+
+import numpy as np
 import pandas as pd
 
+from Metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# Colunas numéricas do formato character-deaths.csv (nulos viram 0)
+COLUNAS_NUMERICAS = ["Death_Year", "Book of Death", "Death Chapter", "Book Intro Chapter", "GoT", "CoK", "SoS", "FfC", "DwD"]
+
+def copy_on_write_ativo():
+    """Indica se o pandas está com copy-on-write (padrão a partir do pandas 3)."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+def copiar_dataframe(dataframe, copiar=True):
+    """Aplica o contrato de posse do pipeline.
+
+    copiar=False: quem recebe passa a ser dono do DataFrame e o altera no lugar (sem cópia).
+    copiar=True: o original é preservado; com copy-on-write ativo a cópia é rasa e só as
+    colunas efetivamente alteradas são duplicadas.
+    """
+    if not copiar:
+        return dataframe
+    return dataframe.copy(deep=not copy_on_write_ativo())
+
 class DataAnalise:
-    def __init__(self, dataframe):
-        """Inicializa a análise de dados."""
-        self.df = dataframe.copy()  # Faz uma cópia para evitar modificar o original
+    def __init__(self, dataframe, copiar=True):
+        """Inicializa a análise de dados.
+
+        Com copiar=False o DataAnalise passa a ser dono do DataFrame e o altera no lugar;
+        use quando o chamador não precisa mais da versão bruta (ex.: logo após DataLoader.load).
+        """
+        self.df = copiar_dataframe(dataframe, copiar)  # Evita modificar o original, salvo se copiar=False
 
     def tratar_nulos_e_brancos(self):
-        """Substitui strings vazias ou contendo apenas espaços por NaN e preenche NaN com 0."""
-        # Substitui strings vazias ou com espaços por NaN
-        self.df.replace(r'^\s*$', pd.NA, regex=True, inplace=True)
-        # Preenche valores NA/NaN com 0 (cuidado: isso pode não ser ideal para todas as colunas)
-        # Vamos preencher apenas colunas numéricas relevantes com 0 ou mediana/média se apropriado
-        colunas_numericas = ["Death_Year", "Book of Death", "Death Chapter", "Book Intro Chapter", "GoT", "CoK", "SoS", "FfC", "DwD"]
-        for col in colunas_numericas:
-            if col in self.df.columns:
-                # Converte para numérico, forçando erros para NaN
-                self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
-                # Preenche NaN com 0
-                self.df[col].fillna(0, inplace=True)
-        
-        # Preenche NaN em colunas categóricas com 'Desconhecido' ou ''
+        """Substitui strings vazias ou contendo apenas espaços por NaN e preenche os nulos."""
+        # Strings em branco só podem existir em colunas de texto; as numéricas não precisam ser varridas.
+        # Verifica apenas os valores distintos de cada coluna (poucos em 'Allegiances', por exemplo).
+        for col in self.df.select_dtypes(include=["object", "string"]).columns:
+            serie = self.df[col]
+            brancos = [valor for valor in pd.unique(serie.to_numpy()) if isinstance(valor, str) and not valor.strip()]
+            if brancos:
+                self.df[col] = serie.mask(serie.isin(brancos))
+        # Em colunas categóricas basta remover as categorias em branco (os valores viram nulos)
+        for col in self.df.select_dtypes(include=["category"]).columns:
+            categorias = self.df[col].cat.categories
+            brancos = [valor for valor in categorias if isinstance(valor, str) and not valor.strip()]
+            if brancos:
+                self.df[col] = self.df[col].cat.remove_categories(brancos)
+
+        # Converte de uma vez as colunas numéricas que ainda não são numéricas (erros viram NaN)
+        colunas_numericas = [col for col in COLUNAS_NUMERICAS if col in self.df.columns]
+        a_converter = [col for col in colunas_numericas if not pd.api.types.is_numeric_dtype(self.df[col])]
+        if a_converter:
+            self.df[a_converter] = self.df[a_converter].apply(pd.to_numeric, errors="coerce")
+
+        # Preenche todos os nulos em uma única passada:
+        # numéricas com 0, 'Allegiances' com 'Desconhecido' e 'Gender'/'Nobility' com -1 (desconhecido)
+        valores = {col: 0 for col in colunas_numericas}
         if 'Allegiances' in self.df.columns:
-            self.df['Allegiances'].fillna('Desconhecido', inplace=True)
+            valores['Allegiances'] = 'Desconhecido'
+            # Coluna categórica só aceita preencher com uma categoria existente
+            alegiancias = self.df['Allegiances']
+            if isinstance(alegiancias.dtype, pd.CategoricalDtype) and 'Desconhecido' not in alegiancias.cat.categories:
+                self.df['Allegiances'] = alegiancias.cat.add_categories('Desconhecido')
         if 'Gender' in self.df.columns:
-             # Gender já é numérico (0 ou 1), preenche NaN com um valor padrão (ex: -1 ou mantém NaN)
-             self.df['Gender'].fillna(-1, inplace=True) # Usando -1 para indicar desconhecido/não preenchido
+            valores['Gender'] = -1
         if 'Nobility' in self.df.columns:
-             self.df['Nobility'].fillna(-1, inplace=True)
+            valores['Nobility'] = -1
+        self.df.fillna(valores, inplace=True)
 
     def codificar_genero(self):
         """Codifica a coluna 'Gender' e retorna contagem dos valores."""
         if 'Gender' in self.df.columns:
-            # Garante que a coluna é numérica
-            self.df['Gender'] = pd.to_numeric(self.df['Gender'], errors='coerce').fillna(-1).astype(int)
-            # Mapeia os valores numéricos para strings descritivas
+            # Garante que a coluna é numérica e compacta (int8)
+            self.df['Gender'] = pd.to_numeric(self.df['Gender'], errors='coerce').fillna(-1).astype("int8")
+            # Mapeia os valores numéricos para strings descritivas (categórica: 1 byte por linha)
             gender_map = {1: 'Masculino', 0: 'Feminino', -1: 'Desconhecido'}
-            self.df['Gender_Str'] = self.df['Gender'].map(gender_map)
-            print("Coluna 'Gender_Str' criada.")
+            self.df['Gender_Str'] = self.df['Gender'].map(gender_map).astype("category")
+            logger.debug("Coluna 'Gender_Str' criada.")
             return self.df['Gender_Str'].value_counts().to_dict()
         else:
-            print("Aviso: Coluna 'Gender' não encontrada no DataFrame.")
+            logger.warning("Coluna 'Gender' não encontrada no DataFrame.")
             return {}
 
     def contabilizar_morte(self):
         """Cria uma coluna 'Morreu' (1 se Death_Year > 0, senão 0)."""
         if 'Death_Year' in self.df.columns:
-             # Garante que Death_Year é numérico
-            self.df['Death_Year'] = pd.to_numeric(self.df['Death_Year'], errors='coerce').fillna(0)
-            self.df['Morreu'] = self.df['Death_Year'].apply(lambda x: 1 if x > 0 else 0)
-            print("Coluna 'Morreu' criada.")
+            # Garante que Death_Year é numérico (sem custo se tratar_nulos_e_brancos já rodou)
+            if not pd.api.types.is_numeric_dtype(self.df['Death_Year']):
+                self.df['Death_Year'] = pd.to_numeric(self.df['Death_Year'], errors='coerce')
+            self.df['Death_Year'] = self.df['Death_Year'].fillna(0)
+            # Comparação vetorizada em NumPy em vez de uma chamada Python por linha
+            anos = self.df['Death_Year'].to_numpy(dtype="float64", na_value=0)
+            self.df['Morreu'] = (anos > 0).astype(np.int8)
+            logger.debug("Coluna 'Morreu' criada.")
         else:
-            print("Aviso: Coluna 'Death_Year' não encontrada no DataFrame.")
+            logger.warning("Coluna 'Death_Year' não encontrada no DataFrame.")
 
     def processar(self):
         """Executa pré-processamento dos dados e retorna o DataFrame atualizado."""
-        print("Iniciando pré-processamento...")
-        self.tratar_nulos_e_brancos()
-        contagem_genero = self.codificar_genero()
-        self.contabilizar_morte()
-        print("Pré-processamento concluído.")
+        logger.debug("Iniciando pré-processamento...")
+        with metricas.etapa("DataAnalise.processar") as etapa:
+            self.tratar_nulos_e_brancos()
+            contagem_genero = self.codificar_genero()
+            self.contabilizar_morte()
+            etapa.linhas = len(self.df)
+            etapa.memoria_bytes = int(self.df.memory_usage(deep=False).sum())
+        logger.debug("Pré-processamento concluído.")
         return self.df, contagem_genero  # Retorna o DataFrame atualizado e a contagem de gênero
 
 # Exemplo de uso (adaptado para novas colunas)
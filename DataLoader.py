@@ -1,11 +1,100 @@
 # Corrigido: DataLoader.py
+import numpy as np
 import pandas as pd
+import glob
+import hashlib
+import logging
 import os
 
+from DataAnalise import DataAnalise
+from IdsRegistros import gerar_ids
+from Metricas import metricas
+
+logger = logging.getLogger(__name__)
+
+# pyarrow é opcional: sem ele o cache colunar é simplesmente desativado
+try:
+    import pyarrow.feather as feather
+except ImportError:
+    feather = None
+
+# Incrementar sempre que ESQUEMA_COLUNAS ou o pré-processamento do DataAnalise mudarem,
+# para que caches gravados por versões anteriores do código sejam ignorados
+VERSAO_FORMATO_CACHE = 2
+
+# Esquema declarado do formato character-deaths.csv, aplicado já na leitura.
+# Colunas sempre preenchidas usam int8 do NumPy (a leitura de inteiros anuláveis é bem mais lenta);
+# anos e capítulos, que têm células vazias, usam inteiros anuláveis (Int8/Int16) em vez de float64.
+ESQUEMA_COLUNAS = {
+    # 'Name' tem praticamente um valor distinto por linha; como 'category' ocuparia mais memória, fica 'object'
+    "Name": "object",
+    "Allegiances": "category",
+    "Death_Year": "Int16",
+    "Book of Death": "Int8",
+    "Death Chapter": "Int16",
+    "Book Intro Chapter": "Int16",
+    "Gender": "int8",
+    "Nobility": "int8",
+    "GoT": "int8",
+    "CoK": "int8",
+    "SoS": "int8",
+    "FfC": "int8",
+    "DwD": "int8",
+}
+
+def _dtypes_leitura():
+    """Tipos passados ao read_csv: inteiros anuláveis são lidos como float32 (caminho rápido do parser)."""
+    return {col: ("float32" if tipo[0] == "I" else tipo) for col, tipo in ESQUEMA_COLUNAS.items()}
+
+def _compactar_inteiros(serie, tipo):
+    """Converte a série para o inteiro do esquema; retorna None se houver valores fracionários ou fora da faixa."""
+    valores = pd.to_numeric(serie, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    nulos = np.isnan(valores)
+    preenchidos = np.where(nulos, 0, valores)
+    limites = np.iinfo(tipo.lower())
+    if len(preenchidos) and (
+        (preenchidos != np.round(preenchidos)).any()
+        or preenchidos.min() < limites.min
+        or preenchidos.max() > limites.max
+    ):
+        return None
+    inteiros = preenchidos.astype(tipo.lower())
+    if tipo[0] == "i" and not nulos.any():
+        return inteiros
+    # Coluna anulável (ou int8 com nulos): monta o array mascarado diretamente, sem conversão elemento a elemento
+    return pd.arrays.IntegerArray(inteiros, nulos)
+
+def aplicar_esquema(df):
+    """Converte as colunas conhecidas para os tipos do esquema, transformando valores inválidos em nulos."""
+    for col, tipo in ESQUEMA_COLUNAS.items():
+        if col not in df.columns or str(df[col].dtype) == tipo:
+            continue
+        if tipo == "category":
+            df[col] = df[col].astype("category")
+        elif tipo != "object":
+            compactado = _compactar_inteiros(df[col], tipo)
+            # Valores fracionários ou fora da faixa: mantém a coluna numérica sem compactar
+            df[col] = compactado if compactado is not None else pd.to_numeric(df[col], errors="coerce")
+    return df
+
+def ids_registros(df, existentes=()):
+    """IDs estáveis (IdsRegistros.gerar_ids) das linhas, a partir de 'Name' e 'Allegiances'."""
+    alegiancias = df["Allegiances"] if "Allegiances" in df.columns else [None] * len(df)
+    return gerar_ids(df["Name"], alegiancias, existentes)
+
+def relatorio_memoria(df):
+    """Retorna o tipo e a memória (bytes, incluindo strings) de cada coluna, com uma linha de total."""
+    memoria = df.memory_usage(deep=True, index=False)
+    relatorio = pd.DataFrame({"dtype": df.dtypes.astype(str), "bytes": memoria})
+    relatorio.loc["Total"] = ["", int(memoria.sum())]
+    return relatorio
+
 class DataLoader:
-    def __init__(self, caminho_arquivo, sep=";"):
+    def __init__(self, caminho_arquivo, sep=";", usar_esquema=True):
         self.caminho_arquivo = caminho_arquivo
         self.sep = sep
+        # Com usar_esquema=False o CSV é lido com os tipos inferidos pelo pandas (comportamento antigo)
+        self.usar_esquema = usar_esquema
 
     def load(self):
         """Carrega dados do arquivo CSV e adiciona uma coluna ID."""
@@ -13,12 +102,114 @@ class DataLoader:
             raise FileNotFoundError(f"Arquivo CSV não encontrado: {self.caminho_arquivo}")
         
         try:
-            df = pd.read_csv(self.caminho_arquivo, sep=self.sep, encoding="utf-8")
-            # Adiciona uma coluna ID baseada no índice
-            df["ID"] = df.index
-            print(f"Dados carregados de {self.caminho_arquivo}. Colunas: {df.columns.tolist()}")
+            with metricas.etapa("DataLoader.load") as etapa:
+                if self.usar_esquema:
+                    try:
+                        df = pd.read_csv(self.caminho_arquivo, sep=self.sep, encoding="utf-8", dtype=_dtypes_leitura())
+                    except (TypeError, ValueError):
+                        # Algum valor não é numérico: lê sem tipos; aplicar_esquema coage os inválidos para nulo
+                        df = pd.read_csv(self.caminho_arquivo, sep=self.sep, encoding="utf-8")
+                    df = aplicar_esquema(df)
+                else:
+                    df = pd.read_csv(self.caminho_arquivo, sep=self.sep, encoding="utf-8")
+                # IDs estáveis derivados do nome e da casa (não mudam se as linhas forem reordenadas)
+                df["ID"] = ids_registros(df)
+                etapa.linhas = len(df)
+                etapa.memoria_bytes = int(df.memory_usage(deep=False).sum())
+            logger.info("Dados carregados de %s. Colunas: %s", self.caminho_arquivo, df.columns.tolist())
             return df
         except Exception as e:
-            print(f"Erro ao carregar o arquivo CSV: {e}")
+            logger.error("Erro ao carregar o arquivo CSV: %s", e)
             return None
 
+    def load_em_blocos(self, tamanho_bloco=100_000):
+        """Lê o CSV em blocos de até `tamanho_bloco` linhas (gerador), com o esquema e a coluna ID de load()."""
+        if not os.path.exists(self.caminho_arquivo):
+            raise FileNotFoundError(f"Arquivo CSV não encontrado: {self.caminho_arquivo}")
+
+        # Sem tipos numéricos na leitura: um valor inválido no meio do arquivo não interrompe o fluxo,
+        # aplicar_esquema coage cada bloco (as categorias de 'Allegiances' podem variar entre blocos)
+        leitor = pd.read_csv(self.caminho_arquivo, sep=self.sep, encoding="utf-8",
+                             dtype={"Name": "object"}, chunksize=tamanho_bloco)
+        vistos = set()
+        with leitor:
+            for bloco in leitor:
+                if self.usar_esquema:
+                    bloco = aplicar_esquema(bloco)
+                # Os IDs dos blocos anteriores contam para as repetições: o ID é o mesmo que load() atribuiria
+                bloco["ID"] = ids_registros(bloco, vistos)
+                vistos.update(bloco["ID"])
+                yield bloco
+
+    def versao(self):
+        """Retorna o hash SHA-256 e o mtime do arquivo, usados para versionar caches."""
+        if not os.path.exists(self.caminho_arquivo):
+            raise FileNotFoundError(f"Arquivo CSV não encontrado: {self.caminho_arquivo}")
+
+        mtime = os.path.getmtime(self.caminho_arquivo)
+        sha = hashlib.sha256()
+        with open(self.caminho_arquivo, "rb") as arquivo:
+            for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+                sha.update(bloco)
+        return {"hash": sha.hexdigest(), "mtime": mtime}
+
+    def caminho_cache(self, versao):
+        """Caminho do cache colunar (Feather) do CSV processado, ao lado do CSV e identificado pelo hash."""
+        base, _ = os.path.splitext(self.caminho_arquivo)
+        return f"{base}.{versao['hash'][:16]}.v{VERSAO_FORMATO_CACHE}.feather"
+
+    def load_processado(self, versao=None, usar_cache=True):
+        """Retorna (df_processado, contagem_genero), lendo do cache Feather quando ele está em dia com o CSV."""
+        if versao is None:
+            versao = self.versao()
+        usar_cache = usar_cache and feather is not None
+        caminho_cache = self.caminho_cache(versao)
+
+        if usar_cache and os.path.exists(caminho_cache):
+            try:
+                # Arquivo sem compressão lido via memory map: o custo é dominado pelo mmap, não pelo parse
+                with metricas.etapa("DataLoader.cache_feather") as etapa:
+                    df_processado = feather.read_table(caminho_cache, memory_map=True).to_pandas()
+                    etapa.linhas = len(df_processado)
+                    etapa.memoria_bytes = int(df_processado.memory_usage(deep=False).sum())
+                logger.info("Dados processados carregados do cache %s.", caminho_cache)
+                return df_processado, self._contar_generos(df_processado)
+            except Exception as e:
+                logger.warning("Cache %s ignorado (%s). Reprocessando o CSV.", caminho_cache, e)
+
+        df_raw = self.load()
+        if df_raw is None:
+            return None, None
+        # df_raw não é usado depois daqui: o DataAnalise pode processá-lo no lugar, sem cópia
+        df_processado, contagem_genero = DataAnalise(df_raw, copiar=False).processar()
+
+        if usar_cache:
+            self._gravar_cache(df_processado, caminho_cache)
+        return df_processado, contagem_genero
+
+    @staticmethod
+    def _contar_generos(df_processado):
+        """Mesma contagem retornada por DataAnalise.codificar_genero."""
+        if 'Gender_Str' not in df_processado.columns:
+            return {}
+        return df_processado['Gender_Str'].value_counts().to_dict()
+
+    def _gravar_cache(self, df_processado, caminho_cache):
+        """Grava o cache de forma atômica e remove caches de versões anteriores do mesmo CSV."""
+        temporario = f"{caminho_cache}.{os.getpid()}.tmp"
+        try:
+            feather.write_feather(df_processado.reset_index(drop=True), temporario, compression="uncompressed")
+            os.replace(temporario, caminho_cache)
+        except Exception as e:
+            logger.warning("Não foi possível gravar o cache %s: %s", caminho_cache, e)
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return
+
+        base, _ = os.path.splitext(self.caminho_arquivo)
+        for antigo in glob.glob(f"{glob.escape(base)}.*.feather"):
+            if antigo != caminho_cache:
+                try:
+                    os.remove(antigo)
+                except OSError:
+                    pass
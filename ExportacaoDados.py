@@ -0,0 +1,91 @@
+# ExportacaoDados.py - Exportação do dataset processado em blocos (NDJSON, CSV ou Arrow IPC)
+import io
+
+from IndiceRegistros import serializar_registros
+
+# pyarrow é opcional: sem ele o formato Arrow fica indisponível
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Formato -> tipo de conteúdo da resposta
+FORMATOS_EXPORTACAO = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def formatos_disponiveis():
+    return [formato for formato in FORMATOS_EXPORTACAO if formato != "arrow" or pa is not None]
+
+
+def registros_json(dataframe, posicoes, colunas=None, indice_registros=None):
+    """Lista de bytes JSON das linhas nas `posicoes`, projetadas em `colunas` (None = todas)."""
+    if colunas is None and indice_registros is not None:
+        # Sem projeção: reaproveita o JSON já serializado de cada registro
+        ids = dataframe["ID"].to_numpy()[posicoes].tolist()
+        return [indice_registros.obter_bytes(record_id) for record_id in ids]
+    return serializar_registros(dataframe.iloc[posicoes][colunas or list(dataframe.columns)])
+
+
+def _ndjson(dataframe, blocos, colunas, indice_registros):
+    for posicoes in blocos:
+        yield b"\n".join(registros_json(dataframe, posicoes, colunas, indice_registros)) + b"\n"
+
+
+def _csv(dataframe, blocos, colunas, sep):
+    colunas = colunas or list(dataframe.columns)
+    # O cabeçalho sai mesmo quando nenhum registro é selecionado
+    yield (sep.join(colunas) + "\r\n").encode("utf-8")
+    for posicoes in blocos:
+        texto = dataframe.iloc[posicoes][colunas].to_csv(sep=sep, index=False, header=False, lineterminator="\r\n")
+        yield texto.encode("utf-8")
+
+
+def _arrow(dataframe, blocos, colunas):
+    colunas = colunas or list(dataframe.columns)
+    # O esquema vem da primeira linha do DataFrame (em um frame vazio colunas 'object' não têm tipo);
+    # os blocos compartilham os mesmos tipos e categorias
+    esquema = pa.Schema.from_pandas(dataframe.iloc[:1][colunas], preserve_index=False)
+    destino = io.BytesIO()
+    with pa.ipc.new_stream(destino, esquema) as escritor:
+        for posicoes in blocos:
+            lote = pa.RecordBatch.from_pandas(dataframe.iloc[posicoes][colunas], schema=esquema, preserve_index=False)
+            escritor.write_batch(lote)
+            # Entrega o que já foi escrito e esvazia o buffer: a memória fica limitada a um bloco
+            yield destino.getvalue()
+            destino.seek(0)
+            destino.truncate()
+    yield destino.getvalue()
+
+
+def exportar(dataframe, blocos, formato, colunas=None, indice_registros=None, sep=";"):
+    """Gerador de bytes com as linhas de `dataframe` nas posições de cada bloco de `blocos`.
+
+    `blocos` é um iterável de arrays de posições (iloc), ex.: IndiceFiltros.posicoes_em_blocos.
+    """
+    if formato == "ndjson":
+        return _ndjson(dataframe, blocos, colunas, indice_registros)
+    if formato == "csv":
+        return _csv(dataframe, blocos, colunas, sep)
+    if formato == "arrow" and pa is not None:
+        return _arrow(dataframe, blocos, colunas)
+    raise ValueError(f"Formato '{formato}' indisponível. Use: {', '.join(formatos_disponiveis())}.")
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    import numpy as np
+    import pandas as pd
+
+    dados = {
+        'ID': [0, 1, 2],
+        'Name': ['Arya Stark', 'Jon Snow', 'Robb Stark'],
+        'Death_Year': [0, 0, 299],
+    }
+    df = pd.DataFrame(dados)
+    blocos = [np.array([0, 1]), np.array([2])]
+    print(b"".join(exportar(df, blocos, "csv")).decode())
+    print(b"".join(exportar(df, blocos, "ndjson", colunas=["Name"])).decode())
@@ -0,0 +1,113 @@
+# FigurasGraficos.py - Dados pré-agregados e figuras Plotly (em dict) dos gráficos do app.py
+# O plotly é importado só ao montar a primeira figura (as figuras ficam em cache no app.py)
+
+# Colunas usadas pelos gráficos e pelos filtros que podem ser aplicados a eles
+DIMENSOES_GRAFICOS = ["Gender_Str", "Nobility", "Morreu", "Death_Year"]
+
+CORES_GENERO = ['#3498DB', '#E74C3C', '#2ECC71', '#F39C12']
+COR_MORTES = '#E74C3C'
+
+LAYOUT_PADRAO = dict(
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)',
+    font_color='#2C3E50',
+    title_font_color='#2C3E50',
+    title_font_size=16,
+    title_font_weight='bold',
+)
+
+
+def pre_agregar(dataframe):
+    """Conta os personagens por combinação de gênero, nobreza, morte e ano (poucas linhas).
+
+    Feito uma vez por versão dos dados; as figuras saem desta tabela, sem voltar ao DataFrame.
+    """
+    colunas = [col for col in DIMENSOES_GRAFICOS if col in dataframe.columns]
+    agregado = dataframe.groupby(colunas, observed=True, dropna=False).size().rename("personagens").reset_index()
+    if "Death_Year" in agregado.columns:
+        # Death_Year é Int16 anulável; o Plotly recebe inteiros comuns
+        agregado = agregado[agregado["Death_Year"].notna()].astype({"Death_Year": "int64"})
+    return agregado
+
+
+def _filtrar(agregado, filtros):
+    """Aplica filtros {coluna: (valores aceitos)} à tabela pré-agregada."""
+    for coluna, valores in (filtros or ()):
+        if coluna in agregado.columns:
+            agregado = agregado[agregado[coluna].isin(valores)]
+    return agregado
+
+
+def figura_genero(agregado, filtros=None):
+    """Pizza da distribuição por gênero, como dict (None se não houver dados)."""
+    if "Gender_Str" not in agregado.columns:
+        return None
+    contagem = _filtrar(agregado, filtros).groupby("Gender_Str", observed=True)["personagens"].sum()
+    return figura_genero_de_contagem(contagem.to_dict())
+
+
+def figura_genero_de_contagem(contagem_genero):
+    """Pizza a partir de {gênero: personagens} (ex.: /api/gender_count)."""
+    contagem = sorted(((genero, n) for genero, n in contagem_genero.items() if n > 0), key=lambda item: -item[1])
+    if not contagem:
+        return None
+    import plotly.graph_objects as go
+
+    figura = go.Figure(go.Pie(
+        labels=[str(genero) for genero, _ in contagem],
+        values=[int(n) for _, n in contagem],
+        marker=dict(colors=CORES_GENERO),
+    ))
+    figura.update_layout(title="Distribuição por Gênero", **LAYOUT_PADRAO)
+    return figura.to_dict()
+
+
+def figura_mortes_por_ano(agregado, filtros=None):
+    """Barras de mortes por ano (contagens já agrupadas, sem re-binning), como dict."""
+    if "Death_Year" not in agregado.columns or "Morreu" not in agregado.columns:
+        return None
+    mortos = _filtrar(agregado, filtros)
+    mortos = mortos[mortos["Morreu"] == 1]
+    return figura_mortes_de_contagem(mortos.groupby("Death_Year")["personagens"].sum().to_dict())
+
+
+def figura_mortes_de_contagem(mortes_por_ano):
+    """Barras a partir de {ano: mortes}."""
+    por_ano = sorted((int(ano), int(n)) for ano, n in mortes_por_ano.items() if n > 0)
+    if not por_ano:
+        return None
+    import plotly.graph_objects as go
+
+    figura = go.Figure(go.Bar(
+        x=[ano for ano, _ in por_ano],
+        y=[n for _, n in por_ano],
+        marker_color=COR_MORTES,
+    ))
+    figura.update_layout(
+        title="Mortes por Ano",
+        xaxis_title="Ano",
+        yaxis_title="Número de Mortes",
+        bargap=0,
+        **LAYOUT_PADRAO,
+    )
+    return figura.to_dict()
+
+
+def estado_filtros(**filtros):
+    """Forma canônica e hashável de um estado de filtros, usada como chave de cache das figuras."""
+    return tuple(sorted((coluna, tuple(sorted(valores, key=str))) for coluna, valores in filtros.items()))
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    import pandas as pd
+
+    dados = {
+        'Gender_Str': ['Feminino', 'Masculino', 'Masculino', 'Feminino'],
+        'Nobility': [1, 1, 0, 1],
+        'Morreu': [0, 1, 1, 1],
+        'Death_Year': [0, 299, 299, 300],
+    }
+    agregado = pre_agregar(pd.DataFrame(dados))
+    print(agregado)
+    print(figura_mortes_por_ano(agregado, estado_filtros(Nobility=[1]))["data"])
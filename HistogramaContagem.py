@@ -0,0 +1,143 @@
+# HistogramaContagem.py - Histograma de contagem para colunas inteiras de domínio pequeno (anos, capítulos)
+import math
+
+
+def _chave(valor):
+    """Anos e capítulos vêm como int, float ou tipos do numpy; 299.0 e 299 viram a mesma chave int."""
+    valor = float(valor)
+    return int(valor) if valor.is_integer() else valor
+
+
+class HistogramaContagem:
+    def __init__(self, contagens=None):
+        """Guarda valor -> quantidade, além de total, soma e soma dos quadrados (exatos para inteiros).
+
+        Mediana, percentis, moda e desvio padrão saem do histograma em O(valores distintos),
+        sem ordenar as linhas. Aceita inclusão e remoção de valores e pode ser mesclado com outro.
+        """
+        self.contagens = {}
+        self.total = 0
+        self.soma = 0
+        self.soma_quadrados = 0
+        for valor, n in (contagens or {}).items():
+            self.adicionar(valor, n)
+
+    @classmethod
+    def de_serie(cls, serie):
+        """Cria o histograma a partir de uma Series (valores nulos são ignorados)."""
+        return cls().adicionar_serie(serie)
+
+    def adicionar(self, valor, n=1):
+        """Conta `n` ocorrências de `valor`."""
+        if n == 0:
+            return self
+        valor = _chave(valor)
+        n = int(n)
+        restante = self.contagens.get(valor, 0) + n
+        if restante < 0:
+            raise ValueError(f"Remoção de {-n} ocorrência(s) de {valor}, mas só há {restante - n}.")
+        if restante:
+            self.contagens[valor] = restante
+        else:
+            del self.contagens[valor]
+        self.total += n
+        self.soma += valor * n
+        self.soma_quadrados += valor * valor * n
+        return self
+
+    def remover(self, valor, n=1):
+        """Desconta `n` ocorrências de `valor` (ValueError se ele não estiver no histograma)."""
+        return self.adicionar(valor, -n)
+
+    def adicionar_serie(self, serie, sinal=1):
+        """Conta todos os valores não nulos de uma Series (sinal=-1 remove)."""
+        for valor, n in serie.value_counts(dropna=True).items():
+            self.adicionar(valor, sinal * int(n))
+        return self
+
+    def copia(self):
+        """Cópia independente (O(valores distintos)): incluir ou remover nela não altera este histograma."""
+        copia = HistogramaContagem()
+        copia.contagens = dict(self.contagens)
+        copia.total, copia.soma, copia.soma_quadrados = self.total, self.soma, self.soma_quadrados
+        return copia
+
+    def mesclar(self, outro):
+        """Soma as contagens de outro histograma (outro bloco, arquivo ou worker)."""
+        for valor, n in outro.contagens.items():
+            self.adicionar(valor, n)
+        return self
+
+    def __len__(self):
+        return self.total
+
+    def minimo(self):
+        return min(self.contagens) if self.contagens else None
+
+    def maximo(self):
+        return max(self.contagens) if self.contagens else None
+
+    def media(self):
+        return self.soma / self.total if self.total else float("nan")
+
+    def variancia(self, ddof=1):
+        """Variância (amostral por padrão, como o pandas), calculada com as somas exatas."""
+        n = self.total
+        if n - ddof <= 0:
+            return float("nan")
+        return (n * self.soma_quadrados - self.soma ** 2) / (n * (n - ddof))
+
+    def desvio_padrao(self, ddof=1):
+        variancia = self.variancia(ddof)
+        return math.sqrt(variancia) if not math.isnan(variancia) else variancia
+
+    def moda(self):
+        """Valor mais frequente (o menor deles em caso de empate)."""
+        if not self.contagens:
+            return None
+        return min(self.contagens, key=lambda valor: (-self.contagens[valor], valor))
+
+    def percentis(self, quantis):
+        """Quantis exatos com interpolação linear (mesmo resultado de Series.quantile), em uma passada."""
+        if not self.contagens:
+            return [float("nan") for _ in quantis]
+
+        # Posições (0-based) necessárias na sequência ordenada: piso e teto de (n - 1) * q
+        alvos = {}
+        for q in quantis:
+            if not 0 <= q <= 1:
+                raise ValueError(f"Quantil {q} fora do intervalo [0, 1].")
+            posicao = (self.total - 1) * q
+            alvos[math.floor(posicao)] = None
+            alvos[math.ceil(posicao)] = None
+
+        pendentes = sorted(alvos)
+        acumulado = 0
+        for valor in sorted(self.contagens):
+            acumulado += self.contagens[valor]
+            while pendentes and pendentes[0] < acumulado:
+                alvos[pendentes.pop(0)] = valor
+            if not pendentes:
+                break
+
+        resultado = []
+        for q in quantis:
+            posicao = (self.total - 1) * q
+            abaixo, acima = alvos[math.floor(posicao)], alvos[math.ceil(posicao)]
+            resultado.append(abaixo + (acima - abaixo) * (posicao - math.floor(posicao)))
+        return resultado
+
+    def quantil(self, q):
+        return self.percentis([q])[0]
+
+    def mediana(self):
+        return self.quantil(0.5)
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    anos = HistogramaContagem({297: 1, 298: 2, 299: 5, 300: 4})
+    print(f"Mediana: {anos.mediana()}  Moda: {anos.moda()}  Desvio: {anos.desvio_padrao():.2f}")
+    print(f"Percentis 10/90: {anos.percentis([0.1, 0.9])}")
+    anos.remover(299, 2).mesclar(HistogramaContagem({300: 3}))
+    print(f"Após remover e mesclar: total={anos.total} mediana={anos.mediana()}")
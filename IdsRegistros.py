@@ -0,0 +1,223 @@
+# IdsRegistros.py - IDs estáveis (hash do nome + casa) e índice persistente ID -> posição da linha no CSV
+import csv
+import glob
+import hashlib
+import io
+import logging
+import os
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Incrementar se a chave ou o hash dos IDs mudarem (invalida os índices de posições gravados)
+VERSAO_FORMATO_IDS = 1
+
+# Bytes lidos por vez ao procurar o início das linhas do CSV
+TAMANHO_BLOCO_LEITURA = 64 * 1024 * 1024
+
+
+def _normalizar(texto):
+    """Texto sem diferença de maiúsculas, espaços ou forma Unicode; ausente (NaN/None) vira vazio."""
+    if not isinstance(texto, str):
+        texto = "" if texto is None or pd.isna(texto) else str(texto)
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKC", texto)
+    return " ".join(texto.split()).casefold()
+
+
+def _normalizar_coluna(valores):
+    # Cada valor distinto é normalizado uma vez (poucos em 'Allegiances'); o código -1 (nulo) pega o "" do fim
+    codigos, distintos = pd.factorize(pd.Series(valores, dtype=object))
+    normalizados = np.array([_normalizar(valor) for valor in distintos] + [""], dtype=object)
+    return normalizados[codigos]
+
+
+def chave_registro(nome, alegiancia):
+    """Chave normalizada de um personagem: nome e casa (casa ausente e casa vazia geram a mesma chave)."""
+    return f"{_normalizar(nome)}\x1f{_normalizar(alegiancia)}"
+
+
+def _hash(chave):
+    return hashlib.blake2b(chave.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def gerar_ids(nomes, alegiancias, existentes=()):
+    """IDs de 16 caracteres hexadecimais derivados do conteúdo, na ordem dos registros.
+
+    O mesmo personagem recebe o mesmo ID em qualquer posição do arquivo. Registros com a mesma chave
+    (ou, raramente, com o mesmo hash) recebem o hash de "chave#1", "chave#2"... na ordem em que aparecem.
+    `existentes` são IDs já atribuídos (ex.: o índice de registros ao incluir registros novos).
+    """
+    chaves = _normalizar_coluna(nomes) + "\x1f" + _normalizar_coluna(alegiancias)
+    ids = []
+    usados = set()
+    for chave in chaves.tolist():
+        record_id = _hash(chave)
+        repeticao = 0
+        while record_id in usados or record_id in existentes:
+            repeticao += 1
+            record_id = _hash(f"{chave}#{repeticao}")
+        usados.add(record_id)
+        ids.append(record_id)
+    return ids
+
+
+def posicoes_linhas(caminho_csv):
+    """Posição (em bytes) do início de cada linha de dados do CSV, na ordem em que o pandas as lê.
+
+    Quebras de linha dentro de campos entre aspas não encerram o registro e linhas em branco são puladas,
+    como no read_csv. A primeira linha (cabeçalho) não entra.
+    """
+    inicios = []
+    aspas_abertas = False
+    deslocamento = 0
+    with open(caminho_csv, "rb") as arquivo:
+        while bloco := arquivo.read(TAMANHO_BLOCO_LEITURA):
+            dados = np.frombuffer(bloco, dtype=np.uint8)
+            # Paridade das aspas antes de cada byte: quebras de linha com aspas abertas são parte do campo
+            aspas = np.cumsum(dados == ord('"')) + aspas_abertas
+            quebras = np.flatnonzero((dados == ord("\n")) & (aspas % 2 == 0))
+            inicios.append(quebras + 1 + deslocamento)
+            aspas_abertas = bool(aspas[-1] % 2)
+            deslocamento += len(bloco)
+        tamanho = deslocamento
+
+    inicios = np.concatenate(inicios) if inicios else np.empty(0, dtype=np.int64)
+    inicios = inicios[inicios < tamanho]
+    if not len(inicios):
+        return inicios
+
+    # Linhas em branco ("\n" ou "\r\n" logo após outra quebra) não são registros
+    with open(caminho_csv, "rb") as arquivo:
+        mapa = np.memmap(arquivo, dtype=np.uint8, mode="r")
+        primeiro = mapa[inicios]
+        segundo = mapa[np.minimum(inicios + 1, tamanho - 1)]
+        em_branco = (primeiro == ord("\n")) | ((primeiro == ord("\r")) & (segundo == ord("\n")))
+        del mapa
+    return inicios[~em_branco].astype(np.int64)
+
+
+class IndiceOffsets:
+    def __init__(self, tabela, caminho_csv, sep=";"):
+        """Índice ID -> posição da linha no CSV.
+
+        `tabela` é um array estruturado (id, offset) ordenado por ID: a busca é binária e funciona
+        direto do arquivo mapeado em memória, sem carregá-lo.
+        """
+        self.tabela = tabela
+        self.caminho_csv = caminho_csv
+        self.sep = sep
+        self._cabecalho = None
+
+    @staticmethod
+    def caminho_indice(caminho_csv, versao):
+        """Arquivo do índice ao lado do CSV, identificado pelo hash do conteúdo (como o cache Feather)."""
+        base, _ = os.path.splitext(caminho_csv)
+        return f"{base}.{versao['hash'][:16]}.v{VERSAO_FORMATO_IDS}.offsets.npy"
+
+    @classmethod
+    def carregar(cls, caminho_csv, versao, sep=";"):
+        """Abre o índice gravado para esta versão do CSV (mmap, sem ler o arquivo todo); None se não houver."""
+        caminho = cls.caminho_indice(caminho_csv, versao)
+        if not os.path.exists(caminho):
+            return None
+        return cls(np.load(caminho, mmap_mode="r"), caminho_csv, sep)
+
+    @classmethod
+    def construir(cls, caminho_csv, versao, ids, sep=";"):
+        """Lê o início das linhas do CSV, monta o índice com os IDs (na ordem do arquivo) e grava em disco.
+
+        Retorna None se o número de linhas não bater com o de IDs.
+        """
+        offsets = posicoes_linhas(caminho_csv)
+        if len(offsets) != len(ids):
+            logger.warning("Índice de posições não criado: %d linhas em %s e %d IDs.", len(offsets), caminho_csv, len(ids))
+            return None
+        tabela = np.empty(len(ids), dtype=[("id", "S16"), ("offset", "<u8")])
+        tabela["id"] = ids
+        tabela["offset"] = offsets
+        tabela.sort(order="id")
+        indice = cls(tabela, caminho_csv, sep)
+        indice._gravar(cls.caminho_indice(caminho_csv, versao))
+        return indice
+
+    def _gravar(self, caminho):
+        """Grava o índice de forma atômica e remove os índices de versões anteriores do mesmo CSV."""
+        temporario = f"{caminho}.{os.getpid()}.tmp.npy"
+        try:
+            np.save(temporario, self.tabela)
+            os.replace(temporario, caminho)
+        except Exception as e:
+            logger.warning("Não foi possível gravar o índice de posições %s: %s", caminho, e)
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return
+
+        base, _ = os.path.splitext(self.caminho_csv)
+        for antigo in glob.glob(f"{glob.escape(base)}.*.offsets.npy"):
+            if antigo != caminho:
+                try:
+                    os.remove(antigo)
+                except OSError:
+                    pass
+
+    @classmethod
+    def abrir(cls, caminho_csv, versao, ids, sep=";"):
+        """Usa o índice gravado para esta versão do CSV ou o constrói."""
+        indice = cls.carregar(caminho_csv, versao, sep)
+        if indice is None or len(indice) != len(ids):
+            indice = cls.construir(caminho_csv, versao, ids, sep)
+        return indice
+
+    def __len__(self):
+        return len(self.tabela)
+
+    def offset(self, record_id):
+        """Posição (bytes) da linha do registro no CSV, ou None se o ID não estiver no índice."""
+        chave = str(record_id).encode("ascii", "ignore")
+        ids = self.tabela["id"]
+        posicao = int(np.searchsorted(ids, chave))
+        if posicao < len(ids) and ids[posicao] == chave:
+            return int(self.tabela["offset"][posicao])
+        return None
+
+    def ler_registro(self, record_id):
+        """Lê só a linha do registro no CSV (cabeçalho + um registro) e retorna {coluna: texto ou None}."""
+        offset = self.offset(record_id)
+        if offset is None:
+            return None
+        with open(self.caminho_csv, "rb") as arquivo:
+            if self._cabecalho is None:
+                self._cabecalho = self._ler_linha(arquivo)
+            arquivo.seek(offset)
+            linha = self._ler_linha(arquivo)
+        return {coluna: (valor if valor != "" else None) for coluna, valor in zip(self._cabecalho, linha)}
+
+    def _ler_linha(self, arquivo):
+        # O leitor csv junta as linhas de um campo entre aspas com quebra de linha
+        texto = io.TextIOWrapper(arquivo, encoding="utf-8", newline="")
+        try:
+            return next(csv.reader(texto, delimiter=self.sep))
+        finally:
+            texto.detach()
+
+
+# Exemplo de uso: python IdsRegistros.py character-deaths.csv [ID]
+if __name__ == "__main__":
+    import sys
+
+    import pandas as pd
+
+    from DataLoader import DataLoader
+
+    caminho = sys.argv[1] if len(sys.argv) > 1 else "character-deaths.csv"
+    print(gerar_ids(["Jon Snow", "jon  snow", "Arya Stark"], ["Night's Watch", "Night's Watch", None]))
+    loader = DataLoader(caminho, sep=";")
+    versao = loader.versao()
+    ids = pd.read_csv(caminho, sep=";", usecols=["Name", "Allegiances"])
+    indice = IndiceOffsets.abrir(caminho, versao, gerar_ids(ids["Name"], ids["Allegiances"]))
+    record_id = sys.argv[2] if len(sys.argv) > 2 else indice.tabela["id"][0].decode()
+    print(record_id, indice.offset(record_id), indice.ler_registro(record_id))
@@ -0,0 +1,304 @@
+# IndiceBusca.py - Índice de busca aproximada por nome e casa (tokens normalizados, prefixos e trigramas)
+import copy
+import unicodedata
+from bisect import bisect_left
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+# Campos indexados e o peso de uma ocorrência em cada um
+CAMPOS_BUSCA = {"Name": 1.0, "Allegiances": 0.5}
+
+# Pontuação de um termo da consulta contra um token indexado
+PONTUACAO_PREFIXO_MINIMA = 0.5   # prefixo: de 0.5 a 1.0 conforme a fração do token coberta
+PESO_APROXIMADO = 0.8            # trigramas: 0.8 * similaridade
+SIMILARIDADE_MINIMA = 0.3        # Jaccard mínimo entre os trigramas do termo e do token
+MAX_TOKENS_POR_TERMO = 64        # tokens candidatos por termo (os mais curtos, no caso de prefixos)
+
+# Tabela de str.translate: letras em minúsculas, dígitos mantidos, apóstrofos removidos ("Night's" -> "nights")
+# e qualquer outro caractere ASCII vira separador
+_TABELA_NORMALIZACAO = {codigo: chr(codigo).lower() if chr(codigo).isalnum() else " " for codigo in range(128)}
+_TABELA_NORMALIZACAO.update({ord("'"): None, ord("`"): None})
+# Na normalização em lote os textos são separados por um caractere de controle que a tabela preserva
+_SEPARADOR_LOTE = "\x01"
+_TABELA_LOTE = {**_TABELA_NORMALIZACAO, ord(_SEPARADOR_LOTE): _SEPARADOR_LOTE}
+
+
+def normalizar(texto):
+    """Tokens em minúsculas, sem acentos e sem pontuação: "Aegon Frey (Jinglebell)" -> ["aegon", "frey", "jinglebell"]."""
+    texto = str(texto)
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto.replace("’", "'")).encode("ascii", "ignore").decode("ascii")
+    return texto.translate(_TABELA_NORMALIZACAO).split()
+
+
+def _tokenizar_valores(valores):
+    """Normaliza vários textos de uma vez: retorna (tokens em sequência, índice do texto de cada token)."""
+    if not len(valores):
+        return np.empty(0, dtype=object), np.empty(0, dtype=np.int64)
+    # Um único texto com separadores: translate e split rodam uma vez em vez de uma vez por valor
+    juntos = f" {_SEPARADOR_LOTE} ".join(map(str, valores))
+    if not juntos.isascii():
+        juntos = unicodedata.normalize("NFKD", juntos.replace("’", "'")).encode("ascii", "ignore").decode("ascii")
+    tokens = pd.Series(juntos.translate(_TABELA_LOTE).split(), dtype=object)
+    separadores = (tokens == _SEPARADOR_LOTE).to_numpy()
+    if np.count_nonzero(separadores) != len(valores) - 1:
+        # Algum texto contém o próprio separador: normaliza um a um
+        por_valor = [normalizar(valor) for valor in valores]
+        indices = np.repeat(np.arange(len(por_valor)), [len(tokens) for tokens in por_valor])
+        return np.array(list(chain.from_iterable(por_valor)), dtype=object), indices
+    return tokens.to_numpy()[~separadores], np.cumsum(separadores)[~separadores]
+
+
+def _codigos_trigramas(tokens, comprimentos):
+    """Trigramas com bordas (como o pg_trgm: "stark" -> "  s", " st", ..., "rk ") codificados como inteiros.
+
+    Retorna (códigos, índice do token de cada código). Os tokens normalizados são ASCII: 7 bits por caractere.
+    """
+    largura = int(comprimentos.max(initial=0)) + 3
+    marcados = np.array([f"  {token} " for token in tokens], dtype=f"<U{largura}")
+    caracteres = marcados.view(np.uint32).reshape(len(tokens), largura).astype(np.int32)
+    codigos = (caracteres[:, :-2] << 14) | (caracteres[:, 1:-1] << 7) | caracteres[:, 2:]
+    # O i-ésimo trigrama existe nos tokens com pelo menos i caracteres (as bordas somam 3)
+    validos = np.arange(largura - 2) <= comprimentos[:, None]
+    return codigos[validos], np.nonzero(validos)[0]
+
+
+def _csr(chaves, valores, n_chaves):
+    """Agrupa `valores` por `chaves` (0..n_chaves-1): retorna (inícios, valores ordenados por chave, estável)."""
+    ordem = np.argsort(chaves, kind="stable")
+    inicios = np.zeros(n_chaves + 1, dtype=np.int64)
+    np.cumsum(np.bincount(chaves, minlength=n_chaves), out=inicios[1:])
+    return inicios, valores[ordem]
+
+
+class _Segmento:
+    def __init__(self, ids, campos):
+        """Índice imutável de um conjunto de registros.
+
+        `ids` são os IDs dos registros; `campos` mapeia o nome do campo para a sequência de textos (uma por registro).
+        Cada campo guarda as listas de registros por token (formato CSR); o vocabulário é comum aos campos.
+        """
+        self.ids = np.asarray(ids)
+        # Os textos são normalizados uma vez por valor distinto (poucos em 'Allegiances')
+        por_campo = {}
+        for nome, textos in campos.items():
+            codigos, valores = pd.factorize(pd.Series(textos, dtype=object), use_na_sentinel=True)
+            por_campo[nome] = (codigos, len(valores), *_tokenizar_valores(valores))
+
+        codigos_vocab, vocabulario = pd.factorize(
+            np.concatenate([tokens for _, _, tokens, _ in por_campo.values()] + [np.empty(0, dtype=object)]), sort=True)
+        self.vocabulario = list(vocabulario)
+        self.comprimentos = np.fromiter(map(len, self.vocabulario), dtype=np.int32, count=len(self.vocabulario))
+
+        self.postagens = {}
+        deslocamento = 0
+        for nome, (codigos, n_valores, tokens, valor_do_token) in por_campo.items():
+            tokens_valor = codigos_vocab[deslocamento:deslocamento + len(tokens)]
+            deslocamento += len(tokens)
+            n_tokens = np.bincount(valor_do_token, minlength=n_valores)
+            inicio_valor = np.cumsum(n_tokens) - n_tokens
+
+            # Pares (registro, token): cada registro recebe os tokens do seu valor
+            linhas = np.flatnonzero(codigos >= 0)
+            repeticoes = n_tokens[codigos[linhas]]
+            total = int(repeticoes.sum())
+            linhas_par = np.repeat(linhas, repeticoes)
+            posicao_no_valor = np.arange(total) - np.repeat(np.cumsum(repeticoes) - repeticoes, repeticoes)
+            tokens_par = tokens_valor[np.repeat(inicio_valor[codigos[linhas]], repeticoes) + posicao_no_valor]
+            self.postagens[nome] = _csr(tokens_par, linhas_par.astype(np.int32), len(self.vocabulario))
+
+        self._indexar_trigramas()
+
+    def _indexar_trigramas(self):
+        """Trigrama -> tokens do vocabulário que o contêm (listas de tokens por trigrama, em formato CSR)."""
+        codigos, tokens = _codigos_trigramas(self.vocabulario, self.comprimentos)
+        # Um par (trigrama, token) por token, mesmo se o trigrama se repetir nele; ordenado por trigrama
+        n_vocabulario = max(len(self.vocabulario), 1)
+        pares = np.sort(codigos.astype(np.int64) * n_vocabulario + tokens)
+        pares = pares[np.concatenate(([True], pares[1:] != pares[:-1]))[:len(pares)]]
+        codigos, tokens = np.divmod(pares, n_vocabulario)
+        inicios = np.flatnonzero(np.concatenate(([True], codigos[1:] != codigos[:-1], [True])))
+        self.trigramas = codigos[inicios[:-1]]
+        self.postagens_trigramas = (inicios, tokens.astype(np.int32))
+        self.n_trigramas = np.bincount(tokens, minlength=len(self.vocabulario))
+
+    def _candidatos(self, termo):
+        """Tokens do vocabulário parecidos com `termo` e a pontuação de cada um (exato = 1.0)."""
+        tokens = []
+        pontuacoes = []
+
+        # Igual ou prefixo: faixa contígua do vocabulário ordenado
+        inicio = bisect_left(self.vocabulario, termo)
+        fim = bisect_left(self.vocabulario, termo + "\x7f", inicio)
+        if fim > inicio:
+            faixa = np.arange(inicio, fim)
+            if len(faixa) > MAX_TOKENS_POR_TERMO:
+                faixa = faixa[np.argsort(self.comprimentos[inicio:fim], kind="stable")[:MAX_TOKENS_POR_TERMO]]
+            tokens.append(faixa)
+            pontuacoes.append(PONTUACAO_PREFIXO_MINIMA + (1 - PONTUACAO_PREFIXO_MINIMA) * len(termo) / self.comprimentos[faixa])
+
+        # Aproximado: similaridade de Jaccard entre os trigramas (erros de digitação)
+        if len(termo) >= 3:
+            inicios, postagens = self.postagens_trigramas
+            trigramas_termo = np.unique(_codigos_trigramas([termo], np.array([len(termo)]))[0])
+            posicoes = np.minimum(np.searchsorted(self.trigramas, trigramas_termo), max(len(self.trigramas) - 1, 0))
+            indices = posicoes[self.trigramas[posicoes] == trigramas_termo] if len(self.trigramas) else posicoes[:0]
+            if len(indices):
+                # Tokens que compartilham trigramas com o termo e quantos compartilham (ordenação + fronteiras)
+                vizinhos = np.sort(np.concatenate([postagens[inicios[i]:inicios[i + 1]] for i in indices.tolist()]))
+                fronteiras = np.flatnonzero(np.concatenate(([True], vizinhos[1:] != vizinhos[:-1], [True])))
+                vizinhos, comuns = vizinhos[fronteiras[:-1]], np.diff(fronteiras)
+                similaridade = comuns / (len(trigramas_termo) + self.n_trigramas[vizinhos] - comuns)
+                aceitos = np.flatnonzero(similaridade >= SIMILARIDADE_MINIMA)
+                if len(aceitos) > MAX_TOKENS_POR_TERMO:
+                    aceitos = aceitos[np.argsort(-similaridade[aceitos], kind="stable")[:MAX_TOKENS_POR_TERMO]]
+                tokens.append(vizinhos[aceitos])
+                pontuacoes.append(PESO_APROXIMADO * similaridade[aceitos])
+
+        if not tokens:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        return np.concatenate(tokens), np.concatenate(pontuacoes)
+
+    def _grupos(self, termo):
+        """Registros casados pelo termo: uma lista (linhas, pontuação) por token candidato e campo."""
+        tokens, pontuacoes = self._candidatos(termo)
+        grupos = []
+        for campo, peso in CAMPOS_BUSCA.items():
+            if campo not in self.postagens:
+                continue
+            inicios, postagens = self.postagens[campo]
+            for token, pontuacao in zip(tokens.tolist(), pontuacoes.tolist()):
+                if inicios[token + 1] > inicios[token]:
+                    grupos.append((postagens[inicios[token]:inicios[token + 1]], pontuacao * peso))
+        return grupos
+
+    def buscar(self, termos):
+        """Retorna (posições, pontuações) de todos os registros que casam com ao menos um termo.
+
+        O custo acompanha o número de registros casados, não o tamanho do segmento. Se os termos
+        casam com boa parte dos registros (ex.: o nome de uma casa), as pontuações vão para um vetor denso.
+        """
+        grupos_termos = [grupos for grupos in map(self._grupos, termos) if grupos]
+        if not grupos_termos:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        casados = sum(len(linhas) for grupos in grupos_termos for linhas, _ in grupos)
+        if casados * 8 > len(self.ids):
+            soma = np.zeros(len(self.ids))
+            for grupos in grupos_termos:
+                # Um termo conta uma vez por registro: em ordem crescente, a maior pontuação sobrescreve as outras
+                melhor = np.zeros(len(self.ids))
+                for linhas, pontuacao in sorted(grupos, key=lambda grupo: grupo[1]):
+                    melhor[linhas] = pontuacao
+                soma += melhor
+            linhas = np.flatnonzero(soma)
+            return linhas, soma[linhas]
+
+        linhas_termos = []
+        pontuacoes_termos = []
+        for grupos in grupos_termos:
+            linhas = np.concatenate([linhas for linhas, _ in grupos])
+            valores = np.repeat([pontuacao for _, pontuacao in grupos], [len(linhas) for linhas, _ in grupos])
+            # Um termo conta uma vez por registro: vale o token (e o campo) de maior pontuação
+            ordem = np.lexsort((-valores, linhas))
+            linhas, valores = linhas[ordem], valores[ordem]
+            primeiros = np.concatenate(([True], linhas[1:] != linhas[:-1]))
+            linhas_termos.append(linhas[primeiros])
+            pontuacoes_termos.append(valores[primeiros])
+        linhas, inverso = np.unique(np.concatenate(linhas_termos), return_inverse=True)
+        return linhas, np.bincount(inverso, weights=np.concatenate(pontuacoes_termos))
+
+
+class IndiceBusca:
+    def __init__(self, dataframe, coluna_id="ID"):
+        """Índice de busca sobre 'Name' e 'Allegiances', montado uma vez por snapshot."""
+        self.coluna_id = coluna_id
+        self._base = self._segmento(dataframe)
+        # Registros incorporados depois da carga: (segmentos já montados, registros ainda sem segmento).
+        # Um único atributo trocado de uma vez: uma busca concorrente vê o estado anterior ou o novo, nunca uma mistura
+        self._estado = ((), ())
+
+    def _segmento(self, dataframe):
+        campos = {campo: dataframe[campo].to_numpy(dtype=object) for campo in CAMPOS_BUSCA if campo in dataframe.columns}
+        return _Segmento(dataframe[self.coluna_id].to_numpy(), campos)
+
+    def com_registros(self, dataframe):
+        """Novo índice com os registros processados incluídos (ex.: SnapshotDados.com_registros); este fica intacto.
+
+        Custo constante: o índice base e os segmentos já montados são compartilhados, e os registros
+        só são indexados na primeira busca do novo índice (_segmentos_novos).
+        """
+        segmentos, pendentes = self._estado
+        colunas = [self.coluna_id, *[c for c in CAMPOS_BUSCA if c in dataframe.columns]]
+        novo = copy.copy(self)
+        novo._estado = (segmentos, pendentes + (dataframe[colunas],))
+        return novo
+
+    def _segmentos_novos(self):
+        """Segmentos dos registros incorporados, indexando antes os que ainda estão pendentes.
+
+        Só os registros pendentes ganham um segmento novo; segmentos vizinhos de tamanho parecido são fundidos,
+        como em um contador binário: cada registro é reindexado O(log k) vezes e há O(log k) segmentos por busca.
+        """
+        segmentos, pendentes = self._estado
+        if not pendentes:
+            return [segmento for segmento, _ in segmentos]
+        grupo = pd.concat(pendentes, ignore_index=True)
+        segmentos = list(segmentos)
+        while segmentos and len(segmentos[-1][1]) <= len(grupo):
+            grupo = pd.concat([segmentos.pop()[1], grupo], ignore_index=True)
+        segmentos.append((self._segmento(grupo), grupo))
+        # Duas buscas simultâneas podem montar o mesmo segmento; o resultado é idêntico
+        self._estado = (tuple(segmentos), ())
+        return [segmento for segmento, _ in segmentos]
+
+    def buscar(self, consulta, limite=10):
+        """Melhores `limite` registros para a consulta: retorna (ids, pontuações, total de registros encontrados).
+
+        A pontuação soma, por termo da consulta, o melhor token casado (exato > prefixo > aproximado),
+        com peso maior para 'Name' que para 'Allegiances'. Empates ficam na ordem do arquivo
+        (registros incorporados depois da carga vêm por último).
+        """
+        termos = list(dict.fromkeys(normalizar(consulta)))
+        segmentos = [self._base, *self._segmentos_novos()]
+        if not termos:
+            return self._base.ids[:0], np.empty(0), 0
+        # Posições globais: as do segmento de registros novos continuam depois das do índice base
+        resultados = []
+        deslocamento = 0
+        for segmento in segmentos:
+            linhas, pontuacoes = segmento.buscar(termos)
+            resultados.append((linhas + deslocamento, pontuacoes))
+            deslocamento += len(segmento.ids)
+        linhas = np.concatenate([linhas for linhas, _ in resultados])
+        pontuacoes = np.concatenate([pontuacoes for _, pontuacoes in resultados])
+        total = len(linhas)
+
+        if total > limite:
+            # Só os registros com pontuação >= a do limite-ésimo melhor são ordenados
+            corte = -np.partition(-pontuacoes, limite - 1)[limite - 1]
+            selecionados = np.flatnonzero(pontuacoes >= corte)
+            linhas, pontuacoes = linhas[selecionados], pontuacoes[selecionados]
+        ordem = np.lexsort((linhas, -pontuacoes))[:limite]
+        # Posição global -> (segmento, posição no segmento)
+        inicios = np.cumsum([0] + [len(segmento.ids) for segmento in segmentos])
+        ids = []
+        for posicao in linhas[ordem].tolist():
+            i = int(np.searchsorted(inicios, posicao, side="right")) - 1
+            ids.append(segmentos[i].ids[posicao - inicios[i]])
+        return np.array(ids, dtype=self._base.ids.dtype), pontuacoes[ordem], total
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    dados = {
+        'ID': [0, 1, 2, 3],
+        'Name': ['Aegon Frey (Jinglebell)', 'Jon Snow', 'Arya Stark', 'Jon Umber (Greatjon)'],
+        'Allegiances': ['None', "Night's Watch", 'Stark', 'House Stark'],
+    }
+    indice = IndiceBusca(pd.DataFrame(dados))
+    for consulta in ["jinglebell", "jon", "stark", "nights", "jingelbel", "Árya"]:
+        ids, pontuacoes, total = indice.buscar(consulta, limite=3)
+        print(consulta, ids.tolist(), pontuacoes.round(3).tolist(), total)
@@ -0,0 +1,125 @@
+# IndiceFiltros.py - Bitmaps pré-calculados por valor para filtrar personagens sem varrer o DataFrame
+import numpy as np
+import pandas as pd
+
+# Colunas indexadas (valores de baixa cardinalidade usados nos filtros)
+DIMENSOES = ("Gender_Str", "Morreu", "Nobility", "Allegiances", "Book of Death", "GoT", "CoK", "SoS", "FfC", "DwD")
+
+# Parâmetros aceitos na URL -> dimensão indexada
+PARAMETROS_FILTRO = {
+    "gender": "Gender_Str",
+    "died": "Morreu",
+    "nobility": "Nobility",
+    "allegiances": "Allegiances",
+    "book_of_death": "Book of Death",
+    "got": "GoT",
+    "cok": "CoK",
+    "sos": "SoS",
+    "ffc": "FfC",
+    "dwd": "DwD",
+}
+
+# Número de bits 1 de cada byte, para contar os elementos de um bitmap compactado
+_BITS_POR_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalizar_valor(valor):
+    """Chave textual de um valor ('3.0' e 3 viram '3'), igual para o índice e para os parâmetros da URL."""
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def filtros_de_parametros(parametros):
+    """Converte {parametro: [valores]} da URL em {dimensão: [valores]}.
+
+    Cada parâmetro pode ser repetido ou ter valores separados por vírgula (?gender=Feminino,Masculino).
+    Parâmetros que não são filtros são ignorados.
+    """
+    filtros = {}
+    for parametro, valores in parametros.items():
+        dimensao = PARAMETROS_FILTRO.get(parametro.lower())
+        if dimensao is None:
+            continue
+        separados = [parte for valor in valores for parte in valor.split(",") if parte.strip()]
+        filtros.setdefault(dimensao, []).extend(separados)
+    return filtros
+
+
+def ordem_coluna(serie, decrescente=False):
+    """Posições (iloc) das linhas ordenadas por `serie`: nulos sempre no fim e empates pela posição original.
+
+    Categóricas seguem a ordem das categorias, como no sort_values do pandas.
+    """
+    codigos, _ = pd.factorize(serie, sort=True, use_na_sentinel=True)
+    chave = codigos.astype(np.int64)
+    if decrescente:
+        chave = -chave
+    chave[codigos < 0] = np.iinfo(np.int64).max
+    tipo = np.int32 if len(serie) < 2**31 else np.int64
+    return np.argsort(chave, kind="stable").astype(tipo)
+
+
+class IndiceFiltros:
+    def __init__(self, dataframe, dimensoes=DIMENSOES):
+        """Cria, para cada valor de cada dimensão, um bitmap (np.packbits) das linhas que o possuem."""
+        self.total_linhas = len(dataframe)
+        self._bitmaps = {}
+        for dimensao in dimensoes:
+            if dimensao not in dataframe.columns:
+                continue
+            codigos, valores = pd.factorize(dataframe[dimensao], use_na_sentinel=True)
+            self._bitmaps[dimensao] = {
+                normalizar_valor(valor): np.packbits(codigos == i) for i, valor in enumerate(valores)
+            }
+        self._todos = np.packbits(np.ones(self.total_linhas, dtype=bool))
+        self._nenhum = np.zeros_like(self._todos)
+
+    @property
+    def dimensoes(self):
+        return list(self._bitmaps)
+
+    def valores(self, dimensao):
+        """Valores existentes de uma dimensão."""
+        return list(self._bitmaps.get(dimensao, {}))
+
+    def filtrar(self, filtros):
+        """Combina os filtros {dimensão: [valores]}: OU entre valores da mesma dimensão, E entre dimensões.
+
+        Retorna o bitmap compactado das linhas selecionadas.
+        """
+        resultado = self._todos.copy()
+        for dimensao, valores in filtros.items():
+            if dimensao not in self._bitmaps:
+                raise KeyError(f"Dimensão '{dimensao}' não indexada.")
+            uniao = self._nenhum.copy()
+            for valor in valores:
+                bitmap = self._bitmaps[dimensao].get(normalizar_valor(valor))
+                if bitmap is not None:
+                    np.bitwise_or(uniao, bitmap, out=uniao)
+            np.bitwise_and(resultado, uniao, out=resultado)
+        return resultado
+
+    @staticmethod
+    def contar(bitmap):
+        """Quantidade de linhas selecionadas no bitmap (sem descompactá-lo)."""
+        return int(_BITS_POR_BYTE[bitmap].sum(dtype=np.int64))
+
+    def posicoes(self, bitmap, inicio=0, fim=None):
+        """Posições (iloc) das linhas selecionadas, da `inicio`-ésima até a `fim`-ésima (exclusive)."""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.total_linhas))[inicio:fim]
+
+    def posicoes_ordenadas(self, bitmap, ordem, inicio=0, fim=None):
+        """Como posicoes(), mas seguindo `ordem` (ex.: ordem_coluna), sem montar o DataFrame filtrado."""
+        selecionadas = np.unpackbits(bitmap, count=self.total_linhas).view(bool)
+        return ordem[selecionadas[ordem]][inicio:fim]
+
+    def posicoes_em_blocos(self, bitmap, linhas_por_bloco=65_536):
+        """Gera as posições selecionadas bloco a bloco, descompactando só `linhas_por_bloco` linhas de cada vez."""
+        bytes_por_bloco = max(1, linhas_por_bloco // 8)
+        for primeiro_byte in range(0, len(bitmap), bytes_por_bloco):
+            inicio = primeiro_byte * 8
+            contagem = min(bytes_por_bloco * 8, self.total_linhas - inicio)
+            posicoes = np.flatnonzero(np.unpackbits(bitmap[primeiro_byte:primeiro_byte + bytes_por_bloco], count=contagem))
+            if len(posicoes):
+                yield posicoes + inicio
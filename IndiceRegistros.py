@@ -0,0 +1,80 @@
+# IndiceRegistros.py - Índice de registros por ID com JSON pré-serializado
+import copy
+
+import pandas as pd
+
+from SerializacaoJson import dumps as _serializar
+
+
+def serializar_registros(dataframe):
+    """Serializa cada linha do DataFrame em bytes JSON, com NaN/NA convertidos em null."""
+    # Cada coluna vira uma lista de objetos Python nativos (NaN/NA -> None) de uma vez; as chaves já vão ordenadas
+    colunas = sorted(dataframe.columns)
+    valores = [dataframe[coluna].to_numpy(dtype=object, na_value=None).tolist() for coluna in colunas]
+    return [_serializar(dict(zip(colunas, linha))) for linha in zip(*valores)]
+
+
+class IndiceRegistros:
+    def __init__(self, dataframe, coluna_id="ID"):
+        """Constrói, uma única vez, o mapa ID -> bytes JSON de cada registro."""
+        if coluna_id not in dataframe.columns:
+            raise KeyError(f"Coluna '{coluna_id}' não encontrada no DataFrame.")
+
+        ids = dataframe[coluna_id].tolist()
+        self._registros = dict(zip(ids, serializar_registros(dataframe)))
+        # Registros incluídos depois da carga (com_registros); o mapa da carga nunca é alterado
+        self._novos = {}
+
+    def com_registros(self, dataframe, coluna_id="ID"):
+        """Novo índice com os registros de um DataFrame processado incluídos (ou substituídos); este fica intacto.
+
+        O mapa da carga é compartilhado: só o dos registros incluídos (no máximo um intervalo de compactação) é copiado.
+        """
+        novo = copy.copy(self)
+        novo._novos = {**self._novos, **dict(zip(dataframe[coluna_id].tolist(), serializar_registros(dataframe)))}
+        return novo
+
+    def __len__(self):
+        return len(self._registros) + sum(1 for record_id in self._novos if record_id not in self._registros)
+
+    def __contains__(self, record_id):
+        return record_id in self._novos or record_id in self._registros
+
+    def obter_bytes(self, record_id):
+        """Retorna o JSON pré-serializado do registro (ou None se o ID não existir)."""
+        dados = self._novos.get(record_id)
+        return dados if dados is not None else self._registros.get(record_id)
+
+    def resposta_registro(self, record_id):
+        """Monta o corpo de resposta de /api/record/<id> sem reserializar o registro."""
+        dados = self.obter_bytes(record_id)
+        if dados is None:
+            return None
+        return b'{"dados":' + dados + b',"status":"sucesso"}\n'
+
+    def resposta_varios(self, ids):
+        """Monta o corpo de /api/records com os registros encontrados e os IDs ausentes."""
+        encontrados = []
+        nao_encontrados = []
+        for record_id in ids:
+            dados = self.obter_bytes(record_id)
+            if dados is None:
+                nao_encontrados.append(record_id)
+            else:
+                encontrados.append(dados)
+        return (
+            b'{"dados":[' + b",".join(encontrados) + b'],"nao_encontrados":'
+            + _serializar(nao_encontrados) + b',"status":"sucesso"}\n'
+        )
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    dados = {
+        'ID': [0, 1],
+        'Name': ['Arya Stark', 'Jon Snow'],
+        'Death_Year': [None, 300],
+    }
+    indice = IndiceRegistros(pd.DataFrame(dados))
+    print(indice.resposta_registro(1))
+    print(indice.resposta_varios([0, 5]))
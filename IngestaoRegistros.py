@@ -0,0 +1,278 @@
+# IngestaoRegistros.py - Validação de novos registros e log append-only com compactação no CSV
+import csv
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from DataLoader import ESQUEMA_COLUNAS, aplicar_esquema, ids_registros
+from DataAnalise import DataAnalise
+
+# fcntl só existe em sistemas POSIX: sem ele o log fica protegido só entre as threads do processo
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Colunas do formato character-deaths.csv, na ordem do arquivo
+COLUNAS_CSV = ["Name", "Allegiances", "Death_Year", "Book of Death", "Death Chapter", "Book Intro Chapter",
+               "Gender", "Nobility", "GoT", "CoK", "SoS", "FfC", "DwD"]
+
+# Textos que o read_csv do pandas lê como nulo: tratados igual aqui para o registro não mudar na compactação
+_TEXTOS_NULOS = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                 "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"}
+
+# Valores aceitos nas colunas inteiras (None/ausente é sempre aceito e tratado pelo DataAnalise)
+_FAIXAS = {
+    "Death_Year": range(0, 10_000),
+    "Book of Death": range(1, 6),
+    "Death Chapter": range(0, 1_000),
+    "Book Intro Chapter": range(0, 1_000),
+    "Gender": (0, 1),
+    "Nobility": (0, 1),
+    "GoT": (0, 1),
+    "CoK": (0, 1),
+    "SoS": (0, 1),
+    "FfC": (0, 1),
+    "DwD": (0, 1),
+}
+
+
+def validar_registro(registro):
+    """Valida um registro no formato do CSV e retorna um dicionário com todas as colunas (ausentes = None).
+
+    Lança ValueError com a descrição do problema.
+    """
+    if not isinstance(registro, dict):
+        raise ValueError("O registro deve ser um objeto JSON.")
+    desconhecidas = [coluna for coluna in registro if coluna not in COLUNAS_CSV]
+    if desconhecidas:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(desconhecidas)}.")
+
+    nome = registro.get("Name")
+    if not isinstance(nome, str) or not nome.strip():
+        raise ValueError("'Name' é obrigatório e deve ser um texto não vazio.")
+    if nome.strip() in _TEXTOS_NULOS:
+        # Depois da compactação o read_csv leria o nome como nulo: o registro e o ID mudariam
+        raise ValueError(f"'Name' não pode ser {nome.strip()!r} (o CSV lê esse texto como nulo).")
+    alegiancia = registro.get("Allegiances")
+    if alegiancia is not None and not isinstance(alegiancia, str):
+        raise ValueError("'Allegiances' deve ser um texto.")
+    for texto in (nome, alegiancia or ""):
+        if "\n" in texto or "\r" in texto:
+            raise ValueError("'Name' e 'Allegiances' não podem conter quebras de linha.")
+
+    if alegiancia is not None and alegiancia.strip() in _TEXTOS_NULOS:
+        alegiancia = None
+    limpo = {"Name": nome.strip(), "Allegiances": alegiancia}
+    for coluna, faixa in _FAIXAS.items():
+        valor = registro.get(coluna)
+        if valor is not None and (isinstance(valor, bool) or not isinstance(valor, int) or valor not in faixa):
+            raise ValueError(f"'{coluna}' deve ser um inteiro entre {min(faixa)} e {max(faixa)} ou null.")
+        limpo[coluna] = valor
+    return limpo
+
+
+def linha_log(registro):
+    """Linha NDJSON de um registro validado, como gravada no log (e reaplicada dele)."""
+    return json.dumps(registro, ensure_ascii=False) + "\n"
+
+
+def versao_com_registros(hash_anterior, registros):
+    """Hash da versão dos dados após incluir `registros`, encadeado registro a registro sobre o conteúdo do log.
+
+    Registros diferentes dão versões diferentes (também entre workers), e reaplicar o log de uma vez
+    ao carregar dá a mesma versão que as inclusões feitas uma a uma.
+    """
+    for registro in registros:
+        hash_anterior = hashlib.sha256(hash_anterior.encode() + linha_log(registro).encode("utf-8")).hexdigest()
+    return hash_anterior
+
+
+def processar_registros(registros, ids_existentes=()):
+    """Aplica o esquema do DataLoader e as regras do DataAnalise só aos registros novos.
+
+    Retorna o DataFrame processado (mesmas colunas e tipos do snapshot). Os IDs são os mesmos que o
+    DataLoader atribuirá quando os registros estiverem no fim do CSV: `ids_existentes` são os IDs já em uso.
+    """
+    df = pd.DataFrame(registros, columns=COLUNAS_CSV)
+    # Sem o esquema, colunas só com None ficariam 'object'; força a mesma base numérica do read_csv
+    df = df.astype({coluna: "float32" for coluna, tipo in ESQUEMA_COLUNAS.items() if tipo not in ("object", "category")})
+    df = aplicar_esquema(df)
+    df["ID"] = ids_registros(df, ids_existentes)
+    df_processado, _ = DataAnalise(df, copiar=False).processar()
+    return df_processado
+
+
+class LogIngestao:
+    def __init__(self, caminho_csv, sep=";"):
+        """Log append-only `{csv}.novos.ndjson` com os registros ainda não incorporados ao CSV.
+
+        Gravação, leitura e compactação usam uma trava de arquivo (`{log}.lock`, flock) além da trava
+        de threads: os workers do Gunicorn compartilham o mesmo log.
+        """
+        self.caminho_csv = caminho_csv
+        self.sep = sep
+        self.caminho = f"{caminho_csv}.novos.ndjson"
+        # Arquivo separado: o log é removido na compactação, a trava não
+        self.caminho_trava = f"{self.caminho}.lock"
+        # Reentrante: quem segura travado() pode anexar e ler sem travar de novo
+        self._trava = threading.RLock()
+        self._arquivo_trava = None
+
+    @contextmanager
+    def _travado(self, exclusiva=True):
+        """Trava entre threads e, com fcntl, entre processos (exclusiva para escrever, compartilhada para ler).
+
+        Chamadas aninhadas na mesma thread reaproveitam a trava mais externa (e o modo dela).
+        """
+        with self._trava:
+            if fcntl is None or self._arquivo_trava is not None:
+                yield
+                return
+            with open(self.caminho_trava, "a") as trava:
+                fcntl.flock(trava, fcntl.LOCK_EX if exclusiva else fcntl.LOCK_SH)
+                self._arquivo_trava = trava
+                try:
+                    yield
+                finally:
+                    self._arquivo_trava = None
+                    fcntl.flock(trava, fcntl.LOCK_UN)
+
+    def travado(self):
+        """Trava exclusiva do log para uma sequência de operações (ex.: ler o que os outros workers gravaram e anexar)."""
+        return self._travado()
+
+    def _assinatura_csv(self):
+        """(mtime_ns, tamanho) do CSV, ou None se ele não existir: muda quando a compactação reescreve o CSV."""
+        try:
+            estado = os.stat(self.caminho_csv)
+        except FileNotFoundError:
+            return None
+        return (estado.st_mtime_ns, estado.st_size)
+
+    def posicao(self):
+        """Posição atual do log, sem trava: (assinatura do CSV, inode do log, tamanho do log).
+
+        O inode muda quando a compactação remove ou substitui o log; None se não houver log.
+        """
+        try:
+            estado = os.stat(self.caminho)
+        except FileNotFoundError:
+            return (self._assinatura_csv(), None, 0)
+        return (self._assinatura_csv(), estado.st_ino, estado.st_size)
+
+    def anexar(self, registros):
+        """Grava os registros (já validados) no fim do log com uma única escrita e fsync.
+
+        Retorna a posição do log logo após a escrita (como posicao()).
+        """
+        linhas = "".join(map(linha_log, registros)).encode("utf-8")
+        with self._travado(), open(self.caminho, "ab") as arquivo:
+            # Uma linha truncada por uma queda anterior não pode grudar no primeiro registro novo
+            if arquivo.tell() > 0:
+                with open(self.caminho, "rb") as leitura:
+                    leitura.seek(-1, os.SEEK_END)
+                    if leitura.read(1) != b"\n":
+                        linhas = b"\n" + linhas
+            arquivo.write(linhas)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+            return (self._assinatura_csv(), os.fstat(arquivo.fileno()).st_ino, arquivo.tell())
+
+    def _ler_linhas(self, inicio=0):
+        """Conteúdo do log a partir do byte `inicio` até a última linha completa. Chamar com a trava.
+
+        Retorna (registros válidos, byte final lido, inode do log ou None).
+        """
+        try:
+            with open(self.caminho, "rb") as arquivo:
+                inode = os.fstat(arquivo.fileno()).st_ino
+                arquivo.seek(inicio)
+                conteudo = arquivo.read()
+        except FileNotFoundError:
+            return [], 0, None
+        fim = conteudo.rfind(b"\n") + 1
+        registros = []
+        for numero, linha in enumerate(conteudo[:fim].decode("utf-8", errors="replace").splitlines(), start=1):
+            if not linha.strip():
+                continue
+            try:
+                registros.append(validar_registro(json.loads(linha)))
+            except ValueError as e:
+                # Uma linha corrompida (queda durante a escrita) não impede a leitura do restante
+                logger.warning("Linha %d de %s ignorada: %s", numero, self.caminho, e)
+        return registros, inicio + fim, inode
+
+    def ler(self):
+        """Retorna os registros do log, na ordem em que foram gravados (lista vazia se não houver log)."""
+        with self._travado(exclusiva=False):
+            return self._ler_linhas()[0]
+
+    def ler_desde(self, posicao):
+        """Registros gravados depois de `posicao` (retornada por posicao(), anexar() ou uma leitura anterior).
+
+        Retorna (registros, nova posição). Quem chama garante que a posição é do mesmo log e do mesmo CSV
+        (ex.: comparando com posicao()); a assinatura do CSV da posição recebida é mantida.
+        """
+        assinatura_csv, _, inicio = posicao
+        with self._travado(exclusiva=False):
+            registros, fim, inode = self._ler_linhas(inicio)
+        return registros, (assinatura_csv, inode, fim)
+
+    def _descartar_inicio(self, n_bytes):
+        """Remove do log os `n_bytes` iniciais (já movidos para o CSV), preservando o que vier depois."""
+        with open(self.caminho, "rb") as arquivo:
+            arquivo.seek(n_bytes)
+            restante = arquivo.read()
+        if not restante:
+            os.remove(self.caminho)
+            return
+        temporario = f"{self.caminho}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(restante)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(temporario, self.caminho)
+
+    def compactar(self):
+        """Acrescenta os registros do log ao CSV (troca atômica do arquivo) e tira do log só o que foi movido.
+
+        Retorna o número de registros movidos para o CSV.
+        """
+        with self._travado():
+            registros, bytes_lidos, _ = self._ler_linhas()
+            if not registros:
+                return 0
+
+            temporario = f"{self.caminho_csv}.{os.getpid()}.tmp"
+            shutil.copyfile(self.caminho_csv, temporario)
+            with open(temporario, "rb+") as arquivo:
+                # Garante que a primeira linha nova não seja colada na última linha do arquivo
+                arquivo.seek(0, os.SEEK_END)
+                if arquivo.tell() > 0:
+                    arquivo.seek(-1, os.SEEK_END)
+                    if arquivo.read(1) != b"\n":
+                        arquivo.write(b"\r\n")
+            with open(temporario, "a", encoding="utf-8", newline="") as arquivo:
+                escritor = csv.writer(arquivo, delimiter=self.sep, lineterminator="\r\n")
+                for registro in registros:
+                    escritor.writerow(["" if registro[coluna] is None else registro[coluna] for coluna in COLUNAS_CSV])
+            os.replace(temporario, self.caminho_csv)
+            self._descartar_inicio(bytes_lidos)
+            logger.info("%d registro(s) do log incorporados a %s.", len(registros), self.caminho_csv)
+            return len(registros)
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    registro = validar_registro({"Name": "Shireen Baratheon", "Allegiances": "Baratheon",
+                                 "Death_Year": 300, "Gender": 0, "Nobility": 1, "SoS": 1})
+    print(processar_registros([registro]).T)
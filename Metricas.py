@@ -0,0 +1,136 @@
+# Metricas.py - Métricas em memória (histogramas de latência e etapas do pipeline) no formato Prometheus
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histograma:
+    def __init__(self, buckets=BUCKETS_PADRAO):
+        """Histograma cumulativo de observações, como o tipo 'histogram' do Prometheus."""
+        self.buckets = tuple(buckets)
+        self.contagens = [0] * len(self.buckets)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.soma += valor
+        self.total += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+
+
+class Etapa:
+    def __init__(self, nome):
+        """Resultado de uma execução de etapa do pipeline; quem mede pode preencher linhas e memória."""
+        self.nome = nome
+        self.segundos = 0.0
+        self.linhas = None
+        self.memoria_bytes = None
+
+
+def _rotulos(**rotulos):
+    pares = ",".join(f'{nome}="{str(valor).replace(chr(34), chr(39))}"' for nome, valor in rotulos.items())
+    return "{" + pares + "}"
+
+
+class RegistroMetricas:
+    def __init__(self):
+        """Guarda as métricas do processo. Em multi-worker cada processo tem o seu registro."""
+        self._trava = threading.Lock()
+        self._requisicoes = {}  # (endpoint, método, status) -> total
+        self._latencias = {}    # endpoint -> Histograma
+        self._coalescidas = {}  # endpoint -> requisições atendidas pelo cálculo de outra idêntica (modo ASGI)
+        self._etapas = {}       # nome -> última Etapa
+        self._execucoes_etapa = {}  # nome -> Histograma de durações
+
+    def observar_requisicao(self, endpoint, metodo, status, segundos):
+        """Registra uma requisição HTTP concluída."""
+        with self._trava:
+            chave = (endpoint, metodo, status)
+            self._requisicoes[chave] = self._requisicoes.get(chave, 0) + 1
+            self._latencias.setdefault(endpoint, Histograma()).observar(segundos)
+
+    def observar_coalescencia(self, endpoint):
+        """Registra uma requisição que aguardou o resultado de outra idêntica em andamento em vez de recalculá-lo."""
+        with self._trava:
+            self._coalescidas[endpoint] = self._coalescidas.get(endpoint, 0) + 1
+
+    @contextmanager
+    def etapa(self, nome):
+        """Mede a duração de uma etapa do pipeline (ex.: DataLoader.load)."""
+        etapa = Etapa(nome)
+        inicio = time.perf_counter()
+        try:
+            yield etapa
+        finally:
+            etapa.segundos = time.perf_counter() - inicio
+            with self._trava:
+                self._etapas[nome] = etapa
+                self._execucoes_etapa.setdefault(nome, Histograma()).observar(etapa.segundos)
+            logger.debug("Etapa concluída: %s em %.3f s (linhas=%s)", nome, etapa.segundos, etapa.linhas,
+                         extra={"etapa": nome, "segundos": etapa.segundos, "linhas": etapa.linhas})
+
+    def texto_prometheus(self):
+        """Exporta todas as métricas no formato de texto do Prometheus (versão 0.0.4)."""
+        linhas = []
+        with self._trava:
+            linhas.append("# HELP got_http_requisicoes_total Requisições HTTP atendidas.")
+            linhas.append("# TYPE got_http_requisicoes_total counter")
+            for (endpoint, metodo, status), total in sorted(self._requisicoes.items()):
+                linhas.append(f"got_http_requisicoes_total{_rotulos(endpoint=endpoint, metodo=metodo, status=status)} {total}")
+
+            linhas.append("# HELP got_http_coalescidas_total Requisições que reaproveitaram o cálculo de outra idêntica simultânea.")
+            linhas.append("# TYPE got_http_coalescidas_total counter")
+            for endpoint, total in sorted(self._coalescidas.items()):
+                linhas.append(f"got_http_coalescidas_total{_rotulos(endpoint=endpoint)} {total}")
+
+            linhas.append("# HELP got_http_latencia_segundos Latência das requisições HTTP por endpoint.")
+            linhas.append("# TYPE got_http_latencia_segundos histogram")
+            for endpoint, histograma in sorted(self._latencias.items()):
+                linhas.extend(self._linhas_histograma("got_http_latencia_segundos", histograma, endpoint=endpoint))
+
+            linhas.append("# HELP got_etapa_duracao_segundos Duração das execuções de cada etapa do pipeline.")
+            linhas.append("# TYPE got_etapa_duracao_segundos histogram")
+            for nome, histograma in sorted(self._execucoes_etapa.items()):
+                linhas.extend(self._linhas_histograma("got_etapa_duracao_segundos", histograma, etapa=nome))
+
+            gauges = [
+                ("got_etapa_ultima_duracao_segundos", "Duração da última execução da etapa.", "segundos"),
+                ("got_etapa_linhas", "Linhas produzidas na última execução da etapa.", "linhas"),
+                ("got_etapa_memoria_bytes", "Memória das colunas do DataFrame produzido (sem o conteúdo das strings).",
+                 "memoria_bytes"),
+            ]
+            for metrica, descricao, atributo in gauges:
+                linhas.append(f"# HELP {metrica} {descricao}")
+                linhas.append(f"# TYPE {metrica} gauge")
+                for nome, etapa in sorted(self._etapas.items()):
+                    valor = getattr(etapa, atributo)
+                    if isinstance(valor, float):
+                        valor = f"{valor:.6f}"
+                    if valor is not None:
+                        linhas.append(f"{metrica}{_rotulos(etapa=nome)} {valor}")
+        return "\n".join(linhas) + "\n"
+
+    @staticmethod
+    def _linhas_histograma(nome, histograma, **rotulos):
+        linhas = []
+        acumulado = 0
+        for limite, contagem in zip(histograma.buckets, histograma.contagens):
+            acumulado += contagem
+            linhas.append(f"{nome}_bucket{_rotulos(**rotulos, le=limite)} {acumulado}")
+        linhas.append(f"{nome}_bucket{_rotulos(**rotulos, le='+Inf')} {histograma.total}")
+        linhas.append(f"{nome}_sum{_rotulos(**rotulos)} {histograma.soma:.6f}")
+        linhas.append(f"{nome}_count{_rotulos(**rotulos)} {histograma.total}")
+        return linhas
+
+
+# Registro único do processo, usado pelas classes do pipeline e pela API
+metricas = RegistroMetricas()
@@ -0,0 +1,61 @@
+# ObservadorArquivo.py - Observa um arquivo em segundo plano e avisa quando ele muda
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ObservadorArquivo:
+    def __init__(self, caminho_arquivo, ao_mudar, intervalo=2.0):
+        """Verifica o arquivo a cada `intervalo` segundos e chama `ao_mudar()` quando ele é alterado."""
+        self.caminho_arquivo = caminho_arquivo
+        self.ao_mudar = ao_mudar
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread = None
+        self._assinatura = self._ler_assinatura()
+
+    def _ler_assinatura(self):
+        """Retorna (mtime_ns, tamanho) do arquivo, ou None se ele não existir no momento."""
+        try:
+            estado = os.stat(self.caminho_arquivo)
+        except FileNotFoundError:
+            return None
+        return (estado.st_mtime_ns, estado.st_size)
+
+    def iniciar(self):
+        """Inicia a thread de observação (daemon, não impede o encerramento do processo)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="observador-csv", daemon=True)
+        self._thread.start()
+
+    def sincronizar(self):
+        """Aceita o estado atual do arquivo sem chamar `ao_mudar()` (alteração feita e já tratada por quem chama)."""
+        self._assinatura = self._ler_assinatura()
+
+    def parar(self):
+        """Solicita o fim da thread de observação."""
+        self._parar.set()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            atual = self._ler_assinatura()
+            if atual is None or atual == self._assinatura:
+                continue
+
+            # Aguarda um intervalo e confirma que a escrita terminou antes de recarregar
+            if self._parar.wait(self.intervalo) or self._ler_assinatura() != atual:
+                continue
+            # Alteração sincronizada durante a espera (ex.: a compactação do próprio processo, já recarregada)
+            if atual == self._assinatura:
+                continue
+
+            try:
+                self.ao_mudar()
+            except Exception as e:
+                # Mantém a versão anterior e tenta de novo na próxima alteração
+                logger.exception("Erro ao recarregar %s: %s", self.caminho_arquivo, e)
+            self._assinatura = atual
@@ -0,0 +1,69 @@
+# SerializacaoJson.py - Serialização JSON rápida (orjson, se instalado) com suporte aos tipos do NumPy e do pandas
+import datetime
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+# orjson é opcional: sem ele a serialização usa o módulo json (mesmo resultado, mais lenta)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Compacto, chaves ordenadas (como o jsonify do Flask) e arrays/escalares NumPy sem conversão
+    _OPCOES_ORJSON = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _nativo(obj):
+    """Converte os tipos do NumPy/pandas que o encoder não conhece em tipos nativos do Python."""
+    # Importados só aqui: serializar dicionários e listas comuns não carrega o NumPy nem o pandas
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (np.ndarray, pd.Series, pd.Index)):
+        return obj.tolist()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def dumps(obj):
+    """Serializa em bytes UTF-8 no formato compacto e com chaves ordenadas usado em todas as respostas."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_nativo, option=_OPCOES_ORJSON)
+    return json.dumps(obj, default=_nativo, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(dados):
+    """Lê JSON de str ou bytes (erros de sintaxe são ValueError nos dois casos)."""
+    if orjson is not None:
+        return orjson.loads(dados)
+    return json.loads(dados)
+
+
+class ProvedorJson(DefaultJSONProvider):
+    """Provedor JSON do Flask (app.json) que usa `dumps`: o jsonify aceita tipos do NumPy/pandas."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj) + b"\n", mimetype=self.mimetype)
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    import numpy as np
+    import pandas as pd
+
+    print(dumps({"b": np.int64(3), "a": np.array([1.5, 2.0]), "c": pd.NA, "d": "Daenerys Targaryen"}))
+    print(loads(b'{"Name": "Arya Stark"}'))
@@ -0,0 +1,163 @@
+# SnapshotDados.py - Versão imutável dos dados processados servida pela API
+import copy
+import os
+import time
+
+from DataLoader import DataLoader
+from ContadorMorte import ContadorMortes
+from IndiceRegistros import IndiceRegistros
+from IndiceBusca import IndiceBusca
+from IdsRegistros import IndiceOffsets
+from IndiceFiltros import IndiceFiltros, ordem_coluna
+from CuboAgregacoes import CuboAgregacoes
+from IngestaoRegistros import LogIngestao, processar_registros, versao_com_registros
+from CacheRespostas import RespostaVersionada
+from Metricas import metricas
+
+
+class SnapshotDados:
+    def __init__(self, df_processado, contagem_genero, contador, versao):
+        """Agrupa tudo o que é derivado de uma versão do CSV.
+
+        Não é alterado após criado: com_registros() devolve um novo snapshot com os registros incluídos.
+        """
+        self.df_processado = df_processado
+        self.contagem_genero = contagem_genero
+        self.contador = contador
+        # versao_base identifica o CSV; versao muda também a cada registro incorporado
+        self.versao_base = versao
+        self.versao = versao
+        self.registros_incorporados = 0
+        # Índice ID -> posição da linha no CSV (montado por construir(), que conhece o arquivo)
+        self.indice_offsets = None
+        # Até onde o log de inclusões já foi lido (LogIngestao.posicao()); montada por construir()
+        self.posicao_log = None
+
+        # Estatísticas e contagem de gênero são calculadas e serializadas uma vez por versão dos dados
+        self._montar_respostas()
+
+        # Índice ID -> JSON pré-serializado
+        with metricas.etapa("IndiceRegistros") as etapa:
+            self.indice_registros = IndiceRegistros(df_processado) if "ID" in df_processado.columns else None
+            etapa.linhas = len(self.indice_registros) if self.indice_registros is not None else 0
+
+        # Tokens, prefixos e trigramas de 'Name' e 'Allegiances' para /api/search
+        with metricas.etapa("IndiceBusca") as etapa:
+            self.indice_busca = IndiceBusca(df_processado) if "ID" in df_processado.columns else None
+            etapa.linhas = len(df_processado)
+
+        # Bitmaps por valor para o endpoint de consulta filtrada
+        with metricas.etapa("IndiceFiltros") as etapa:
+            self.indice_filtros = IndiceFiltros(df_processado)
+            etapa.linhas = self.indice_filtros.total_linhas
+
+        # Ordens por coluna para a ordenação de /api/characters (calculadas sob demanda)
+        self._ordens = {}
+
+        # Cubo de agregações (casa x gênero x nobreza x livro da morte) para /api/breakdown
+        with metricas.etapa("CuboAgregacoes") as etapa:
+            self.cubo = CuboAgregacoes(df_processado)
+            etapa.linhas = len(df_processado)
+
+    def ordem(self, coluna, decrescente=False):
+        """Ordem das linhas por `coluna`, calculada na primeira vez que é pedida e reaproveitada."""
+        chave = (coluna, decrescente)
+        ordem = self._ordens.get(chave)
+        if ordem is None:
+            with metricas.etapa("SnapshotDados.ordem") as etapa:
+                ordem = ordem_coluna(self.df_processado[coluna], decrescente)
+                etapa.linhas = len(ordem)
+            # Duas requisições simultâneas podem calcular a mesma ordem; o resultado é idêntico
+            self._ordens[chave] = ordem
+        return ordem
+
+    def _montar_respostas(self):
+        estatisticas = self.contador.estatisticas_mortes()
+        self.resposta_estatisticas = RespostaVersionada(
+            estatisticas, self.versao, "estatisticas", status=500 if "Erro" in estatisticas else 200
+        )
+        self.resposta_genero = RespostaVersionada(self.contagem_genero, self.versao, "genero")
+        # Chaves em texto: a mesma ordem e o mesmo JSON com orjson ou json
+        mortes_por_ano = {str(ano): n for ano, n in self.contador.mortes_por_ano().items()}
+        self.resposta_mortes_ano = RespostaVersionada(mortes_por_ano, self.versao, "mortes_ano")
+
+    def na_posicao_log(self, posicao_log):
+        """Cópia deste snapshot com outra posição do log (trecho lido sem nenhum registro válido)."""
+        novo = copy.copy(self)
+        novo.posicao_log = posicao_log
+        return novo
+
+    def com_registros(self, registros, posicao_log=None):
+        """Novo snapshot com registros já validados acrescentados, sem reprocessar o CSV; este fica intacto.
+
+        Retorna (novo snapshot, DataFrame processado dos registros). Requisições em andamento continuam
+        lendo este snapshot; quem chama troca o snapshot em uso pelo novo de uma vez, como numa recarga.
+        Os índices de registros e de busca compartilham a parte da carga com este snapshot; contador, cubo
+        e contagem de gênero são copiados (custo proporcional aos valores distintos, não às linhas).
+        O DataFrame base e os bitmaps de /api/characters só passam a incluir os registros quando o log
+        é compactado no CSV e o snapshot é reconstruído. `posicao_log` é a posição do log logo após os
+        registros (None mantém a deste snapshot).
+        """
+        df_novos = processar_registros(registros, self.indice_registros if self.indice_registros is not None else ())
+        novo = copy.copy(self)
+        if self.indice_registros is not None:
+            novo.indice_registros = self.indice_registros.com_registros(df_novos)
+        if self.indice_busca is not None:
+            novo.indice_busca = self.indice_busca.com_registros(df_novos)
+        novo.contador = self.contador.copia().adicionar_registros(df_novos)
+        novo.cubo = self.cubo.copia().adicionar(df_novos)
+
+        contagem = dict(self.contagem_genero)
+        for genero, n in df_novos["Gender_Str"].value_counts().items():
+            if n:
+                contagem[genero] = contagem.get(genero, 0) + int(n)
+        # Mesma ordem de value_counts (mais frequente primeiro)
+        novo.contagem_genero = dict(sorted(contagem.items(), key=lambda item: -item[1]))
+
+        novo.registros_incorporados = self.registros_incorporados + len(df_novos)
+        if posicao_log is not None:
+            novo.posicao_log = posicao_log
+        # Nova versão derivada do conteúdo dos registros incluídos: muda a ETag das respostas
+        novo.versao = {"hash": versao_com_registros(self.versao["hash"], registros), "mtime": time.time()}
+        novo._montar_respostas()
+        return novo, df_novos
+
+    @classmethod
+    def construir(cls, caminho_arquivo, sep=";", log=None):
+        """Executa DataLoader -> DataAnalise.processar -> ContadorMortes e retorna um novo snapshot.
+
+        `log` é o LogIngestao do CSV (um novo se None); quem já segura a trava dele deve passá-lo.
+        """
+        if not os.path.exists(caminho_arquivo):
+            raise FileNotFoundError(f"Erro: Arquivo {caminho_arquivo} não encontrado!")
+
+        if log is None:
+            log = LogIngestao(caminho_arquivo, sep=sep)
+        # Assinatura do CSV lida antes dos dados: se uma compactação o reescrever durante a carga,
+        # a posição do log não confere com a atual e o snapshot é reconstruído
+        assinatura_csv = log.posicao()[0]
+        loader = DataLoader(caminho_arquivo, sep=sep)
+        # A versão é lida antes dos dados: se o arquivo mudar durante a carga, a próxima verificação detecta
+        versao = loader.versao()
+        # Usa o cache colunar do CSV processado quando ele corresponde a esta versão
+        df_processado, contagem_genero = loader.load_processado(versao)
+
+        if df_processado is None:
+            raise ValueError("Erro ao carregar os dados! DataFrame está vazio.")
+
+        # O snapshot é somente leitura: contador e snapshot compartilham o mesmo DataFrame
+        contador = ContadorMortes(df_processado, copiar=False)
+        snapshot = cls(df_processado, contagem_genero, contador, versao)
+        if "ID" in df_processado.columns:
+            # Gravado ao lado do CSV: nas próximas cargas desta versão só é aberto (mmap)
+            with metricas.etapa("IndiceOffsets") as etapa:
+                snapshot.indice_offsets = IndiceOffsets.abrir(caminho_arquivo, versao, df_processado["ID"].to_numpy(), sep)
+                etapa.linhas = len(snapshot.indice_offsets) if snapshot.indice_offsets is not None else 0
+
+        # Registros recebidos pela API (por qualquer worker) e ainda não compactados no CSV
+        pendentes, snapshot.posicao_log = log.ler_desde((assinatura_csv, None, 0))
+        if pendentes:
+            with metricas.etapa("SnapshotDados.reaplicar_log") as etapa:
+                snapshot, _ = snapshot.com_registros(pendentes)
+                etapa.linhas = len(pendentes)
+        return snapshot
@@ -1,72 +1,365 @@
 # Corrigido: api.py
-from flask import Flask, jsonify
-import pandas as pd
+from flask import Flask, Response, g, jsonify, request
+import logging
 import os
+import threading
+import time
 
-# Importa as classes com os nomes corretos dos arquivos
-from DataLoader import DataLoader
-from ContadorMorte import ContadorMortes
-from DataAnalise import DataAnalise
+# Só módulos leves aqui: o pandas e o pipeline de dados são importados na primeira carga (carregar_dados)
+from ObservadorArquivo import ObservadorArquivo
+from Metricas import metricas
+from ConsultasApi import (ErroConsulta, corpo_registro, corpo_registro_original, corpo_registros, ler_registros_ndjson,
+                          preparar_breakdown, preparar_busca, preparar_exportacao, preparar_personagens)
+from SerializacaoJson import ProvedorJson, dumps
+from CacheRespostas import CacheConsultas
+from CompressaoRespostas import TIPOS_COMPRIMIVEIS, comprimir_blocos, comprimir_resposta, escolher_codificacao
+
+# Nível de log ajustável por GOT_LOG_LEVEL (DEBUG mostra as mensagens do caminho das requisições)
+logging.basicConfig(
+    level=os.environ.get("GOT_LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s %(message)s",
+)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# jsonify passa a usar o orjson (se instalado) e aceita tipos do NumPy/pandas sem conversão
+app.json = ProvedorJson(app)
+
+# Define o caminho do arquivo (pode ser trocado pela variável de ambiente GOT_CSV)
+caminho_arquivo = os.environ.get("GOT_CSV", "character-deaths.csv")
+
+# Carrega, pré-processa e indexa os dados na primeira vez que forem necessários (carregar_dados).
+# Todo o resultado fica em um snapshot imutável que é substituído por inteiro (atribuição atômica) quando o CSV muda.
+_snapshot = None
+_trava_carga = threading.Lock()
+# Exceção da última carga em segundo plano que falhou (iniciar_carga), mostrada em /api/ready
+_erro_carga = None
+
+# Log dos registros recebidos por POST, compartilhado pelos workers (criado junto com o primeiro snapshot);
+# a trava serializa ingestões, leituras do log, compactação e recargas dentro do processo
+_log_ingestao = None
+_trava_ingestao = threading.RLock()
+
+def _construir_snapshot():
+    """Monta um snapshot novo do CSV e do log, criando o LogIngestao na primeira vez. Chamar com _trava_carga."""
+    global _log_ingestao
+    from SnapshotDados import SnapshotDados
+    from IngestaoRegistros import LogIngestao
+
+    if _log_ingestao is None:
+        _log_ingestao = LogIngestao(caminho_arquivo, sep=";")
+    return SnapshotDados.construir(caminho_arquivo, sep=";", log=_log_ingestao)
+
+def carregar_dados():
+    """Carrega o CSV e monta o snapshot se isso ainda não foi feito; chamadas simultâneas esperam a mesma carga."""
+    global _snapshot, _erro_carga
+    if _snapshot is None:
+        with _trava_carga:
+            if _snapshot is None:
+                inicio = time.perf_counter()
+                _snapshot = _construir_snapshot()
+                _erro_carga = None
+                logger.info("Dados carregados de %s em %.2f s (versão %s).", caminho_arquivo,
+                            time.perf_counter() - inicio, _snapshot.versao['hash'][:16])
+    return _snapshot
+
+def dados_carregados():
+    """Indica se o snapshot já existe (sem disparar a carga)."""
+    return _snapshot is not None
+
+def _carregar_em_segundo_plano():
+    global _erro_carga
+    try:
+        carregar_dados()
+    except Exception as e:
+        _erro_carga = e
+        logger.exception("Falha ao carregar os dados de %s.", caminho_arquivo)
+
+# Thread da carga em segundo plano, iniciada por iniciar_carga(). A trava só protege a criação da thread:
+# ela nunca é mantida durante a carga, então /api/ready não espera por _trava_carga
+_thread_carga = None
+_trava_thread_carga = threading.Lock()
+
+def carga_em_andamento():
+    """Indica se a carga em segundo plano está rodando (sem esperar por ela)."""
+    thread = _thread_carga
+    return thread is not None and thread.is_alive()
+
+def iniciar_carga():
+    """Começa a carregar os dados em uma thread e retorna na hora: o servidor já responde a /api/health enquanto isso."""
+    global _thread_carga
+    with _trava_thread_carga:
+        if _snapshot is not None or carga_em_andamento():
+            return
+        _thread_carga = threading.Thread(target=_carregar_em_segundo_plano, name="carga-dados", daemon=True)
+        _thread_carga.start()
+
+def log_em_dia():
+    """Indica se o snapshot em uso já inclui tudo o que está no log de inclusões (só compara posições, sem ler o log)."""
+    snap = _snapshot
+    return snap is not None and _log_ingestao.posicao() == snap.posicao_log
+
+def snapshot_atual():
+    """Retorna o snapshot em uso (carrega os dados na primeira chamada) com os registros que outros workers incluíram.
+
+    Cada requisição deve pegá-lo uma única vez e usar só ele.
+    """
+    snap = _snapshot if _snapshot is not None else carregar_dados()
+    # Se outra thread deste processo já está incluindo ou recarregando, responde com o snapshot atual em vez de esperar
+    if _log_ingestao.posicao() != snap.posicao_log and _trava_ingestao.acquire(blocking=False):
+        try:
+            _acompanhar_log()
+        finally:
+            _trava_ingestao.release()
+        snap = _snapshot
+    return snap
+
+def corpo_prontidao():
+    """Corpo e status de /api/ready (usado também pelo modo ASGI). Só lê o estado da carga: nunca a espera."""
+    snap = _snapshot
+    if snap is not None:
+        return dumps({"status": "pronto", "versao": snap.versao["hash"][:16]}) + b"\n", 200
+    if _erro_carga is not None:
+        return dumps({"status": "erro", "mensagem": f"Falha ao carregar os dados: {_erro_carga}"}) + b"\n", 503
+    iniciar_carga()
+    return b'{"status":"carregando"}\n', 503
+
+# Quantidade de registros no log que dispara a compactação no CSV (GOT_COMPACTAR_A_CADA)
+COMPACTAR_A_CADA = int(os.environ.get("GOT_COMPACTAR_A_CADA", "1000"))
+
+def recarregar_dados():
+    """Reconstrói o pipeline fora do caminho das requisições e troca o snapshot de uma vez."""
+    global _snapshot
+
+    # Sem ingestões durante a recarga: o novo snapshot reaplica o log e nenhum registro fica de fora.
+    # A trava da carga evita que uma primeira carga ainda em andamento sobrescreva o snapshot mais novo.
+    # Se a primeira carga falhou, o log de inclusões é criado aqui, junto com o snapshot.
+    with _trava_ingestao, _trava_carga:
+        novo = _construir_snapshot()
+        _snapshot = novo
+    logger.info("Dados recarregados de %s (versão %s).", caminho_arquivo, novo.versao['hash'][:16])
+
+# Observador do CSV, iniciado por iniciar_observador()
+_observador = None
+
+def iniciar_observador(intervalo=2.0):
+    """Inicia a recarga automática quando o CSV é alterado."""
+    global _observador
+    if _observador is None:
+        _observador = ObservadorArquivo(caminho_arquivo, recarregar_dados, intervalo=intervalo)
+    _observador.iniciar()
+
+# Respostas (JSON e corpos comprimidos) de /api/characters, /api/breakdown e /api/search por versão dos dados
+_cache_consultas = CacheConsultas(max_respostas=128)
+
+def _acompanhar_log(para_incluir=False):
+    """Traz para o snapshot em uso o que outros workers gravaram no log de inclusões. Chamar com _trava_ingestao.
 
-# Define o caminho do arquivo
-caminho_arquivo = "character-deaths.csv"
+    Log só cresceu: lê a partir da posição do snapshot. Log removido ou substituído (compactação): reconstrói
+    o snapshot. Só o CSV mudou (edição externa): a recarga fica com o observador, que espera a escrita terminar,
+    exceto antes de uma inclusão (`para_incluir`), em que os IDs dependem de todos os registros já gravados.
+    """
+    global _snapshot
+    snap = _snapshot
+    assinatura_csv, inode, tamanho = _log_ingestao.posicao()
+    assinatura_snap, inode_snap, fim = snap.posicao_log
+    mesmo_log = inode == inode_snap and tamanho >= fim
+    if mesmo_log and assinatura_csv == assinatura_snap:
+        if tamanho == fim:
+            return
+        registros, posicao = _log_ingestao.ler_desde(snap.posicao_log)
+        if registros:
+            _snapshot, _ = snap.com_registros(registros, posicao)
+            logger.debug("%d registro(s) de outros workers incorporados.", len(registros))
+        elif posicao != snap.posicao_log:
+            _snapshot = snap.na_posicao_log(posicao)
+    elif not mesmo_log or para_incluir:
+        # O snapshot novo já lê o CSV atual: o observador não precisa recarregar de novo
+        if _observador is not None:
+            _observador.sincronizar()
+        recarregar_dados()
 
-# Verifica se o arquivo existe
-if not os.path.exists(caminho_arquivo):
-    raise FileNotFoundError(f"Erro: Arquivo {caminho_arquivo} não encontrado!")
+def ingerir(registros):
+    """Grava os registros validados no log, atualiza o snapshot e compacta o log se ele cresceu demais.
 
-# Carregar dados usando a classe corrigida
-loader = DataLoader(caminho_arquivo, sep=";")
-df_raw = loader.load()
+    Retorna os IDs dos registros incluídos. Usada também pelo modo ASGI (api_async.py).
+    """
+    global _snapshot
+    carregar_dados()
+    with _trava_ingestao:
+        # Trava exclusiva do log: nenhum outro worker grava entre a leitura do log e a gravação destes registros,
+        # então os IDs são calculados sobre todos os registros anteriores, na ordem do log (e do CSV após a compactação)
+        with _log_ingestao.travado():
+            _acompanhar_log(para_incluir=True)
+            posicao = _log_ingestao.anexar(registros)
+            # O snapshot em uso não é alterado: as requisições em andamento terminam sobre ele e as novas
+            # pegam o novo snapshot, trocado de uma vez como numa recarga
+            novo, df_novos = _snapshot.com_registros(registros, posicao)
+            _snapshot = novo
+        if novo.registros_incorporados >= COMPACTAR_A_CADA:
+            # Move o log para o CSV e recarrega: os IDs vêm do conteúdo, então não mudam
+            _log_ingestao.compactar()
+            # A alteração do CSV é deste processo e a recarga vem a seguir: o observador não recarrega de novo
+            if _observador is not None:
+                _observador.sincronizar()
+            recarregar_dados()
+    logger.debug("%d registro(s) incorporados.", len(df_novos))
+    return df_novos["ID"].tolist()
 
-if df_raw is None:
-    raise ValueError("Erro ao carregar os dados! DataFrame está vazio.")
+@app.before_request
+def _iniciar_cronometro():
+    g.inicio_requisicao = time.perf_counter()
 
-# Pré-processar os dados usando a classe corrigida
-analise = DataAnalise(df_raw)
-df_processado, contagem_genero = analise.processar()
+@app.after_request
+def _registrar_latencia(resposta):
+    """Alimenta o histograma de latência por endpoint (usa o modelo da rota, ex.: /api/record/<int:record_id>)."""
+    inicio = g.pop("inicio_requisicao", None)
+    if inicio is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "desconhecido"
+        metricas.observar_requisicao(endpoint, request.method, resposta.status_code, time.perf_counter() - inicio)
+    return resposta
 
-# Instanciar o contador com o DataFrame pré-processado
-contador = ContadorMortes(df_processado)
+@app.after_request
+def _comprimir(resposta):
+    """gzip/brotli conforme o Accept-Encoding (roda antes de _registrar_latencia, então entra na latência)."""
+    return comprimir_resposta(resposta, request)
+
+def _resposta_json_bytes(corpo, status=200):
+    """Envia bytes JSON já serializados sem passar pelo jsonify."""
+    return Response(corpo, status=status, mimetype="application/json")
+
+@app.errorhandler(ErroConsulta)
+def _erro_consulta(erro):
+    """Parâmetros inválidos e registros não encontrados: {"status": "erro", "mensagem": ...} com o status do erro."""
+    return _resposta_json_bytes(erro.corpo(), erro.status)
+
+def _em_cache(snap, nome, montar):
+    """Resposta de uma consulta guardada por versão dos dados (ETag/304 e corpos comprimidos reaproveitados)."""
+    return _cache_consultas.obter(snap.versao, nome, request.path, request.args.items(multi=True), montar).responder(request)
+
+@app.route("/api/health", methods=["GET"])
+def get_health():
+    """Verificação de vida do processo: responde na hora, sem tocar nos dados."""
+    return _resposta_json_bytes(b'{"status":"ok"}\n')
+
+@app.route("/api/ready", methods=["GET"])
+def get_ready():
+    """Prontidão: 200 com a versão dos dados depois de carregados; 503 enquanto carregam (e dispara a carga)."""
+    corpo, status = corpo_prontidao()
+    return _resposta_json_bytes(corpo, status)
 
 @app.route("/api/statistics", methods=["GET"])
 def get_statistics():
-    """Retorna estatísticas sobre as mortes dos personagens."""
-    estatisticas = contador.estatisticas_mortes()
-    if "Erro" in estatisticas:
-        return jsonify(estatisticas), 500 # Retorna erro se houver problema
-    return jsonify(estatisticas)
+    """Retorna estatísticas sobre as mortes dos personagens (304 se o cliente já tiver a versão atual)."""
+    # Retorna 500 se houve erro no cálculo (o status fica registrado na resposta pré-calculada)
+    return snapshot_atual().resposta_estatisticas.responder(request)
 
-@app.route("/api/record/<int:record_id>", methods=["GET"])
+@app.route("/api/record/<record_id>", methods=["GET"])
 def get_record(record_id):
-    """Retorna informações detalhadas de um personagem pelo ID (índice)."""
-    # Usa a coluna "ID" criada pelo DataLoader
-    if "ID" not in df_processado.columns:
-        return jsonify({"status": "erro", "mensagem": "Coluna ID não encontrada no DataFrame processado."}), 500
-        
-    registro = df_processado[df_processado["ID"] == record_id]
-    
-    if not registro.empty:
-        # Converte o registro para dicionário, tratando possíveis NaNs para JSON
-        # Usar fillna('') pode converter números em strings, melhor usar fillna(None) ou tratar na serialização
-        # Convertendo para JSON com tratamento de tipos não serializáveis
-        try:
-            registro_dict = registro.iloc[0].where(pd.notnull(registro.iloc[0]), None).to_dict()
-            return jsonify({"status": "sucesso", "dados": registro_dict})
-        except Exception as e:
-             return jsonify({"status": "erro", "mensagem": f"Erro ao serializar registro: {str(e)}"}), 500
-    else:
-        return jsonify({"status": "erro", "mensagem": f"ID {record_id} não encontrado"}), 404
+    """Retorna informações detalhadas de um personagem pelo ID (hash do nome + casa, estável entre recargas)."""
+    # Usa o índice construído a partir da coluna "ID" criada pelo DataLoader
+    return _resposta_json_bytes(corpo_registro(snapshot_atual(), record_id))
+
+@app.route("/api/record/<record_id>/original", methods=["GET"])
+def get_record_original(record_id):
+    """Retorna a linha do personagem como está no CSV (antes do pré-processamento), lida pela posição no arquivo."""
+    return _resposta_json_bytes(corpo_registro_original(snapshot_atual(), record_id))
+
+@app.route("/api/records", methods=["GET"])
+def get_records():
+    """Retorna vários personagens de uma vez a partir de ?ids=id1,id2,id3."""
+    return _resposta_json_bytes(corpo_registros(snapshot_atual(), request.args))
+
+@app.route("/api/record", methods=["POST"])
+def post_record():
+    """Inclui um personagem (objeto JSON com as colunas do CSV) e retorna o registro processado."""
+    from IngestaoRegistros import validar_registro
+
+    try:
+        registro = validar_registro(request.get_json(force=True, silent=True))
+    except ValueError as e:
+        raise ErroConsulta(str(e))
+
+    record_id = ingerir([registro])[0]
+    return _resposta_json_bytes(corpo_registro(snapshot_atual(), record_id), status=201)
+
+@app.route("/api/records", methods=["POST"])
+def post_records():
+    """Inclui vários personagens de uma vez: corpo NDJSON, um objeto JSON por linha (tudo ou nada)."""
+    ids = ingerir(ler_registros_ndjson(request.get_data()))
+    return jsonify({"status": "sucesso", "ids": ids, "total": len(ids)}), 201
+
+@app.route("/api/characters", methods=["GET"])
+def get_characters():
+    """Consulta filtrada e paginada de personagens, resolvida pela interseção dos bitmaps pré-calculados.
+
+    Filtros: gender, died, nobility, allegiances, book_of_death, got, cok, sos, ffc, dwd
+    (vários valores por vírgula). Paginação: page, page_size. Projeção: columns.
+    Ordenação: sort=coluna e order=asc|desc (nulos no fim; padrão: ordem do CSV).
+    """
+    snap = snapshot_atual()
+    # Cada página é montada uma vez por versão dos dados; as seguintes (e as revalidações com ETag) saem do cache
+    return _em_cache(snap, "characters", preparar_personagens(snap, request.args))
+
+@app.route("/api/export", methods=["GET"])
+def get_export():
+    """Exporta o dataset processado em blocos: ?format=ndjson (padrão), csv ou arrow.
+
+    Aceita os mesmos filtros e a projeção columns de /api/characters. A resposta é gerada
+    bloco a bloco a partir do snapshot do início da requisição (memória constante no servidor).
+    """
+    corpo, formato, mimetype = preparar_exportacao(snapshot_atual(), request.args)
+
+    # Os blocos são comprimidos à medida que são gerados (gzip/brotli conforme o Accept-Encoding)
+    codificacao = escolher_codificacao(request) if mimetype in TIPOS_COMPRIMIVEIS else None
+    if codificacao is not None:
+        corpo = comprimir_blocos(corpo, codificacao)
+    resposta = Response(corpo, mimetype=mimetype)
+    if codificacao is not None:
+        resposta.headers["Content-Encoding"] = codificacao
+    resposta.headers["Content-Disposition"] = f'attachment; filename="personagens.{formato}"'
+    return resposta
+
+@app.route("/api/breakdown", methods=["GET"])
+def get_breakdown():
+    """Mortes agrupadas por ?by=allegiances,gender,nobility,book_of_death, lidas do cubo pré-agregado.
+
+    Aceita os mesmos filtros de /api/characters nessas quatro dimensões para fatiar o cubo.
+    """
+    snap = snapshot_atual()
+    return _em_cache(snap, "breakdown", preparar_breakdown(snap, request.args))
+
+@app.route("/api/search", methods=["GET"])
+def get_search():
+    """Busca aproximada por nome e casa: ?q=texto&limit=10.
+
+    Os resultados vêm do índice de busca do snapshot (tokens normalizados, prefixos e trigramas),
+    ordenados pela pontuação; empates ficam na ordem do arquivo.
+    """
+    snap = snapshot_atual()
+    return _em_cache(snap, "busca", preparar_busca(snap, request.args))
 
 @app.route("/api/gender_count", methods=["GET"])
 def get_gender_count():
-    """Retorna a contagem de personagens por gênero."""
-    return jsonify(contagem_genero)
+    """Retorna a contagem de personagens por gênero (304 se o cliente já tiver a versão atual)."""
+    return snapshot_atual().resposta_genero.responder(request)
+
+@app.route("/api/deaths_by_year", methods=["GET"])
+def get_deaths_by_year():
+    """Retorna {ano: mortes} dos personagens mortos com ano de morte (304 se o cliente já tiver a versão atual)."""
+    return snapshot_atual().resposta_mortes_ano.responder(request)
+
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """Métricas do processo no formato de texto do Prometheus (latências por endpoint e etapas do pipeline)."""
+    return Response(metricas.texto_prometheus(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
+    # Carrega os dados em segundo plano: /api/health responde já e /api/ready passa a 200 quando terminar
+    iniciar_carga()
+    # Recarrega os dados automaticamente quando character-deaths.csv for alterado
+    iniciar_observador()
     # Roda o servidor Flask na porta 5000
-    # Desativar debug=True em produção
+    # Desativar debug=True em produção (em produção use: gunicorn -c gunicorn.conf.py api:app)
     app.run(host="0.0.0.0", port=5000, debug=False) 
 
@@ -0,0 +1,283 @@
+# api_async.py - Modo ASGI da API (Starlette/uvicorn): as mesmas rotas do api.py sobre o mesmo snapshot, com coalescência de requisições
+# Uso: uvicorn api_async:app --host 0.0.0.0 --port 5000 --no-access-log
+import asyncio
+import contextlib
+import re
+import time
+
+# starlette é opcional: só o modo ASGI precisa dele (e do uvicorn para servir)
+try:
+    from starlette.applications import Starlette
+    from starlette.responses import Response, StreamingResponse
+    from starlette.routing import Route
+except ImportError as e:
+    raise ImportError("O modo ASGI da API requer os pacotes 'starlette' e 'uvicorn' (pip install starlette uvicorn).") from e
+from werkzeug.http import http_date, parse_date, parse_etags, quote_etag
+
+# O api.py dá acesso ao snapshot (carregado na primeira consulta ou em segundo plano), à ingestão e ao observador do CSV
+import api
+from CacheRespostas import CacheConsultas
+from CompressaoRespostas import TAMANHO_MINIMO_COMPRESSAO, TIPOS_COMPRIMIVEIS, codificacao_aceita, comprimir, comprimir_blocos
+from ConsultasApi import (ErroConsulta, corpo_registro, corpo_registro_original, corpo_registros, ler_registros_ndjson,
+                          preparar_breakdown, preparar_busca, preparar_exportacao, preparar_personagens)
+from Metricas import metricas
+from SerializacaoJson import dumps, loads
+
+
+class CoalescedorRequisicoes:
+    def __init__(self):
+        """Requisições idênticas simultâneas aguardam um único cálculo (em uma thread) em vez de repeti-lo.
+
+        Só os cálculos em andamento ficam guardados: terminado o cálculo, a próxima requisição calcula de novo
+        (o que pode ser guardado por mais tempo fica nos caches por versão dos dados).
+        """
+        self._pendentes = {}  # chave -> tarefa em andamento
+
+    async def executar(self, chave, endpoint, funcao):
+        tarefa = self._pendentes.get(chave)
+        if tarefa is None:
+            # A tarefa não pertence a nenhuma requisição: se quem a criou desconectar, as outras continuam esperando
+            tarefa = asyncio.ensure_future(asyncio.to_thread(funcao))
+            self._pendentes[chave] = tarefa
+            tarefa.add_done_callback(lambda _: self._pendentes.pop(chave, None))
+        else:
+            metricas.observar_coalescencia(endpoint)
+        return await asyncio.shield(tarefa)
+
+
+_coalescedor = CoalescedorRequisicoes()
+
+# Respostas de /api/characters, /api/breakdown e /api/search por versão dos dados (como no api.py)
+_cache_consultas = CacheConsultas(max_respostas=128)
+
+rotas = []
+
+
+def _rota(caminho, metodos=("GET",)):
+    """Registra a rota e mede a latência com o mesmo rótulo de endpoint do api.py (ex.: /api/record/<record_id>)."""
+    endpoint = re.sub(r"\{(\w+)\}", r"<\1>", caminho)
+
+    def registrar(funcao):
+        async def atender(requisicao):
+            inicio = time.perf_counter()
+            try:
+                resposta = await funcao(requisicao, endpoint)
+            except ErroConsulta as erro:
+                resposta = _json(erro.corpo(), erro.status)
+            metricas.observar_requisicao(endpoint, requisicao.method, resposta.status_code, time.perf_counter() - inicio)
+            return resposta
+
+        rotas.append(Route(caminho, atender, methods=list(metodos)))
+        return funcao
+
+    return registrar
+
+
+def _json(corpo, status=200, cabecalhos=None):
+    return Response(corpo, status_code=status, media_type="application/json", headers=cabecalhos)
+
+
+def _chave(requisicao, codificacao, snap):
+    """Chave do coalescedor: só junta requisições sobre a mesma versão dos dados (após uma recarga ou inclusão, calcula de novo)."""
+    return (snap.versao["hash"], requisicao.url.path, tuple(sorted(requisicao.query_params.multi_items())), codificacao)
+
+
+def _codificacao(requisicao):
+    return codificacao_aceita(requisicao.headers.get("accept-encoding"))
+
+
+def _nao_modificada(requisicao, etag, ultima_modificacao):
+    """Mesma regra do make_conditional do Flask: If-None-Match (comparação fraca) ou If-Modified-Since."""
+    if_none_match = requisicao.headers.get("if-none-match")
+    if if_none_match is not None:
+        return parse_etags(if_none_match).contains_weak(etag)
+    desde = parse_date(requisicao.headers.get("if-modified-since"))
+    return desde is not None and ultima_modificacao.replace(microsecond=0) <= desde
+
+
+def _responder_versionada(requisicao, resposta, representacao):
+    """Resposta de uma RespostaVersionada (corpo, codificação e ETag já escolhidos) ou 304."""
+    corpo, codificacao, etag = representacao
+    cabecalhos = {
+        "ETag": quote_etag(etag),
+        "Last-Modified": http_date(resposta.ultima_modificacao),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if resposta.status == 200 and _nao_modificada(requisicao, etag, resposta.ultima_modificacao):
+        return Response(status_code=304, headers=cabecalhos)
+    if codificacao is not None:
+        cabecalhos["Content-Encoding"] = codificacao
+    return _json(corpo, resposta.status, cabecalhos)
+
+
+async def _snapshot_atual():
+    """Snapshot em uso; a carga dos dados e a leitura do que outros processos gravaram no log rodam em uma thread, fora do loop."""
+    if api.log_em_dia():
+        return api.snapshot_atual()
+    return await asyncio.to_thread(api.snapshot_atual)
+
+
+async def _versionada_em_cache(requisicao, endpoint, nome, preparar):
+    """Consulta guardada por versão dos dados; requisições idênticas simultâneas montam e comprimem o corpo uma vez."""
+    snap = await _snapshot_atual()
+    # Valida os parâmetros já, fora do coalescedor: parâmetros inválidos não ocupam a thread de ninguém
+    montar = preparar(snap, requisicao.query_params)
+    codificacao = _codificacao(requisicao)
+
+    def calcular():
+        resposta = _cache_consultas.obter(snap.versao, nome, requisicao.url.path,
+                                          requisicao.query_params.multi_items(), montar)
+        return resposta, resposta.representacao(codificacao)
+
+    resposta, representacao = await _coalescedor.executar(_chave(requisicao, codificacao, snap), endpoint, calcular)
+    return _responder_versionada(requisicao, resposta, representacao)
+
+
+async def _calculada(requisicao, endpoint, snap, montar):
+    """Corpo calculado a cada requisição (coalescido entre as idênticas) e comprimido se o cliente aceitar."""
+    codificacao = _codificacao(requisicao)
+
+    def calcular():
+        corpo = montar()
+        if codificacao is None or len(corpo) < TAMANHO_MINIMO_COMPRESSAO:
+            return corpo, None
+        return comprimir(corpo, codificacao), codificacao
+
+    corpo, usada = await _coalescedor.executar(_chave(requisicao, codificacao, snap), endpoint, calcular)
+    cabecalhos = {"Vary": "Accept-Encoding"}
+    if usada is not None:
+        cabecalhos["Content-Encoding"] = usada
+    return _json(corpo, cabecalhos=cabecalhos)
+
+
+@_rota("/api/health")
+async def get_health(requisicao, endpoint):
+    """Verificação de vida do processo: responde no loop, sem tocar nos dados."""
+    return _json(b'{"status":"ok"}\n')
+
+
+@_rota("/api/ready")
+async def get_ready(requisicao, endpoint):
+    # corpo_prontidao só lê o estado da carga (no máximo inicia a thread): pode rodar no loop sem travá-lo
+    corpo, status = api.corpo_prontidao()
+    return _json(corpo, status)
+
+
+@_rota("/api/statistics")
+async def get_statistics(requisicao, endpoint):
+    """Estatísticas das mortes, pré-calculadas no snapshot: respondidas direto no loop, sem thread."""
+    resposta = (await _snapshot_atual()).resposta_estatisticas
+    return _responder_versionada(requisicao, resposta, resposta.representacao(_codificacao(requisicao)))
+
+
+@_rota("/api/gender_count")
+async def get_gender_count(requisicao, endpoint):
+    resposta = (await _snapshot_atual()).resposta_genero
+    return _responder_versionada(requisicao, resposta, resposta.representacao(_codificacao(requisicao)))
+
+
+@_rota("/api/deaths_by_year")
+async def get_deaths_by_year(requisicao, endpoint):
+    resposta = (await _snapshot_atual()).resposta_mortes_ano
+    return _responder_versionada(requisicao, resposta, resposta.representacao(_codificacao(requisicao)))
+
+
+@_rota("/api/record/{record_id}")
+async def get_record(requisicao, endpoint):
+    # JSON pré-serializado no índice de registros: uma consulta ao dicionário, feita no próprio loop
+    return _json(corpo_registro(await _snapshot_atual(), requisicao.path_params["record_id"]))
+
+
+@_rota("/api/record/{record_id}/original")
+async def get_record_original(requisicao, endpoint):
+    snap = await _snapshot_atual()
+    return await _calculada(requisicao, endpoint, snap, lambda: corpo_registro_original(snap, requisicao.path_params["record_id"]))
+
+
+@_rota("/api/records")
+async def get_records(requisicao, endpoint):
+    snap = await _snapshot_atual()
+    return await _calculada(requisicao, endpoint, snap, lambda: corpo_registros(snap, requisicao.query_params))
+
+
+@_rota("/api/record", metodos=("POST",))
+async def post_record(requisicao, endpoint):
+    from IngestaoRegistros import validar_registro
+
+    try:
+        dados = loads(await requisicao.body())
+    except ValueError:
+        # Como o get_json(silent=True) do api.py: corpo que não é JSON vira "registro ausente"
+        dados = None
+    try:
+        registro = validar_registro(dados)
+    except ValueError as e:
+        raise ErroConsulta(str(e))
+    # A ingestão grava em disco e usa a trava do api.py: roda em uma thread
+    record_id = (await asyncio.to_thread(api.ingerir, [registro]))[0]
+    return _json(corpo_registro(await _snapshot_atual(), record_id), status=201)
+
+
+@_rota("/api/records", metodos=("POST",))
+async def post_records(requisicao, endpoint):
+    registros = ler_registros_ndjson(await requisicao.body())
+    ids = await asyncio.to_thread(api.ingerir, registros)
+    return _json(dumps({"status": "sucesso", "ids": ids, "total": len(ids)}) + b"\n", status=201)
+
+
+@_rota("/api/characters")
+async def get_characters(requisicao, endpoint):
+    return await _versionada_em_cache(requisicao, endpoint, "characters", preparar_personagens)
+
+
+@_rota("/api/breakdown")
+async def get_breakdown(requisicao, endpoint):
+    return await _versionada_em_cache(requisicao, endpoint, "breakdown", preparar_breakdown)
+
+
+@_rota("/api/search")
+async def get_search(requisicao, endpoint):
+    return await _versionada_em_cache(requisicao, endpoint, "busca", preparar_busca)
+
+
+@_rota("/api/export")
+async def get_export(requisicao, endpoint):
+    corpo, formato, mimetype = preparar_exportacao(await _snapshot_atual(), requisicao.query_params)
+    codificacao = _codificacao(requisicao) if mimetype in TIPOS_COMPRIMIVEIS else None
+    cabecalhos = {"Content-Disposition": f'attachment; filename="personagens.{formato}"', "Vary": "Accept-Encoding"}
+    if codificacao is not None:
+        corpo = comprimir_blocos(corpo, codificacao)
+        cabecalhos["Content-Encoding"] = codificacao
+    # O gerador é síncrono: o Starlette consome cada bloco em uma thread, sem travar o loop
+    return StreamingResponse(corpo, media_type=mimetype, headers=cabecalhos)
+
+
+@_rota("/api/metrics")
+async def get_metrics(requisicao, endpoint):
+    corpo = metricas.texto_prometheus().encode("utf-8")
+    codificacao = _codificacao(requisicao)
+    cabecalhos = {"Vary": "Accept-Encoding"}
+    if codificacao is not None and len(corpo) >= TAMANHO_MINIMO_COMPRESSAO:
+        corpo = comprimir(corpo, codificacao)
+        cabecalhos["Content-Encoding"] = codificacao
+    return Response(corpo, media_type="text/plain; version=0.0.4", headers=cabecalhos)
+
+
+@contextlib.asynccontextmanager
+async def _ciclo_de_vida(aplicacao):
+    # O servidor já aceita conexões (/api/health) enquanto os dados carregam em segundo plano
+    api.iniciar_carga()
+    # Recarrega os dados quando o CSV muda (cada processo do uvicorn tem o próprio observador)
+    api.iniciar_observador()
+    yield
+
+
+app = Starlette(routes=rotas, lifespan=_ciclo_de_vida)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # Um processo, um loop: as rotas pré-calculadas respondem no loop e as demais usam o pool de threads
+    uvicorn.run(app, host="0.0.0.0", port=5000, access_log=False)
@@ -1,14 +1,13 @@
 # app.py - Game of Thrones Deaths Analyzer
 import os
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 
-# Importa as classes
-from DataLoader import DataLoader
-from DataAnalise import DataAnalise
+# Importa as classes. As que dependem do pandas são importadas onde são usadas (carregar_recursos e modo cliente):
+# a página começa a ser desenhada antes de o pandas e o pipeline de dados serem carregados
+from FigurasGraficos import (estado_filtros, figura_genero, figura_genero_de_contagem, figura_mortes_de_contagem,
+                             figura_mortes_por_ano, pre_agregar)
+from ClienteApi import ClienteApi
+from HistogramaContagem import HistogramaContagem
 
 # 🎨 CONFIGURAÇÃO VISUAL AVANÇADA
 st.set_page_config(
@@ -190,8 +189,18 @@ with st.sidebar:
 
 # 🔍 CARREGAMENTO DE DADOS
 caminho_arquivo = "character-deaths.csv"
+# Com GOT_API_URL (ex.: http://localhost:5000) o app consome a API em vez de processar o CSV:
+# todas as sessões compartilham o único dataset processado pela API
+url_api = os.environ.get("GOT_API_URL")
 
-if not os.path.exists(caminho_arquivo):
+# Tamanhos de página da tabela (só a página visível é montada e enviada ao navegador)
+TAMANHOS_PAGINA = [50, 100, 500, 1000]
+
+# Ordem de exibição das estatísticas (o JSON da API vem com as chaves em ordem alfabética)
+ORDEM_ESTATISTICAS = ["Total de Mortes", "Média do Ano das Mortes", "Mediana do Ano das Mortes",
+                      "Desvio Padrão do Ano das Mortes", "Ano Mínimo de Morte", "Ano Máximo de Morte"]
+
+if not url_api and not os.path.exists(caminho_arquivo):
     st.markdown('<div class="section-header"><h2>📁 Upload de Arquivo</h2></div>', unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -212,28 +221,120 @@ if not os.path.exists(caminho_arquivo):
             st.stop()
 
 # 🔍 PROCESSAMENTO DOS DADOS
-@st.cache_data
-def carregar_e_processar_dados(caminho):
+# cache_resource: o DataFrame e os objetos derivados são compartilhados entre reruns e sessões,
+# sem o pickle/hash do DataFrame inteiro que o cache_data faz a cada acesso. Tudo é somente leitura.
+@st.cache_resource(max_entries=2, show_spinner=False)
+def carregar_recursos(caminho, assinatura):
+    """`assinatura` (mtime, tamanho) só entra na chave do cache: uma alteração no CSV recarrega os dados."""
+    from DataLoader import DataLoader
+    from ContadorMorte import ContadorMortes
+    from IndiceFiltros import IndiceFiltros
+
     with st.spinner("🔄 Carregando dados dos Sete Reinos..."):
         loader = DataLoader(caminho, sep=";")
-        df_raw = loader.load()
-        
-        if df_raw is None or df_raw.empty:
-            return None, None
-        
-        analyzer = DataAnalise(df_raw.copy())
         try:
-            df_processado, contagem_genero = analyzer.processar()
-            return df_processado, contagem_genero
+            versao = loader.versao()
+            # Lê do cache colunar (Feather) quando ele corresponde ao CSV atual; senão processa e grava o cache
+            df_processado, contagem_genero = loader.load_processado(versao)
         except Exception as e:
             st.error(f"❌ Erro durante o processamento: {e}")
-            return None, None
+            return None
+
+        if df_processado is None or df_processado.empty:
+            return None
+        # O contador e os bitmaps de filtro compartilham o DataFrame (sem cópia)
+        contador = ContadorMortes(df_processado, copiar=False)
+        return {
+            "df": df_processado,
+            "contagem_genero": contagem_genero,
+            "versao": versao["hash"],
+            "contador": contador,
+            "indice_filtros": IndiceFiltros(df_processado),
+            # Só os mortos com ano de morte (o contador preenche o ano dos vivos com 0 no DataFrame)
+            "ano_mais_mortal": contador.histograma_anos.moda(),
+        }
 
-df_processado, contagem_genero = carregar_e_processar_dados(caminho_arquivo)
+@st.cache_resource(show_spinner=False)
+def obter_cliente(url):
+    """Um cliente (pool de conexões + cache de respostas) compartilhado por todas as sessões."""
+    return ClienteApi(url)
+
+if url_api:
+    cliente = obter_cliente(url_api)
+    recursos = None
+    try:
+        # Revalidações baratas: a API responde 304 enquanto os dados não mudam
+        stats_mortes = cliente.estatisticas()
+        contagem_genero = cliente.contagem_generos()
+        versao_dados = cliente.versao()
+        # Mesma moda do modo local, a partir de {ano: mortes} agregado pela API
+        ano_mais_mortal = HistogramaContagem(cliente.mortes_por_ano()).moda()
+        stats_mortes = dict(sorted(stats_mortes.items(), key=lambda item: (
+            ORDEM_ESTATISTICAS.index(item[0]) if item[0] in ORDEM_ESTATISTICAS else len(ORDEM_ESTATISTICAS))))
+        contagem_genero = dict(sorted(contagem_genero.items(), key=lambda item: -item[1]))
+    except Exception as e:
+        st.error(f"💀 Falha ao consultar a API em {url_api}: {e}")
+        st.stop()
+    total_personagens = sum(contagem_genero.values())
+    mortes_total = stats_mortes.get("Total de Mortes", 0)
+else:
+    estado_arquivo = os.stat(caminho_arquivo)
+    recursos = carregar_recursos(caminho_arquivo, (estado_arquivo.st_mtime_ns, estado_arquivo.st_size))
+
+    if recursos is None:
+        st.error("💀 Falha ao carregar os dados dos personagens.")
+        st.stop()
+
+    df_processado = recursos["df"]
+    contagem_genero = recursos["contagem_genero"]
+    versao_dados = recursos["versao"]
+    # Calculadas uma vez pelo contador em cache (estatisticas_mortes é memoizado)
+    stats_mortes = recursos["contador"].estatisticas_mortes()
+    total_personagens = len(df_processado)
+    mortes_total = recursos["contador"].contar_mortes()
+    ano_mais_mortal = recursos["ano_mais_mortal"]
+
+# 🔍 RESULTADOS POR FILTRO (memo LRU por versão + estado dos filtros, resolvido pelos bitmaps)
+@st.cache_resource(max_entries=64, show_spinner=False)
+def resultado_filtro(versao, filtros, _indice_filtros):
+    """Bitmap das linhas selecionadas, quantas são e quantas delas são mortes (sem montar o DataFrame filtrado)."""
+    bitmap = _indice_filtros.filtrar({dimensao: list(valores) for dimensao, valores in filtros})
+    mortes = 0
+    if "Morreu" in _indice_filtros.dimensoes:
+        mortes = _indice_filtros.contar(bitmap & _indice_filtros.filtrar({"Morreu": ["1"]}))
+    return bitmap, _indice_filtros.contar(bitmap), mortes
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def ordem_por_coluna(versao, coluna, decrescente, _df_processado):
+    from IndiceFiltros import ordem_coluna
+
+    return ordem_coluna(_df_processado[coluna], decrescente)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def pagina_filtrada(versao, filtros, colunas, ordenacao, pagina, tamanho_pagina, _df_processado, _indice_filtros, _bitmap):
+    """Monta só as linhas da página pedida, na ordem de `ordenacao` ((coluna, decrescente) ou None)."""
+    inicio = (pagina - 1) * tamanho_pagina
+    if ordenacao is None:
+        posicoes = _indice_filtros.posicoes(_bitmap, inicio, inicio + tamanho_pagina)
+    else:
+        ordem = ordem_por_coluna(versao, ordenacao[0], ordenacao[1], _df_processado)
+        posicoes = _indice_filtros.posicoes_ordenadas(_bitmap, ordem, inicio, inicio + tamanho_pagina)
+    return _df_processado.iloc[posicoes][list(colunas)]
 
-if df_processado is None:
-    st.error("💀 Falha ao carregar os dados dos personagens.")
-    st.stop()
+# 🔍 DADOS DOS GRÁFICOS (pré-agregados uma vez por versão; figuras em cache por versão + filtros)
+# Parâmetros com "_" não entram no hash do Streamlit: a chave é só o hash do CSV (e os filtros)
+@st.cache_data(show_spinner=False)
+def dados_graficos(versao, _df_processado):
+    return pre_agregar(_df_processado)
+
+@st.cache_data(show_spinner=False)
+def figuras_graficos(versao, filtros, _agregado):
+    return figura_genero(_agregado, filtros), figura_mortes_por_ano(_agregado, filtros)
+
+@st.cache_data(show_spinner=False)
+def figuras_graficos_api(versao, _cliente):
+    """Modo cliente: figuras a partir de /api/gender_count e das mortes por ano, por versão (ETag) dos dados."""
+    return figura_genero_de_contagem(_cliente.contagem_generos()), figura_mortes_de_contagem(_cliente.mortes_por_ano())
 
 # 🔍 ESTATÍSTICAS PRINCIPAIS
 if show_statistics:
@@ -244,13 +345,12 @@ if show_statistics:
     with col1:
         st.markdown(f"""
         <div class="metric-card">
-            <h3>{len(df_processado)}</h3>
+            <h3>{total_personagens}</h3>
             <p>Total de Personagens</p>
         </div>
         """, unsafe_allow_html=True)
     
     with col2:
-        mortes_total = df_processado['Morreu'].sum() if 'Morreu' in df_processado.columns else 0
         st.markdown(f"""
         <div class="metric-card">
             <h3>{mortes_total}</h3>
@@ -269,64 +369,37 @@ if show_statistics:
             """, unsafe_allow_html=True)
     
     with col4:
-        if 'Death_Year' in df_processado.columns:
-            ano_mortes = df_processado['Death_Year'].dropna()
-            if not ano_mortes.empty:
-                ano_mais_mortal = ano_mortes.mode().iloc[0] if not ano_mortes.mode().empty else "N/A"
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>{ano_mais_mortal}</h3>
-                    <p>Ano Mais Mortal</p>
-                </div>
-                """, unsafe_allow_html=True)
+        if ano_mais_mortal is not None:
+            st.markdown(f"""
+            <div class="metric-card">
+                <h3>{ano_mais_mortal}</h3>
+                <p>Ano Mais Mortal</p>
+            </div>
+            """, unsafe_allow_html=True)
 
 # 🔍 GRÁFICOS INTERATIVOS
-if show_charts and not df_processado.empty:
+if show_charts and total_personagens:
     st.markdown('<div class="section-header"><h2>📈 Análises Visuais</h2></div>', unsafe_allow_html=True)
     
+    # Os gráficos mostram o dataset inteiro (estado de filtros vazio)
+    if recursos is None:
+        fig_genero, fig_mortes = figuras_graficos_api(versao_dados, cliente)
+    else:
+        fig_genero, fig_mortes = figuras_graficos(
+            versao_dados, estado_filtros(), dados_graficos(versao_dados, df_processado)
+        )
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        if contagem_genero:
+        if fig_genero is not None:
             # Gráfico de pizza para gêneros
-            fig_genero = px.pie(
-                values=list(contagem_genero.values()),
-                names=list(contagem_genero.keys()),
-                title="Distribuição por Gênero",
-                color_discrete_sequence=['#3498DB', '#E74C3C', '#2ECC71', '#F39C12']
-            )
-            fig_genero.update_layout(
-                plot_bgcolor='rgba(0,0,0,0)',
-                paper_bgcolor='rgba(0,0,0,0)',
-                font_color='#2C3E50',
-                title_font_color='#2C3E50',
-                title_font_size=16,
-                title_font_weight='bold'
-            )
             st.plotly_chart(fig_genero, use_container_width=True)
     
     with col2:
-        if 'Death_Year' in df_processado.columns:
-            # Histograma de mortes por ano
-            mortes_por_ano = df_processado[df_processado['Morreu'] == 1]['Death_Year'].dropna()
-            if not mortes_por_ano.empty:
-                fig_mortes = px.histogram(
-                    x=mortes_por_ano,
-                    title="Mortes por Ano",
-                    nbins=20,
-                    color_discrete_sequence=['#E74C3C']
-                )
-                fig_mortes.update_layout(
-                    plot_bgcolor='rgba(0,0,0,0)',
-                    paper_bgcolor='rgba(0,0,0,0)',
-                    font_color='#2C3E50',
-                    title_font_color='#2C3E50',
-                    title_font_size=16,
-                    title_font_weight='bold',
-                    xaxis_title="Ano",
-                    yaxis_title="Número de Mortes"
-                )
-                st.plotly_chart(fig_mortes, use_container_width=True)
+        if fig_mortes is not None:
+            # Mortes por ano (contagens já agrupadas por ano)
+            st.plotly_chart(fig_mortes, use_container_width=True)
 
 # 🔍 TABELA DE DADOS
 if show_raw_data:
@@ -336,48 +409,44 @@ if show_raw_data:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        if 'Gender_Str' in df_processado.columns:
-            generos_unicos = df_processado['Gender_Str'].dropna().unique()
-            filtro_genero = st.multiselect(
-                "Filtrar por Gênero:",
-                options=generos_unicos,
-                default=generos_unicos
-            )
+        generos_unicos = list(contagem_genero) if recursos is None else recursos["indice_filtros"].valores('Gender_Str')
+        filtro_genero = st.multiselect(
+            "Filtrar por Gênero:",
+            options=generos_unicos,
+            default=generos_unicos
+        )
     
     with col2:
-        if 'Morreu' in df_processado.columns:
-            filtro_morreu = st.selectbox(
-                "💀 Status:",
-                options=["Todos", "Vivos", "Mortos"],
-                index=0
-            )
+        filtro_morreu = st.selectbox(
+            "💀 Status:",
+            options=["Todos", "Vivos", "Mortos"],
+            index=0
+        )
     
     with col3:
-        if 'Nobility' in df_processado.columns:
-            filtro_nobreza = st.selectbox(
-                "👑 Nobreza:",
-                options=["Todos", "Nobre", "Plebeu"],
-                index=0
-            )
-    
-    # Aplicar filtros
-    df_filtrado = df_processado.copy()
-    
-    if 'Gender_Str' in df_processado.columns and filtro_genero:
-        df_filtrado = df_filtrado[df_filtrado['Gender_Str'].isin(filtro_genero)]
-    
-    if 'Morreu' in df_processado.columns and filtro_morreu != "Todos":
-        if filtro_morreu == "Vivos":
-            df_filtrado = df_filtrado[df_filtrado['Morreu'] == 0]
-        else:
-            df_filtrado = df_filtrado[df_filtrado['Morreu'] == 1]
+        filtro_nobreza = st.selectbox(
+            "👑 Nobreza:",
+            options=["Todos", "Nobre", "Plebeu"],
+            index=0
+        )
     
-    if 'Nobility' in df_processado.columns and filtro_nobreza != "Todos":
-        valor_nobreza = 1 if filtro_nobreza == "Nobre" else 0
-        df_filtrado = df_filtrado[df_filtrado['Nobility'] == valor_nobreza]
+    # Estado dos filtros -> dimensões do IndiceFiltros (sem filtro de gênero se nada for selecionado)
+    filtros = {}
+    if filtro_genero:
+        filtros['Gender_Str'] = filtro_genero
+    if filtro_morreu != "Todos":
+        filtros['Morreu'] = ["0"] if filtro_morreu == "Vivos" else ["1"]
+    if filtro_nobreza != "Todos":
+        filtros['Nobility'] = ["1"] if filtro_nobreza == "Nobre" else ["0"]
+    estado = estado_filtros(**filtros)
     
     # Seleção de colunas
-    colunas_disponiveis = df_filtrado.columns.tolist()
+    if recursos is None:
+        # As colunas disponíveis vêm de um registro qualquer (a API não tem um endpoint de esquema)
+        amostra = cliente.personagens(tamanho_pagina=1)["dados"]
+        colunas_disponiveis = list(amostra[0]) if amostra else []
+    else:
+        colunas_disponiveis = df_processado.columns.tolist()
     colunas_padrao = ["Name", "Allegiances", "Gender_Str", "Nobility", "Death_Year", "Morreu", "Book of Death"]
     colunas_padrao = [col for col in colunas_padrao if col in colunas_disponiveis]
     
@@ -387,46 +456,87 @@ if show_raw_data:
         default=colunas_padrao
     )
     
+    # Ordenação e paginação
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        ordenar_por = st.selectbox("Ordenar por:", options=["(ordem original)"] + colunas_disponiveis, index=0)
+    with col2:
+        sentido = st.selectbox("Sentido:", options=["Crescente", "Decrescente"], index=0)
+    with col3:
+        tamanho_pagina = st.selectbox("Linhas por página:", options=TAMANHOS_PAGINA, index=1)
+    ordenacao = None if ordenar_por == "(ordem original)" else (ordenar_por, sentido == "Decrescente")
+    # A página escolhida fica no session_state: o campo só é desenhado (na coluna col4) depois que o
+    # total filtrado é conhecido, para limitar a página à última existente
+    pagina = st.session_state.get("pagina", 1)
+    
     if colunas_selecionadas:
-        st.dataframe(
-            df_filtrado[colunas_selecionadas],
-            use_container_width=True,
-            height=400
-        )
-        st.caption(f"Exibindo {len(df_filtrado)} de {len(df_processado)} personagens")
+        if recursos is None:
+            # Modo cliente: filtragem, ordenação e paginação feitas pela API (/api/characters)
+            import pandas as pd
+            from IndiceFiltros import PARAMETROS_FILTRO
+
+            filtros_api = {parametro: filtros[dimensao] for parametro, dimensao in PARAMETROS_FILTRO.items() if dimensao in filtros}
+
+            def buscar_pagina(numero):
+                return cliente.personagens(filtros_api, numero, tamanho_pagina, colunas_selecionadas,
+                                           *(ordenacao or (None, False)))
+
+            # O total vem junto com a página; se a página pedida passou da última, busca a última
+            resposta = buscar_pagina(pagina)
+            total_filtrado = resposta["total"]
+            total_paginas = max(1, -(-total_filtrado // tamanho_pagina))
+            if pagina > total_paginas:
+                pagina = total_paginas
+                resposta = buscar_pagina(pagina)
+            tabela = pd.DataFrame(resposta["dados"], columns=colunas_selecionadas)
+            resumo_mortes = ""
+        else:
+            # Contagem pelo bitmap; só a página visível vira DataFrame
+            bitmap, total_filtrado, mortes_filtradas = resultado_filtro(versao_dados, estado, recursos["indice_filtros"])
+            total_paginas = max(1, -(-total_filtrado // tamanho_pagina))
+            pagina = min(pagina, total_paginas)
+            tabela = pagina_filtrada(versao_dados, estado, tuple(colunas_selecionadas), ordenacao, pagina,
+                                     tamanho_pagina, df_processado, recursos["indice_filtros"], bitmap)
+            resumo_mortes = f" ({mortes_filtradas} mortes)"
+
+        # Filtros ou tamanho de página mudaram e a página escolhida não existe mais: fica na última
+        st.session_state["pagina"] = pagina
+        with col4:
+            st.number_input("Página:", min_value=1, max_value=total_paginas, step=1, key="pagina")
+        
+        if total_filtrado == 0:
+            st.info("Nenhum personagem corresponde aos filtros selecionados.")
+        else:
+            st.dataframe(
+                tabela,
+                use_container_width=True,
+                height=400
+            )
+        st.caption(f"Página {pagina} de {total_paginas} · {total_filtrado} de {total_personagens} personagens{resumo_mortes}")
     else:
         st.warning("Selecione pelo menos uma coluna para exibir os dados.")
 
 # 🔍 ESTATÍSTICAS DETALHADAS
 if show_statistics:
-    try:
-        from ContadorMorte import ContadorMortes
-        
-        st.markdown('<div class="section-header"><h2>📈 Estatísticas Detalhadas</h2></div>', unsafe_allow_html=True)
+    st.markdown('<div class="section-header"><h2>📈 Estatísticas Detalhadas</h2></div>', unsafe_allow_html=True)
+    
+    if "Erro" not in stats_mortes:
+        col1, col2 = st.columns(2)
         
-        contador = ContadorMortes(df_processado)
-        stats_mortes = contador.estatisticas_mortes()
+        with col1:
+            st.markdown("### Estatísticas de Mortes")
+            for key, value in stats_mortes.items():
+                if key != "Total de Mortes":
+                    st.metric(key, value)
         
-        if "Erro" not in stats_mortes:
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown("### Estatísticas de Mortes")
-                for key, value in stats_mortes.items():
-                    if key != "Total de Mortes":
-                        st.metric(key, value)
-            
-            with col2:
-                if contagem_genero:
-                    st.markdown("### Distribuição por Gênero")
-                    for genero, count in contagem_genero.items():
-                        percentage = (count / len(df_processado)) * 100
-                        st.metric(f"{genero}", f"{count} ({percentage:.1f}%)")
-        else:
-            st.warning(f"Erro ao calcular estatísticas: {stats_mortes['Erro']}")
-    
-    except ImportError:
-        st.info("Classe ContadorMortes não disponível para estatísticas detalhadas.")
+        with col2:
+            if contagem_genero:
+                st.markdown("### Distribuição por Gênero")
+                for genero, count in contagem_genero.items():
+                    percentage = (count / total_personagens) * 100
+                    st.metric(f"{genero}", f"{count} ({percentage:.1f}%)")
+    else:
+        st.warning(f"Erro ao calcular estatísticas: {stats_mortes['Erro']}")
 
 # FOOTER
 st.markdown("---")
@@ -0,0 +1,47 @@
+# bench_cache_colunar.py - Partida a frio lendo o CSV + pré-processamento x cache Feather do DataLoader
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataLoader import DataLoader, feather
+from gerador_dados import gerar_csv
+
+
+def medir(loader, versao, usar_cache):
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        df_processado, _ = loader.load_processado(versao, usar_cache=usar_cache)
+        return time.perf_counter() - inicio, len(df_processado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    if feather is None:
+        sys.exit("pyarrow não está instalado: o cache colunar fica desativado.")
+
+    with tempfile.TemporaryDirectory() as pasta:
+        loader = DataLoader(gerar_csv(os.path.join(pasta, "sintetico.csv"), args.linhas), sep=";")
+        versao = loader.versao()
+
+        tempo_csv, linhas = medir(loader, versao, usar_cache=False)
+        medir(loader, versao, usar_cache=True)  # primeira carga grava o cache
+        tempo_cache, _ = medir(loader, versao, usar_cache=True)
+        tamanho_cache = os.path.getsize(loader.caminho_cache(versao))
+
+    print(f"Linhas: {linhas:,}")
+    print(f"CSV + DataAnalise.processar: {tempo_csv:.3f} s")
+    print(f"Cache Feather (mmap):        {tempo_cache:.3f} s  ({tamanho_cache / 1e6:.1f} MB em disco)")
+    print(f"Aceleração:                  {tempo_csv / tempo_cache:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# bench_memoria_esquema.py - Relatório de memória do DataFrame com e sem o esquema tipado do DataLoader
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataAnalise import DataAnalise
+from DataLoader import DataLoader, relatorio_memoria
+from gerador_dados import gerar_csv
+
+
+def carregar(caminho, usar_esquema):
+    """Carrega e pré-processa o CSV, retornando (df_bruto, df_processado)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df_raw = DataLoader(caminho, sep=";", usar_esquema=usar_esquema).load()
+        df_processado, _ = DataAnalise(df_raw).processar()
+    return df_raw, df_processado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--csv", help="CSV a usar no lugar dos dados sintéticos")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = args.csv or gerar_csv(os.path.join(pasta, "sintetico.csv"), args.linhas)
+        bruto_sem, processado_sem = carregar(caminho, usar_esquema=False)
+        bruto_com, processado_com = carregar(caminho, usar_esquema=True)
+
+    relatorio = pd.concat(
+        {"sem esquema": relatorio_memoria(bruto_sem), "com esquema": relatorio_memoria(bruto_com)}, axis=1
+    )
+    pd.set_option("display.width", 120)
+    print(f"Linhas: {len(bruto_com):,}\n")
+    print("DataFrame bruto (DataLoader.load):")
+    print(relatorio.to_string())
+
+    for nome, sem, com in [("bruto", bruto_sem, bruto_com), ("processado", processado_sem, processado_com)]:
+        total_sem = relatorio_memoria(sem).loc["Total", "bytes"]
+        total_com = relatorio_memoria(com).loc["Total", "bytes"]
+        # Sem 'Name' (strings únicas por linha), que o esquema mantém como 'object'
+        numerico_sem = relatorio_memoria(sem.drop(columns="Name")).loc["Total", "bytes"]
+        numerico_com = relatorio_memoria(com.drop(columns="Name")).loc["Total", "bytes"]
+        print(f"\nTotal {nome}: {total_sem / 1e6:.1f} MB -> {total_com / 1e6:.1f} MB "
+              f"({total_sem / total_com:.1f}x); sem 'Name': {numerico_sem / 1e6:.1f} MB -> "
+              f"{numerico_com / 1e6:.1f} MB ({numerico_sem / numerico_com:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench_memoria_pipeline.py - Pico de memória por etapa do pipeline, com e sem cópias defensivas
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ContadorMorte import ContadorMortes
+from DataAnalise import DataAnalise
+from DataLoader import DataLoader
+from gerador_dados import gerar_csv
+
+# modo -> (copiar, copy-on-write do pandas)
+MODOS = {
+    "com_copias": (True, False),
+    "copy_on_write": (True, True),
+    "sem_copias": (False, False),
+}
+
+
+def rss_maximo_mb():
+    """Pico de RSS do processo até agora (ru_maxrss é em KB no Linux e em bytes no macOS)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def executar_modo(caminho, modo):
+    """Roda o pipeline no processo atual e retorna as medições de cada etapa."""
+    copiar, copy_on_write = MODOS[modo]
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", copy_on_write)
+
+    etapas = []
+    estado = {}
+
+    def medir(nome, funcao):
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcao()
+        atual, pico = tracemalloc.get_traced_memory()
+        etapas.append({
+            "etapa": nome,
+            "pico_etapa_mb": round((pico - antes) / 1e6, 1),
+            "memoria_retida_mb": round(atual / 1e6, 1),
+            "rss_maximo_mb": round(rss_maximo_mb(), 1),
+        })
+
+    tracemalloc.start()
+    medir("DataLoader.load", lambda: estado.update(df_raw=DataLoader(caminho, sep=";").load()))
+    medir("DataAnalise.processar",
+          lambda: estado.update(df=DataAnalise(estado["df_raw"], copiar=copiar).processar()[0]))
+    if not copiar:
+        # Contrato de posse: o DataFrame bruto foi entregue ao DataAnalise
+        estado.pop("df_raw")
+    medir("ContadorMortes", lambda: estado.update(contador=ContadorMortes(estado["df"], copiar=copiar)))
+    medir("estatisticas_mortes", lambda: estado["contador"].estatisticas_mortes())
+    tracemalloc.stop()
+    return etapas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--modo", choices=MODOS, help=argparse.SUPPRESS)
+    parser.add_argument("--csv", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.modo:
+        print(json.dumps(executar_modo(args.csv, args.modo)))
+        return
+
+    # Cada modo roda em um processo novo para que o pico de RSS de um não contamine o outro
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = gerar_csv(os.path.join(pasta, "sintetico.csv"), args.linhas)
+        resultados = {}
+        for modo in MODOS:
+            saida = subprocess.run([sys.executable, __file__, "--modo", modo, "--csv", caminho],
+                                   check=True, capture_output=True, text=True).stdout
+            resultados[modo] = json.loads(saida.strip().splitlines()[-1])
+
+    print(f"Linhas: {args.linhas:,}")
+    for modo, etapas in resultados.items():
+        print(f"\n{modo}")
+        print(pd.DataFrame(etapas).set_index("etapa").to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# bench_pipeline.py - Tempo e pico de memória por etapa (carga -> pré-processamento -> estatísticas) e vazão dos endpoints, em JSON
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from ContadorMorte import ContadorMortes
+from DataAnalise import DataAnalise
+from DataLoader import DataLoader
+from gerador_dados import gerar_csv
+
+TAMANHOS_PADRAO = "1000,10000,100000,1000000"
+
+# Endpoints medidos pelo test client do Flask; {id}, {ids}, {n} e {pagina} são sorteados a cada requisição
+ENDPOINTS = [
+    "/api/statistics",
+    "/api/gender_count",
+    "/api/deaths_by_year",
+    "/api/record/{id}",
+    "/api/records?ids={ids}",
+    "/api/characters?gender=Feminino&died=1&page={pagina}",
+    "/api/characters?died=1&sort=Death_Year&order=desc&columns=Name,Death_Year&page={pagina}",
+    "/api/breakdown?by=allegiances,gender",
+    "/api/search?q=personagem+{n}&limit=10",
+]
+
+# Diferença relativa de tempo a partir da qual a comparação com um resultado anterior aponta regressão
+LIMITE_REGRESSAO = 0.10
+
+
+def rss_maximo_mb():
+    """Pico de RSS do processo até agora (ru_maxrss é em KB no Linux e em bytes no macOS)."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def executar_pipeline(caminho, medir):
+    """Roda DataLoader.load -> DataAnalise.processar -> ContadorMortes -> estatisticas_mortes com `medir(nome, funcao)`."""
+    estado = {}
+    medir("DataLoader.load", lambda: estado.update(df_raw=DataLoader(caminho, sep=";").load()))
+    medir("DataAnalise.processar", lambda: estado.update(df=DataAnalise(estado.pop("df_raw"), copiar=False).processar()[0]))
+    medir("ContadorMortes", lambda: estado.update(contador=ContadorMortes(estado["df"], copiar=False)))
+    medir("estatisticas_mortes", lambda: estado["contador"].estatisticas_mortes())
+
+
+def medir_etapas(caminho, repeticoes):
+    """Melhor tempo de cada etapa entre as repetições e, em uma execução à parte com tracemalloc, o pico de memória."""
+    tempos = {}
+
+    def cronometrar(nome, funcao):
+        inicio = time.perf_counter()
+        funcao()
+        tempos[nome] = min(tempos.get(nome, float("inf")), time.perf_counter() - inicio)
+
+    for _ in range(repeticoes):
+        executar_pipeline(caminho, cronometrar)
+
+    memoria = {}
+
+    def rastrear(nome, funcao):
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        funcao()
+        atual, pico = tracemalloc.get_traced_memory()
+        memoria[nome] = {"pico_mb": round((pico - antes) / 1e6, 1), "retida_mb": round((atual - antes) / 1e6, 1)}
+
+    # O tracemalloc deixa as alocações mais lentas: a memória é medida fora das repetições cronometradas
+    tracemalloc.start()
+    executar_pipeline(caminho, rastrear)
+    tracemalloc.stop()
+    return [{"etapa": nome, "segundos": round(tempos[nome], 4), **memoria[nome]} for nome in tempos]
+
+
+def montar_caminho(modelo, ids, rng):
+    return modelo.format(
+        id=rng.choice(ids),
+        ids=",".join(rng.choice(ids) for _ in range(20)),
+        n=rng.randrange(len(ids)),
+        pagina=rng.randint(1, 10),
+    )
+
+
+def medir_endpoints(caminho, duracao):
+    """Carrega a API sobre o CSV e mede requisições/s e latências de cada endpoint com o test client (sem rede)."""
+    os.environ["GOT_CSV"] = caminho
+    os.environ.setdefault("GOT_LOG_LEVEL", "WARNING")
+    inicio = time.perf_counter()
+    import api
+    # A importação não carrega os dados: a partida inclui a primeira carga do snapshot
+    api.carregar_dados()
+    partida = time.perf_counter() - inicio
+
+    cliente = api.app.test_client()
+    ids = api.snapshot_atual().df_processado["ID"].tolist()
+    rng = random.Random(42)
+    resultados = []
+    for modelo in ENDPOINTS:
+        # Aquecimento: caches de resposta e ordens de colunas são preenchidos antes da medição
+        for _ in range(3):
+            cliente.get(montar_caminho(modelo, ids, rng))
+        latencias = []
+        erros = 0
+        prazo = time.perf_counter() + duracao
+        while time.perf_counter() < prazo:
+            caminho_requisicao = montar_caminho(modelo, ids, rng)
+            inicio = time.perf_counter()
+            resposta = cliente.get(caminho_requisicao)
+            resposta.get_data()
+            latencias.append(time.perf_counter() - inicio)
+            erros += resposta.status_code >= 400
+        resultados.append({
+            "endpoint": modelo,
+            "requisicoes": len(latencias),
+            "req_s": round(len(latencias) / sum(latencias), 1),
+            "p50_ms": round(float(np.percentile(latencias, 50)) * 1000, 3),
+            "p99_ms": round(float(np.percentile(latencias, 99)) * 1000, 3),
+            "erros": erros,
+        })
+    return round(partida, 4), resultados
+
+
+def executar_tamanho(caminho, repeticoes, duracao):
+    """Executado em um processo novo por tamanho: o pico de RSS de um tamanho não contamina o outro."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        etapas = medir_etapas(caminho, repeticoes)
+        rss_pipeline = rss_maximo_mb()
+        partida_api, endpoints = medir_endpoints(caminho, duracao) if duracao > 0 else (None, [])
+    return {
+        "etapas": etapas,
+        "rss_maximo_pipeline_mb": round(rss_pipeline, 1),
+        "partida_api_s": partida_api,
+        "endpoints": endpoints,
+        "rss_maximo_mb": round(rss_maximo_mb(), 1),
+    }
+
+
+def ambiente():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "data": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def comparar(atual, anterior):
+    """Imprime a variação de tempo de cada etapa e endpoint em relação a um resultado salvo antes."""
+    base = {r["linhas"]: r for r in anterior["resultados"]}
+    for resultado in atual["resultados"]:
+        antigo = base.get(resultado["linhas"])
+        if antigo is None:
+            continue
+        print(f"\nComparação com {anterior['ambiente'].get('commit')} ({resultado['linhas']:,} linhas)")
+        pares = [(e["etapa"], e["segundos"], a["segundos"], False)
+                 for e in resultado["etapas"] for a in antigo["etapas"] if a["etapa"] == e["etapa"]]
+        pares += [(e["endpoint"], e["req_s"], a["req_s"], True)
+                  for e in resultado["endpoints"] for a in antigo["endpoints"] if a["endpoint"] == e["endpoint"]]
+        for nome, novo, velho, maior_melhor in pares:
+            if not velho:
+                continue
+            variacao = (novo - velho) / velho
+            piorou = -variacao if maior_melhor else variacao
+            marca = "  <- regressão" if piorou > LIMITE_REGRESSAO else ""
+            print(f"  {nome:<90} {velho:>12} -> {novo:>12} ({variacao:+.1%}){marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tamanhos", default=TAMANHOS_PADRAO,
+                        help="Números de linhas separados por vírgula (ex.: 1000,10000000)")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Repetições cronometradas do pipeline (vale o melhor tempo)")
+    parser.add_argument("--duracao", type=float, default=2.0, help="Segundos por endpoint (0 desativa a medição da API)")
+    parser.add_argument("--saida", default="resultado_bench_pipeline.json", help="Arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--executar", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.executar:
+        print(json.dumps(executar_tamanho(args.executar, args.repeticoes, args.duracao)))
+        return
+
+    tamanhos = [int(t) for t in args.tamanhos.split(",")]
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for linhas in tamanhos:
+            # Pasta própria por tamanho: o cache Feather gravado pela API fica junto do CSV e é apagado no fim
+            caminho = os.path.join(pasta, str(linhas), "sintetico.csv")
+            os.makedirs(os.path.dirname(caminho))
+            gerar_csv(caminho, linhas)
+            saida = subprocess.run([sys.executable, __file__, "--executar", caminho,
+                                    "--repeticoes", str(args.repeticoes), "--duracao", str(args.duracao)],
+                                   check=True, stdout=subprocess.PIPE, text=True).stdout
+            resultado = {"linhas": linhas, "tamanho_csv_mb": round(os.path.getsize(caminho) / 1e6, 1),
+                         **json.loads(saida.strip().splitlines()[-1])}
+            resultados.append(resultado)
+
+            print(f"\nLinhas: {linhas:,} (CSV de {resultado['tamanho_csv_mb']} MB, RSS máximo {resultado['rss_maximo_mb']} MB)")
+            print(pd.DataFrame(resultado["etapas"]).set_index("etapa").to_string())
+            if resultado["endpoints"]:
+                print(f"Partida da API (SnapshotDados.construir): {resultado['partida_api_s']:.3f} s")
+                print(pd.DataFrame(resultado["endpoints"]).set_index("endpoint").to_string())
+
+    relatorio = {"ambiente": ambiente(), "parametros": vars(args), "resultados": resultados}
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            comparar(relatorio, json.load(arquivo))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_serializacao.py - Serialização dos registros (versão anterior x atual) e tamanho/tempo da compressão das respostas
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompressaoRespostas import NIVEIS_CACHE, NIVEIS_REQUISICAO, codificacoes_disponiveis, comprimir
+from DataAnalise import DataAnalise
+from IndiceRegistros import serializar_registros
+from SerializacaoJson import orjson
+from gerador_dados import gerar_dataframe
+
+
+def serializar_versao_anterior(dataframe):
+    """Reproduz a serialização anterior: DataFrame inteiro em object + to_dict + json.dumps por registro."""
+    df_obj = dataframe.astype(object).where(dataframe.notna(), None)
+    return [json.dumps(registro, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            for registro in df_obj.to_dict(orient="records")]
+
+
+def medir(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return time.perf_counter() - inicio, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=1_000_000)
+    parser.add_argument("--pagina", type=int, default=1000, help="Registros na resposta usada para medir a compressão")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df, _ = DataAnalise(gerar_dataframe(args.linhas), copiar=False).processar()
+    df["ID"] = [f"{i:016x}" for i in range(len(df))]
+
+    tempo_anterior, anterior = medir(serializar_versao_anterior, df)
+    tempo_atual, atual = medir(serializar_registros, df)
+    print(f"Linhas: {len(df):,}  (encoder: {'orjson' if orjson is not None else 'json'})")
+    print(f"Versão anterior (to_dict + json.dumps): {tempo_anterior:.3f} s")
+    print(f"Versão atual (colunas + dumps):         {tempo_atual:.3f} s  ({tempo_anterior / tempo_atual:.1f}x)")
+    print(f"Mesmos bytes: {anterior == atual}")
+
+    # Uma página de /api/characters com `--pagina` registros
+    corpo = b'{"dados":[' + b",".join(atual[:args.pagina]) + b'],"status":"sucesso"}\n'
+    print(f"\nCompressão de uma página com {args.pagina} registros ({len(corpo) / 1e3:.1f} KB):")
+    for codificacao in codificacoes_disponiveis():
+        for origem, nivel in (("requisição", NIVEIS_REQUISICAO[codificacao]), ("cache", NIVEIS_CACHE[codificacao])):
+            tempo, comprimido = medir(comprimir, corpo, codificacao, nivel)
+            print(f"  {codificacao:<5} nível {nivel:>2} ({origem:<10}): {len(comprimido) / 1e3:7.1f} KB "
+                  f"({len(comprimido) / len(corpo):.1%}) em {tempo * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
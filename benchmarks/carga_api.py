@@ -0,0 +1,111 @@
+# carga_api.py - Teste de carga HTTP da API: requisições/s e latências (p50/p99) por endpoint
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ENDPOINTS_PADRAO = ["/api/statistics", "/api/gender_count", "/api/record/{id}", "/api/records?ids={ids}"]
+
+
+def buscar_ids(url, quantidade=1000):
+    """IDs existentes para preencher {id} / {ids}: uma página de /api/characters só com a coluna ID."""
+    partes = urlsplit(url)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+    try:
+        conexao.request("GET", f"/api/characters?columns=ID&page_size={quantidade}")
+        resposta = conexao.getresponse()
+        corpo = json.loads(resposta.read())
+    finally:
+        conexao.close()
+    return [registro["ID"] for registro in corpo["dados"]]
+
+
+def montar_caminho(modelo, ids, rng):
+    """Preenche {id} / {ids} com IDs sorteados entre os existentes."""
+    return modelo.format(
+        id=rng.choice(ids),
+        ids=",".join(rng.choice(ids) for _ in range(20)),
+    )
+
+
+def trabalhador(url, endpoints, ids, prazo, latencias, erros, recebidos, cabecalhos, semente):
+    """Mantém uma conexão keep-alive e dispara requisições até o prazo."""
+    partes = urlsplit(url)
+    conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+    rng = random.Random(semente)
+    while time.perf_counter() < prazo:
+        modelo = rng.choice(endpoints)
+        inicio = time.perf_counter()
+        try:
+            conexao.request("GET", montar_caminho(modelo, ids, rng), headers=cabecalhos)
+            resposta = conexao.getresponse()
+            recebidos[modelo] += len(resposta.read())
+            if resposta.status >= 500:
+                erros[modelo] += 1
+        except (OSError, http.client.HTTPException):
+            erros[modelo] += 1
+            conexao.close()
+            conexao = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+            continue
+        latencias[modelo].append(time.perf_counter() - inicio)
+    conexao.close()
+
+
+def executar(url, endpoints, concorrencia, duracao, ids, cabecalhos=None):
+    """Roda o teste e retorna {endpoint: {requisicoes, req_s, p50_ms, p99_ms, kb_resposta, erros}}."""
+    latencias = defaultdict(list)
+    erros = defaultdict(int)
+    recebidos = defaultdict(int)
+    prazo = time.perf_counter() + duracao
+    threads = [
+        threading.Thread(target=trabalhador, args=(url, endpoints, ids, prazo, latencias, erros, recebidos, cabecalhos or {}, i))
+        for i in range(concorrencia)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    resultados = {}
+    for modelo in endpoints:
+        tempos = np.asarray(latencias[modelo]) * 1000
+        resultados[modelo] = {
+            "requisicoes": len(tempos),
+            "req_s": round(len(tempos) / duracao, 1),
+            "p50_ms": round(float(np.percentile(tempos, 50)), 2) if len(tempos) else None,
+            "p99_ms": round(float(np.percentile(tempos, 99)), 2) if len(tempos) else None,
+            "kb_resposta": round(recebidos[modelo] / len(tempos) / 1000, 2) if len(tempos) else None,
+            "erros": erros[modelo],
+        }
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concorrencia", type=int, default=16, help="conexões simultâneas")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos")
+    parser.add_argument("--endpoint", action="append", dest="endpoints",
+                        help="modelo de caminho (pode repetir); aceita {id} e {ids}")
+    parser.add_argument("--accept-encoding", help="valor do Accept-Encoding (ex.: 'gzip, br'); sem ele as respostas vêm sem compressão")
+    args = parser.parse_args()
+
+    cabecalhos = {"Accept-Encoding": args.accept_encoding} if args.accept_encoding else None
+    resultados = executar(args.url, args.endpoints or ENDPOINTS_PADRAO, args.concorrencia, args.duracao,
+                          buscar_ids(args.url), cabecalhos)
+
+    total = sum(r["requisicoes"] for r in resultados.values())
+    print(f"{args.url} - {args.concorrencia} conexões, {args.duracao:.0f} s, {total / args.duracao:.1f} req/s no total\n")
+    print(f"{'endpoint':<28}{'req/s':>10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'KB/resp':>10}{'erros':>8}")
+    for modelo, r in resultados.items():
+        print(f"{modelo:<28}{r['req_s']:>10}{r['p50_ms']!s:>12}{r['p99_ms']!s:>12}{r['kb_resposta']!s:>10}{r['erros']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# comparar_wsgi_asgi.py - Teste de carga do modo WSGI (gunicorn + gthread) x modo ASGI (uvicorn + api_async) com as mesmas conexões
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from carga_api import buscar_ids, executar
+from gerador_dados import gerar_csv
+
+# Clientes de painel consultando as rotas mais pedidas
+ENDPOINTS = ["/api/statistics", "/api/record/{id}", "/api/records?ids={ids}", "/api/characters?died=1&page=2"]
+
+
+def comando_servidor(modo, porta, workers, threads):
+    if modo == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "api:app"]
+    return [sys.executable, "-m", "uvicorn", "api_async:app", "--host", "127.0.0.1", "--port", str(porta),
+            "--workers", str(workers), "--no-access-log", "--log-level", "warning"]
+
+
+def aguardar(url, servidor, prazo=600):
+    """Espera a API responder (a partida carrega e indexa o CSV)."""
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        if servidor.poll() is not None:
+            raise RuntimeError(f"O servidor terminou na partida (código {servidor.returncode}).")
+        try:
+            with urllib.request.urlopen(url + "/api/statistics", timeout=5):
+                return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"A API em {url} não respondeu em {prazo} s.")
+
+
+def medir_modo(modo, caminho_csv, porta, args):
+    ambiente = dict(os.environ, GOT_CSV=caminho_csv, GOT_LOG_LEVEL="WARNING", GOT_BIND=f"127.0.0.1:{porta}",
+                    GOT_WORKERS=str(args.workers), GOT_THREADS=str(args.threads))
+    servidor = subprocess.Popen(comando_servidor(modo, porta, args.workers, args.threads), cwd=RAIZ, env=ambiente,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        aguardar(url, servidor)
+        ids = buscar_ids(url)
+        resultados = {}
+        for concorrencia in args.concorrencias:
+            resultados[concorrencia] = executar(url, ENDPOINTS, concorrencia, args.duracao, ids)
+        return resultados
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=100_000, help="linhas do CSV sintético (0 usa o character-deaths.csv)")
+    parser.add_argument("--concorrencias", default="16,64,256", help="conexões simultâneas, separadas por vírgula")
+    parser.add_argument("--duracao", type=float, default=10.0, help="segundos por nível de concorrência")
+    parser.add_argument("--workers", type=int, default=1, help="processos de cada servidor")
+    parser.add_argument("--threads", type=int, default=4, help="threads por worker do gunicorn (modo WSGI)")
+    parser.add_argument("--porta", type=int, default=5100)
+    args = parser.parse_args()
+    args.concorrencias = [int(c) for c in args.concorrencias.split(",")]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "personagens.csv")
+        if args.linhas:
+            gerar_csv(caminho, args.linhas)
+        else:
+            shutil.copy(os.path.join(RAIZ, "character-deaths.csv"), caminho)
+        modos = {modo: medir_modo(modo, caminho, args.porta, args) for modo in ("wsgi", "asgi")}
+
+    print(f"{args.workers} worker(s); WSGI com {args.threads} threads por worker; {args.duracao:.0f} s por nível\n")
+    print(f"{'conexões':>9} {'endpoint':<34}{'WSGI req/s':>12}{'ASGI req/s':>12}{'WSGI p99':>10}{'ASGI p99':>10}")
+    for concorrencia in args.concorrencias:
+        for endpoint in ENDPOINTS:
+            wsgi = modos["wsgi"][concorrencia][endpoint]
+            asgi = modos["asgi"][concorrencia][endpoint]
+            print(f"{concorrencia:>9} {endpoint:<34}{wsgi['req_s']:>12}{asgi['req_s']:>12}"
+                  f"{wsgi['p99_ms']!s:>10}{asgi['p99_ms']!s:>10}")
+
+
+if __name__ == "__main__":
+    main()
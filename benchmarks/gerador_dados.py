@@ -0,0 +1,70 @@
+# gerador_dados.py - Gera dados sintéticos no formato de character-deaths.csv
+import numpy as np
+import pandas as pd
+
+COLUNAS = ["Name", "Allegiances", "Death_Year", "Book of Death", "Death Chapter", "Book Intro Chapter",
+           "Gender", "Nobility", "GoT", "CoK", "SoS", "FfC", "DwD"]
+
+# Casas do dataset original (a cardinalidade de 'Allegiances' é baixa, 20 valores) e a frequência de cada uma
+CASAS = ["Lannister", "Stark", "Night's Watch", "Baratheon", "Greyjoy", "Targaryen", "Martell",
+         "Tyrell", "Tully", "Arryn", "Wildling", "House Stark", "House Lannister", "House Greyjoy",
+         "House Tyrell", "House Martell", "House Targaryen", "House Tully", "House Arryn", "House Baratheon"]
+PESOS_CASAS = [0.122, 0.110, 0.175, 0.084, 0.077, 0.026, 0.038, 0.023, 0.033, 0.035, 0.060, 0.053, 0.032,
+               0.036, 0.017, 0.018, 0.029, 0.012, 0.011, 0.012]
+
+# Taxas de nulos e distribuição dos anos de morte próximas às do CSV original
+TAXA_NULOS_ALLEGIANCES = 0.28
+TAXA_VIVOS = 0.67
+ANOS_MORTE = [297, 298, 299, 300]
+PESOS_ANOS_MORTE = [0.01, 0.15, 0.51, 0.33]
+TAXA_MORTOS_SEM_CAPITULO = 0.02
+
+# Linhas geradas por vez ao gravar o CSV (limita a memória com 10M de linhas)
+LINHAS_POR_BLOCO = 1_000_000
+
+
+def gerar_dataframe(n_linhas, semente=42, primeiro=0):
+    """Retorna um DataFrame com `n_linhas` como se tivesse acabado de ser lido do CSV.
+
+    Os nomes são únicos e numerados a partir de `primeiro`.
+    """
+    rng = np.random.default_rng(semente)
+
+    nomes = pd.Series(np.arange(primeiro, primeiro + n_linhas)).map("Personagem {}".format)
+    pesos = np.asarray(PESOS_CASAS) / sum(PESOS_CASAS)
+    casas = np.asarray(CASAS, dtype=object)[rng.choice(len(CASAS), n_linhas, p=pesos)]
+    casas[rng.random(n_linhas) < TAXA_NULOS_ALLEGIANCES] = None
+
+    morto = rng.random(n_linhas) >= TAXA_VIVOS
+    ano = np.where(morto, rng.choice(ANOS_MORTE, n_linhas, p=PESOS_ANOS_MORTE), np.nan)
+    livro = np.where(morto, rng.integers(1, 6, n_linhas), np.nan)
+    capitulo = np.where(morto, rng.integers(0, 81, n_linhas), np.nan)
+    capitulo[rng.random(n_linhas) < TAXA_MORTOS_SEM_CAPITULO] = np.nan
+    intro = rng.integers(0, 81, n_linhas).astype("float64")
+    intro[rng.random(n_linhas) < 0.013] = np.nan
+
+    dados = {
+        "Name": nomes.to_numpy(),
+        "Allegiances": casas,
+        "Death_Year": ano,
+        "Book of Death": livro,
+        "Death Chapter": capitulo,
+        "Book Intro Chapter": intro,
+        "Gender": (rng.random(n_linhas) < 0.83).astype("int64"),
+        "Nobility": (rng.random(n_linhas) < 0.47).astype("int64"),
+    }
+    for coluna in ["GoT", "CoK", "SoS", "FfC", "DwD"]:
+        dados[coluna] = (rng.random(n_linhas) < 0.4).astype("int64")
+    return pd.DataFrame(dados, columns=COLUNAS)
+
+
+def gerar_csv(caminho, n_linhas, semente=42):
+    """Grava um CSV sintético separado por ';' no mesmo formato do arquivo original (em blocos de linhas)."""
+    for bloco, primeiro in enumerate(range(0, max(n_linhas, 1), LINHAS_POR_BLOCO)):
+        # O primeiro bloco usa a própria semente: arquivos pequenos não mudam com o tamanho do bloco
+        df = gerar_dataframe(min(LINHAS_POR_BLOCO, n_linhas - primeiro), semente if bloco == 0 else (semente, bloco), primeiro)
+        # No arquivo original os anos e capítulos são inteiros ("299", não "299.0")
+        colunas_float = df.select_dtypes(include="float64").columns
+        df[colunas_float] = df[colunas_float].astype("Int64")
+        df.to_csv(caminho, sep=";", index=False, mode="w" if bloco == 0 else "a", header=bloco == 0)
+    return caminho
@@ -0,0 +1,129 @@
+# perfil_partida.py - Perfil da partida: tempo de importação por pacote (-X importtime) e tempo até /api/health e /api/ready
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from gerador_dados import gerar_csv
+
+# Código executado em um processo novo para cada perfil de importação
+PERFIS = {
+    "import api": "import api",
+    "import api + carregar_dados()": "import api; api.carregar_dados()",
+    "import api_async": "import api_async",
+    # O que o app.py importa antes de desenhar a página (o app.py em si só roda dentro do streamlit)
+    "imports do app.py": "import streamlit, FigurasGraficos, ClienteApi",
+}
+
+
+def perfil_importacao(codigo, ambiente):
+    """Roda `codigo` com -X importtime e soma o tempo próprio (self) de cada pacote raiz. Retorna (total s, {pacote: s})."""
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], cwd=RAIZ, env=ambiente,
+                           capture_output=True, text=True, check=True).stderr
+    por_pacote = defaultdict(float)
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "[us]" in linha:
+            continue
+        proprio, _, nome = linha[len("import time:"):].split("|")
+        por_pacote[nome.strip().split(".")[0]] += int(proprio) / 1e6
+    return sum(por_pacote.values()), por_pacote
+
+
+def tempo_de_processo(codigo, ambiente):
+    """Tempo de parede de um processo Python que só executa `codigo` (inclui a inicialização do interpretador)."""
+    inicio = time.perf_counter()
+    subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, env=ambiente, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - inicio
+
+
+def comando_servidor(modo, porta):
+    if modo == "wsgi":
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "api:app"]
+    return [sys.executable, "-m", "uvicorn", "api_async:app", "--host", "127.0.0.1", "--port", str(porta),
+            "--no-access-log", "--log-level", "warning"]
+
+
+def _responde_200(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as resposta:
+            return resposta.status == 200
+    except (urllib.error.HTTPError, OSError):
+        return False
+
+
+def partida_servidor(modo, ambiente, porta, prazo=600):
+    """Segundos desde o início do processo até /api/health e até /api/ready responderem 200."""
+    ambiente = dict(ambiente, GOT_BIND=f"127.0.0.1:{porta}", GOT_WORKERS="1")
+    url = f"http://127.0.0.1:{porta}"
+    inicio = time.perf_counter()
+    servidor = subprocess.Popen(comando_servidor(modo, porta), cwd=RAIZ, env=ambiente,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    tempos = {}
+    try:
+        limite = time.monotonic() + prazo
+        while "ready" not in tempos:
+            if servidor.poll() is not None:
+                raise RuntimeError(f"O servidor terminou na partida (código {servidor.returncode}).")
+            if time.monotonic() > limite:
+                raise TimeoutError(f"A API em {url} não ficou pronta em {prazo} s.")
+            for rota in ("health", "ready"):
+                if rota not in tempos and _responde_200(f"{url}/api/{rota}"):
+                    tempos[rota] = time.perf_counter() - inicio
+            time.sleep(0.01)
+        return tempos
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--linhas", type=int, default=100_000, help="linhas do CSV sintético (0 usa o character-deaths.csv)")
+    parser.add_argument("--top", type=int, default=8, help="pacotes mostrados em cada perfil de importação")
+    parser.add_argument("--porta", type=int, default=5200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "personagens.csv")
+        if args.linhas:
+            gerar_csv(caminho, args.linhas)
+        else:
+            shutil.copy(os.path.join(RAIZ, "character-deaths.csv"), caminho)
+        ambiente = dict(os.environ, GOT_CSV=caminho, GOT_LOG_LEVEL="WARNING")
+
+        # Primeira execução só aquece o cache de bytecode e o cache Feather do CSV
+        tempo_de_processo(PERFIS["import api + carregar_dados()"], ambiente)
+
+        print(f"Importação (-X importtime, tempo próprio somado por pacote; {args.linhas or 'character-deaths.csv'} linhas)")
+        for nome, codigo in PERFIS.items():
+            total, por_pacote = perfil_importacao(codigo, ambiente)
+            print(f"\n{nome}: {total:.3f} s importando, {tempo_de_processo(codigo, ambiente):.3f} s de processo")
+            for pacote, segundos in sorted(por_pacote.items(), key=lambda item: -item[1])[:args.top]:
+                print(f"  {pacote:<24}{segundos * 1000:9.1f} ms")
+
+        carrega_pandas = subprocess.run(
+            [sys.executable, "-c", "import sys, api; print('pandas' in sys.modules)"],
+            cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        print(f"\n`import api` carrega o pandas: {carrega_pandas}")
+
+        # Gunicorn carrega os dados no master antes dos workers (health e ready juntos);
+        # o uvicorn responde /api/health enquanto os dados carregam em segundo plano
+        print(f"\n{'servidor':<22}{'/api/health (s)':>16}{'/api/ready (s)':>16}")
+        for modo, nome in (("wsgi", "gunicorn (WSGI)"), ("asgi", "uvicorn (ASGI)")):
+            tempos = partida_servidor(modo, ambiente, args.porta)
+            print(f"{nome:<22}{tempos['health']:>16.3f}{tempos['ready']:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+# gunicorn.conf.py - Perfil de produção da API
+# Uso: gunicorn -c gunicorn.conf.py api:app
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("GOT_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GOT_WORKERS", multiprocessing.cpu_count()))
+# Cada worker atende várias requisições em paralelo com threads (as rotas só leem o snapshot)
+worker_class = "gthread"
+threads = int(os.environ.get("GOT_THREADS", 4))
+timeout = 30
+keepalive = 5
+
+# Importa api.py uma única vez no processo master (o CSV é carregado em when_ready, ainda no master).
+# Os workers são criados por fork e compartilham essas páginas de memória por copy-on-write.
+preload_app = True
+
+
+def when_ready(server):
+    """Chamado no master depois do carregamento da aplicação e antes de criar os workers."""
+    # Importar o api.py não carrega os dados: carrega aqui, uma vez, para que os workers nasçam
+    # prontos (/api/ready responde 200 no primeiro acesso) e compartilhem o snapshot
+    import api
+
+    api.carregar_dados()
+    # Move os objetos já criados para a geração permanente do GC: as coletas nos workers não
+    # tocam mais nesses objetos e as páginas compartilhadas não são copiadas à toa
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    """Chamado em cada worker logo após o fork."""
+    # Threads não sobrevivem ao fork: cada worker inicia o próprio observador do CSV.
+    # Numa alteração, o primeiro worker a recarregar grava o cache Feather e os demais o leem via mmap.
+    import api
+
+    api.iniciar_observador()